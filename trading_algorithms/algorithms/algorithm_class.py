@@ -1,17 +1,67 @@
 from abc import ABC, abstractmethod
+from array import array
+
+# Bump whenever the layout of get_state() changes
+STATE_VERSION = 2
+
+# Per-tick records that grow for the whole run. Snapshots only keep their latest entries;
+# checkpoint.py appends the rest to files of their own
+HISTORIES = ["seen_data_points", "balance_history", "shares_history", "worth_history"]
+
+
+def _pack(value):
+    # Float lists are stored as arrays, which are far smaller and faster to (de)serialise.
+    # Lists of ints (e.g. ma_lengths) are left alone so they come back as ints
+    if isinstance(value, list):
+        if any(type(item) is float for item in value):
+            try:
+                return array('d', value)
+            except TypeError:
+                pass
+        return list(value)
+    if isinstance(value, dict):
+        return {key: _pack(item) for key, item in value.items()}
+    return value
+
+
+def _unpack(value):
+    if isinstance(value, array):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {key: _unpack(item) for key, item in value.items()}
+    return value
+
+
+def _tail(value, count: int):
+    # The last count entries of a list, or of every list in a dict
+    if isinstance(value, dict):
+        return {key: _tail(item, count) for key, item in value.items()}
+    return value[max(len(value) - count, 0):]
+
 
 class TradingAlgorithm(ABC):
+    # Indicator buffers, and how many of their latest entries the algorithm ever reads;
+    # snapshots keep only those. Set in subclasses that keep indicators
+    indicator_state: dict[str, int] = {}
+
     def __init__(self, starting_balance: float, starting_shares: float):
         self.current_index: int = 0
         self.seen_data_points: list[float] = []
         self.balance_history: list[float] = [starting_balance]
         self.shares_history: list[float] = [starting_shares]
         self.worth_history: list[float] = []
+        # Entries of each history dropped from the front (by restoring a snapshot)
+        self.history_offsets: dict[str, int] = {}
 
-    @abstractmethod
     def give_data_point(self, stock_price: float):
-        # Override this in subclasses
-        # Call super first
+        # Each tick runs in phases, so they can be timed separately (see profiling.py)
+        self.record_data_point(stock_price)
+        self.update_indicators(stock_price)
+        balance, shares = self.decide(stock_price)
+        self.record_holdings(balance, shares)
+
+    def record_data_point(self, stock_price: float):
+        # History bookkeeping before anything else sees the new price
         if len(self.seen_data_points) > 0:
             previous_stock_price = self.seen_data_points[-1]
             previous_worth = self.get_current_worth(previous_stock_price)
@@ -19,6 +69,24 @@ class TradingAlgorithm(ABC):
         self.seen_data_points.append(stock_price)
         self.current_index += 1
 
+    def update_indicators(self, stock_price: float):
+        # Override in subclasses that keep indicators (moving averages, bands, ...)
+        pass
+
+    def lookback(self) -> int:
+        # How many of the latest prices the algorithm ever reads; override in subclasses that read further back
+        return 1
+
+    @abstractmethod
+    def decide(self, stock_price: float) -> tuple[float, float]:
+        # Override this in subclasses
+        # Returns the new (balance, shares)
+        pass
+
+    def record_holdings(self, balance: float, shares: float):
+        self.balance_history.append(balance)
+        self.shares_history.append(shares)
+
 
     def get_current_index(self) -> int:
         return self.current_index
@@ -42,3 +110,33 @@ class TradingAlgorithm(ABC):
     def get_worth_history(self) -> list[float]:
         return self.worth_history
 
+
+    def get_state(self) -> dict:
+        """
+        Snapshot of everything the algorithm needs to carry on from its current index:
+        parameters, flags (e.g. selling), holdings, and only as much of its prices and indicator
+        buffers as it reads, so a snapshot's size doesn't depend on how long it has run
+        """
+        keep = {"seen_data_points": self.lookback(), "balance_history": 1, "shares_history": 1,
+                "worth_history": 1, **self.indicator_state}
+        offsets = dict(self.history_offsets)
+        state = {}
+        # Callables are instance-level hooks (e.g. profiling wrappers), not state
+        for name, value in vars(self).items():
+            if callable(value) or name == "history_offsets":
+                continue
+            if name in keep:
+                kept = _tail(value, keep[name])
+                if name in HISTORIES:
+                    offsets[name] = offsets.get(name, 0) + len(value) - len(kept)
+                value = kept
+            state[name] = _pack(value)
+        state["history_offsets"] = offsets
+        return state
+
+    def set_state(self, state: dict):
+        """
+        Restore a snapshot taken with get_state
+        """
+        for name, value in state.items():
+            setattr(self, name, _unpack(value))
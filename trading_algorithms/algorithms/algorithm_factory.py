@@ -1,14 +1,8 @@
 from enum import Enum
+from importlib import import_module
 from typing import Iterable
 
 from algorithms.algorithm_class import TradingAlgorithm
-from algorithms.greedy import MaximallyGreedyAlgorithm
-from algorithms.random_choice import RandomChoiceAlgorithm
-from algorithms.best_after_n import BestAfterNAlgorithm
-from algorithms.expo_moving_average import ExponentialMAAlgorithm
-from algorithms.simple_moving_average import SimpleMAAlgorithm
-from algorithms.bollinger import BollingerBandsAlgorithm
-from algorithms.rsi import RSIAlgorithm
 
 
 class AlgorithmTypes(Enum):
@@ -19,25 +13,49 @@ class AlgorithmTypes(Enum):
     SIMPLE_MA = 4
     BBANDS = 5
     RSI = 6
+    TREND_FILTERED = 7
     OTHER = 99
 
 
-def algorithm_create(choice: AlgorithmTypes, starting_balance: float = 0, starting_shares: float = 0, meta_arguments: Iterable = []) -> TradingAlgorithm:
-    match choice:
-        case AlgorithmTypes.MAXIMALLY_GREEDY:
-            return MaximallyGreedyAlgorithm(starting_balance, starting_shares, *meta_arguments)
-        case AlgorithmTypes.RANDOM_CHOICE:
-            return RandomChoiceAlgorithm(starting_balance, starting_shares, *meta_arguments)
-        case AlgorithmTypes.BEST_AFTER_N:
-            return BestAfterNAlgorithm(starting_balance, starting_shares, *meta_arguments)
-        case AlgorithmTypes.EXPONENTIAL_MA:
-            return ExponentialMAAlgorithm(starting_balance, starting_shares, *meta_arguments)
-        case AlgorithmTypes.SIMPLE_MA:
-            return SimpleMAAlgorithm(starting_balance, starting_shares, *meta_arguments)
-        case AlgorithmTypes.BBANDS:
-            return BollingerBandsAlgorithm(starting_balance, starting_shares, *meta_arguments)
-        case AlgorithmTypes.RSI:
-            return RSIAlgorithm(starting_balance, starting_shares, *meta_arguments)
-        case _:
+# Strategy name -> (module, class). A strategy's module is only imported the first
+# time it is created, so startup doesn't pay for strategies a run never uses.
+_registry: dict[str, tuple[str, str]] = {
+    AlgorithmTypes.MAXIMALLY_GREEDY.name: ("algorithms.greedy", "MaximallyGreedyAlgorithm"),
+    AlgorithmTypes.RANDOM_CHOICE.name: ("algorithms.random_choice", "RandomChoiceAlgorithm"),
+    AlgorithmTypes.BEST_AFTER_N.name: ("algorithms.best_after_n", "BestAfterNAlgorithm"),
+    AlgorithmTypes.EXPONENTIAL_MA.name: ("algorithms.expo_moving_average", "ExponentialMAAlgorithm"),
+    AlgorithmTypes.SIMPLE_MA.name: ("algorithms.simple_moving_average", "SimpleMAAlgorithm"),
+    AlgorithmTypes.BBANDS.name: ("algorithms.bollinger", "BollingerBandsAlgorithm"),
+    AlgorithmTypes.RSI.name: ("algorithms.rsi", "RSIAlgorithm"),
+    AlgorithmTypes.TREND_FILTERED.name: ("algorithms.trend_filter", "TrendFilteredAlgorithm"),
+}
+_resolved: dict[str, type[TradingAlgorithm]] = {}
+
+
+def register_algorithm(name: str, module: str, class_name: str):
+    """
+    Make a strategy creatable by name without importing it yet
+    """
+    _registry[name] = (module, class_name)
+    _resolved.pop(name, None)
+
+
+def algorithm_names() -> list[str]:
+    return list(_registry)
+
+
+def resolve_algorithm(name: str) -> type[TradingAlgorithm]:
+    if name not in _resolved:
+        if name not in _registry:
             raise KeyError("Not yet implemented")
+        module, class_name = _registry[name]
+        _resolved[name] = getattr(import_module(module), class_name)
+    return _resolved[name]
+
+
+def algorithm_create_by_name(name: str, starting_balance: float = 0, starting_shares: float = 0, meta_arguments: Iterable = []) -> TradingAlgorithm:
+    return resolve_algorithm(name)(starting_balance, starting_shares, *meta_arguments)
 
+
+def algorithm_create(choice: AlgorithmTypes, starting_balance: float = 0, starting_shares: float = 0, meta_arguments: Iterable = []) -> TradingAlgorithm:
+    return algorithm_create_by_name(choice.name, starting_balance, starting_shares, meta_arguments)
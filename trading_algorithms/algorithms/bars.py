@@ -0,0 +1,89 @@
+from datetime import date
+
+# Calendar units a bar can span (optionally several of, e.g. "2W")
+UNITS = ["W", "M", "Q", "Y"]
+_EPOCH = date(1970, 1, 1)
+
+
+def parse_rule(rule: int | str) -> tuple[int, str | None]:
+    """
+    A bar rule as (how many, unit): an int is a bar every that many prices (unit None),
+    "W"/"M"/"Q"/"Y" a bar per calendar week (Monday to Sunday)/month/quarter/year, and
+    "2W", "3M", ... a bar per that many of them
+    """
+    if isinstance(rule, int):
+        if rule < 1:
+            raise ValueError(f"Bars need at least one price each, not {rule}")
+        return rule, None
+
+    unit = rule[-1:].upper()
+    if unit not in UNITS or not (rule[:-1] == "" or rule[:-1].isdigit()):
+        raise ValueError(f"Unknown bar rule {rule}, expected a count or [N]{'/'.join(UNITS)}")
+    count = int(rule[:-1] or 1)
+    if count < 1:
+        raise ValueError(f"Unknown bar rule {rule}")
+    return count, unit
+
+
+def period_key(day: date, unit: str) -> int:
+    """
+    Number of the calendar period (counted from 1970) a day falls in; the same numbering
+    resample.py uses, so bars built one price at a time line up with its
+    """
+    if unit == "W":
+        # 1970-01-01 was a Thursday: shift so weeks start on Monday
+        return ((day - _EPOCH).days + 3) // 7
+    months = (day.year - 1970) * 12 + day.month - 1
+    if unit == "M":
+        return months
+    if unit == "Q":
+        return months // 3
+    return day.year - 1970
+
+
+class BarAggregator:
+    """
+    Builds (open, high, low, close) bars one price at a time, keeping only the bar in progress
+    """
+
+    def __init__(self, rule: int | str = 5):
+        self.count, self.unit = parse_rule(rule)
+        self.key: int | None = None
+        self.ticks = 0
+        self.open = self.high = self.low = self.close = 0.0
+
+    def update(self, price: float, day: date | None = None) -> tuple[float, float, float, float] | None:
+        """
+        Add a price (calendar rules need its day); returns the bar it completes, if any.
+        A calendar bar is only known to be complete when the first price of the next one arrives
+        """
+        finished = None
+        if self.unit is not None:
+            if day is None:
+                raise ValueError("Calendar bars need the day of every price")
+            key = period_key(day, self.unit) // self.count
+            if self.ticks and key != self.key:
+                finished = self.flush()
+            self.key = key
+
+        if self.ticks == 0:
+            self.open = self.high = self.low = price
+        else:
+            self.high = max(self.high, price)
+            self.low = min(self.low, price)
+        self.close = price
+        self.ticks += 1
+
+        if self.unit is None and self.ticks == self.count:
+            finished = self.flush()
+        return finished
+
+    def flush(self) -> tuple[float, float, float, float] | None:
+        """
+        End the bar in progress (e.g. at the end of the data) and return it, if it has any prices
+        """
+        if self.ticks == 0:
+            return None
+        bar = (self.open, self.high, self.low, self.close)
+        self.ticks = 0
+        return bar
@@ -9,32 +9,43 @@ class BestAfterNAlgorithm(TradingAlgorithm):
         self.searching_number: int = searching_number
         self.considering_from: int = 0
         self.selling: bool = starting_shares > 0
+        # Extremes of the n prices searched, which are fixed once it can act
+        self.search_high: float | None = None
+        self.search_low: float | None = None
 
     @override
-    def give_data_point(self, stock_price: float):
-        super().give_data_point(stock_price)
+    def lookback(self) -> int:
+        # The n prices searched, plus the current one
+        return self.searching_number + 1
+
+    @override
+    def decide(self, stock_price: float) -> tuple[float, float]:
         current_balance = self.get_current_balance()
         current_shares = self.get_current_shares()
 
         actionable = self.current_index - self.considering_from > self.searching_number
         if actionable:
             # Will only consider doing an action after n prices have been considered
-            search_latest = self.considering_from + self.searching_number
+            if self.search_high is None:
+                # First tick it can act: the n prices searched are the n before this one
+                searched = self.seen_data_points[-1 - self.searching_number:-1]
+                self.search_high, self.search_low = max(searched), min(searched)
             if self.selling:
-                if stock_price >= max(self.seen_data_points[self.considering_from:search_latest]):
+                if stock_price >= self.search_high:
                     # Highest stock price after the first n prices considered
                     current_balance += current_shares * stock_price
                     current_shares = 0
                     self.considering_from = self.current_index
+                    self.search_high = self.search_low = None
                     self.selling = False
             else:
-                if stock_price <= min(self.seen_data_points[self.considering_from:search_latest]):
+                if stock_price <= self.search_low:
                     # Lowest stock price after the first n prices considered
                     current_shares += current_balance / stock_price
                     current_balance = 0
                     self.considering_from = self.current_index
+                    self.search_high = self.search_low = None
                     self.selling = True
 
-        self.balance_history.append(current_balance)
-        self.shares_history.append(current_shares)
+        return current_balance, current_shares
 
@@ -4,6 +4,8 @@ from algorithms.algorithm_class import TradingAlgorithm
 
 
 class BollingerBandsAlgorithm(TradingAlgorithm):
+    indicator_state = {"upper_band_history": 1, "lower_band_history": 1}
+
     def __init__(self, starting_balance: float, starting_shares: float, window_size: int = 20, num_std_dev: float = 2.0, trading_proportion: float = 0.5):
         super().__init__(starting_balance, starting_shares)
         self.window_size = window_size
@@ -13,9 +15,7 @@ class BollingerBandsAlgorithm(TradingAlgorithm):
         self.lower_band_history: list[float] = []
 
     @override
-    def give_data_point(self, stock_price: float):
-        super().give_data_point(stock_price)
-
+    def update_indicators(self, stock_price: float):
         window = self.seen_data_points[-self.window_size:]
         mean = sum(window) / len(window)
         variance = sum((p - mean) ** 2 for p in window) / len(window)
@@ -26,25 +26,28 @@ class BollingerBandsAlgorithm(TradingAlgorithm):
         self.upper_band_history.append(upper_band)
         self.lower_band_history.append(lower_band)
 
-        if len(self.seen_data_points) < self.window_size:
-            # Not enough data to make informed actioms with Bollinger bands
-            self.balance_history.append(self.get_current_balance())
-            self.shares_history.append(self.get_current_shares())
-            return
+    @override
+    def lookback(self) -> int:
+        return self.window_size
 
+    @override
+    def decide(self, stock_price: float) -> tuple[float, float]:
         current_balance = self.get_current_balance()
         current_shares = self.get_current_shares()
 
-        if stock_price > upper_band:
+        if self.current_index < self.window_size:
+            # Not enough data to make informed actioms with Bollinger bands
+            return current_balance, current_shares
+
+        if stock_price > self.upper_band_history[-1]:
             # Sell signal
             selling_amount = current_shares * self.trading_proportion
             current_shares -= selling_amount
             current_balance += selling_amount * stock_price
-        elif stock_price < lower_band:
+        elif stock_price < self.lower_band_history[-1]:
             # Buy signal
             buying_amount = current_balance * self.trading_proportion
             current_balance -= buying_amount
             current_shares += buying_amount / stock_price
 
-        self.balance_history.append(current_balance)
-        self.shares_history.append(current_shares)
+        return current_balance, current_shares
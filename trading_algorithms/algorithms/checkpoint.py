@@ -0,0 +1,98 @@
+# Saves and restores algorithms mid-run, so long runs can resume where they stopped
+# instead of replaying every data point
+#
+# A checkpoint is <path> (the algorithm's snapshot, which only holds what it needs to carry on,
+# so its size is fixed) plus <path>.<history> for each of HISTORIES: the full per-tick records,
+# as raw float64s that each save only appends the new entries to.
+
+import os
+import pickle
+import weakref
+from array import array
+from importlib import import_module
+
+from algorithms.algorithm_class import HISTORIES, TradingAlgorithm, STATE_VERSION
+
+# Algorithm -> (checkpoint path, entries of each history already in its files)
+_persisted: "weakref.WeakKeyDictionary[TradingAlgorithm, tuple[str, dict[str, int]]]" = weakref.WeakKeyDictionary()
+
+
+def _history_path(path: str, name: str) -> str:
+    return f"{path}.{name}"
+
+
+def save_checkpoint(algorithm: TradingAlgorithm, path: str):
+    saved_path, persisted = _persisted.get(algorithm, (path, {}))
+    if saved_path != path:
+        persisted = {}
+
+    lengths = {}
+    for name in HISTORIES:
+        values = getattr(algorithm, name)
+        offset = algorithm.history_offsets.get(name, 0)
+        start = persisted.get(name, 0)
+        if start < offset:
+            raise ValueError(f"{name} before entry {offset} was restored from another checkpoint and "
+                             f"isn't in memory; save back to that checkpoint or load it with histories=True")
+        history_path = _history_path(path, name)
+        with open(history_path, "r+b" if os.path.exists(history_path) else "wb") as OUTPUT:
+            # Anything past what the last checkpoint recorded is from a save that didn't finish
+            OUTPUT.truncate(start * 8)
+            OUTPUT.seek(0, os.SEEK_END)
+            OUTPUT.write(array('d', values[start - offset:]).tobytes())
+            OUTPUT.flush()
+            os.fsync(OUTPUT.fileno())
+        lengths[name] = offset + len(values)
+
+    checkpoint = {
+        "version": STATE_VERSION,
+        "module": type(algorithm).__module__,
+        "class": type(algorithm).__qualname__,
+        "state": algorithm.get_state(),
+        "histories": lengths,
+    }
+    # Write then rename, so an interrupted save never clobbers the previous checkpoint
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as OUTPUT:
+        pickle.dump(checkpoint, OUTPUT, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+    _persisted[algorithm] = (path, lengths)
+
+
+def load_checkpoint(path: str, histories: bool = False) -> TradingAlgorithm:
+    """
+    Restore an algorithm to carry on from its checkpoint. Its histories only hold their latest
+    entries unless histories is set, which reads them back in full (e.g. for metrics or plots)
+    """
+    with open(path, "rb") as INPUT:
+        checkpoint = pickle.load(INPUT)
+
+    if checkpoint.get("version") != STATE_VERSION:
+        raise ValueError(f"Checkpoint {path} has version {checkpoint.get('version')}, expected {STATE_VERSION}")
+
+    algorithm_class = getattr(import_module(checkpoint["module"]), checkpoint["class"])
+    # The constructor is skipped: every attribute it would set is in the saved state
+    algorithm = algorithm_class.__new__(algorithm_class)
+    algorithm.set_state(checkpoint["state"])
+
+    if histories:
+        for name, length in checkpoint["histories"].items():
+            values = array('d')
+            with open(_history_path(path, name), "rb") as INPUT:
+                values.frombytes(INPUT.read(length * 8))
+            setattr(algorithm, name, values.tolist())
+        algorithm.history_offsets = {}
+    _persisted[algorithm] = (path, checkpoint["histories"])
+    return algorithm
+
+
+def run_with_checkpoints(algorithm: TradingAlgorithm, data: list[float], path: str, every: int = 10000):
+    """
+    Feed data to an algorithm, checkpointing every `every` data points.
+    Points the algorithm has already seen (e.g. after load_checkpoint) are skipped.
+    """
+    for i in range(algorithm.get_current_index(), len(data)):
+        algorithm.give_data_point(data[i])
+        if (i + 1) % every == 0:
+            save_checkpoint(algorithm, path)
+    save_checkpoint(algorithm, path)
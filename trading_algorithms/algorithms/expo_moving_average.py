@@ -4,6 +4,8 @@ from algorithms.algorithm_class import TradingAlgorithm
 
 
 class ExponentialMAAlgorithm(TradingAlgorithm):
+    indicator_state = {"ma_histories": 1}
+
     def __init__(self, starting_balance: float, starting_shares: float, trading_proportion: float = 1.0,
                  ma_lengths: list[int] = [8, 13, 21], smoothing_factor: float = 2):
         super().__init__(starting_balance, starting_shares)
@@ -15,16 +17,17 @@ class ExponentialMAAlgorithm(TradingAlgorithm):
     
 
     @override
-    def give_data_point(self, stock_price: float):
-        super().give_data_point(stock_price)
+    def update_indicators(self, stock_price: float):
         for length, history in self.ma_histories.items():
-            if len(history) == 0:
+            if self.current_index == 1:
                 history.append(stock_price)
                 continue
             # Calculate new exponential smoothing value
             a = self.smoothing_factor / (1 + length)
             history.append(stock_price * a + history[-1] * (1 - a))
 
+    @override
+    def decide(self, stock_price: float) -> tuple[float, float]:
         current_balance = self.get_current_balance()
         current_shares = self.get_current_shares()
 
@@ -60,6 +63,5 @@ class ExponentialMAAlgorithm(TradingAlgorithm):
                 current_balance -= buying_shares * stock_price
                 self.selling = True
 
-        self.balance_history.append(current_balance)
-        self.shares_history.append(current_shares)
+        return current_balance, current_shares
 
@@ -10,14 +10,21 @@ class MaximallyGreedyAlgorithm(TradingAlgorithm):
         self.trend_follow = trend_follow
 
     @override
-    def give_data_point(self, stock_price: float):
+    def record_data_point(self, stock_price: float):
         if len(self.seen_data_points) == 0:
             # Add the first data point to the algorithm
             self.seen_data_points.append(stock_price)
-        last_data_point = self.seen_data_points[-1]
+        super().record_data_point(stock_price)
+
+    @override
+    def lookback(self) -> int:
+        return 2
+
+    @override
+    def decide(self, stock_price: float) -> tuple[float, float]:
+        last_data_point = self.seen_data_points[-2]
         current_balance = self.get_current_balance()
         current_shares = self.get_current_shares()
-        super().give_data_point(stock_price)
 
         stock_rise = last_data_point < stock_price
         stock_fall = last_data_point > stock_price
@@ -35,6 +42,5 @@ class MaximallyGreedyAlgorithm(TradingAlgorithm):
             current_balance -= buying_amount
             current_shares += buying_amount / stock_price
 
-        self.balance_history.append(current_balance)
-        self.shares_history.append(current_shares)
+        return current_balance, current_shares
 
@@ -1,24 +1,26 @@
+import random
 from typing import override
-from random import random
 
 from algorithms.algorithm_class import TradingAlgorithm
 
 
 class RandomChoiceAlgorithm(TradingAlgorithm):
-    def __init__(self, starting_balance: float, starting_shares: float, trading_proportion: float = 0.3, weights: tuple[float, float] = (1/3, 1/3)):
+    def __init__(self, starting_balance: float, starting_shares: float, trading_proportion: float = 0.3, weights: tuple[float, float] = (1/3, 1/3),
+                 seed: int | None = None):
         super().__init__(starting_balance, starting_shares)
         # Trading proportion w
         self.trading_proportion = trading_proportion
         self.weights = weights
+        # Its own generator, so its state can be snapshotted. Without a seed it's seeded from
+        # the global one, so random.seed() before creating it still makes runs repeatable
+        self.rng = random.Random(random.getrandbits(64) if seed is None else seed)
 
     @override
-    def give_data_point(self, stock_price: float):
-        super().give_data_point(stock_price)
-
+    def decide(self, stock_price: float) -> tuple[float, float]:
         current_balance = self.get_current_balance()
         current_shares = self.get_current_shares()
 
-        random_num = random()
+        random_num = self.rng.random()
         if random_num <= self.weights[0]:
             # Random sell
             selling_amount = current_shares * self.trading_proportion
@@ -33,6 +35,18 @@ class RandomChoiceAlgorithm(TradingAlgorithm):
             # Do nothing
             pass
 
-        self.balance_history.append(current_balance)
-        self.shares_history.append(current_shares)
+        return current_balance, current_shares
+
+    @override
+    def get_state(self) -> dict:
+        state = super().get_state()
+        state["rng"] = self.rng.getstate()
+        return state
 
+    @override
+    def set_state(self, state: dict):
+        state = dict(state)
+        rng_state = state.pop("rng")
+        super().set_state(state)
+        self.rng = random.Random()
+        self.rng.setstate(rng_state)
@@ -4,6 +4,9 @@ from algorithms.algorithm_class import TradingAlgorithm
 
 
 class RSIAlgorithm(TradingAlgorithm):
+    # decide() compares against the previous RSI to spot crossings
+    indicator_state = {"rsi_history": 2}
+
     def __init__(
         self,
         starting_balance: float,
@@ -21,21 +24,14 @@ class RSIAlgorithm(TradingAlgorithm):
         self.rsi_history: list[float] = []
 
     @override
-    def give_data_point(self, stock_price: float):
-        super().give_data_point(stock_price)
-
-        current_balance = self.get_current_balance()
-        current_shares = self.get_current_shares()
-
+    def update_indicators(self, stock_price: float):
         # Need at least window_size + 1 prices to compute RSI (we compute gains/losses between successive points)
-        if len(self.seen_data_points) <= self.window_size:
+        if self.current_index <= self.window_size:
             # not enough data yet
             self.rsi_history.append(50)  # No momentum to calculate
-            self.balance_history.append(current_balance)
-            self.shares_history.append(current_shares)
             return
 
-        real_window_size = min(self.window_size, len(self.seen_data_points) - 1)    
+        real_window_size = min(self.window_size, self.current_index - 1)
         window = self.seen_data_points[-(real_window_size + 1):]  # last real_window_size+1 prices
         gains = 0.0
         losses = 0.0
@@ -62,6 +58,20 @@ class RSIAlgorithm(TradingAlgorithm):
 
         self.rsi_history.append(rsi)
 
+    @override
+    def lookback(self) -> int:
+        return self.window_size + 1
+
+    @override
+    def decide(self, stock_price: float) -> tuple[float, float]:
+        current_balance = self.get_current_balance()
+        current_shares = self.get_current_shares()
+
+        if self.current_index <= self.window_size:
+            return current_balance, current_shares
+
+        rsi = self.rsi_history[-1]
+
         # TODO: Only buys/sells when these lines are CROSSED, because it can stay below for
         # extended periods of time
         # Trading logic: sell when overbought, buy when oversold
@@ -76,5 +86,4 @@ class RSIAlgorithm(TradingAlgorithm):
             if stock_price > 0:
                 current_shares += buying_amount / stock_price
 
-        self.balance_history.append(current_balance)
-        self.shares_history.append(current_shares)
+        return current_balance, current_shares
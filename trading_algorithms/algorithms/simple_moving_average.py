@@ -4,6 +4,8 @@ from algorithms.algorithm_class import TradingAlgorithm
 
 
 class SimpleMAAlgorithm(TradingAlgorithm):
+    indicator_state = {"ma_histories": 1}
+
     def __init__(self, starting_balance: float, starting_shares: float, trading_proportion: float = 1.0,
                  ma_lengths: list[int] = [8, 13, 21]):
         super().__init__(starting_balance, starting_shares)
@@ -14,11 +16,11 @@ class SimpleMAAlgorithm(TradingAlgorithm):
     
 
     @override
-    def give_data_point(self, stock_price: float):
-        super().give_data_point(stock_price)
+    def update_indicators(self, stock_price: float):
         for length, history in self.ma_histories.items():
             # Calculate new moving average
-            if len(history) <= length:
+            # len(history) <= length, counted without needing the whole history
+            if self.current_index - 1 <= length:
                 considered_history = self.seen_data_points[-length:]
                 considered_length = len(considered_history)
                 history.append(sum(considered_history) / considered_length)
@@ -30,6 +32,13 @@ class SimpleMAAlgorithm(TradingAlgorithm):
                 new_sma = history[-1] + (stock_price - self.seen_data_points[-1 - length]) / length
                 history.append(new_sma)
 
+    @override
+    def lookback(self) -> int:
+        # Each average drops the price `length` back
+        return max(self.ma_lengths) + 1
+
+    @override
+    def decide(self, stock_price: float) -> tuple[float, float]:
         current_balance = self.get_current_balance()
         current_shares = self.get_current_shares()
 
@@ -65,6 +74,5 @@ class SimpleMAAlgorithm(TradingAlgorithm):
                 current_balance -= buying_shares * stock_price
                 self.selling = True
 
-        self.balance_history.append(current_balance)
-        self.shares_history.append(current_shares)
+        return current_balance, current_shares
 
@@ -0,0 +1,81 @@
+from importlib import import_module
+from typing import override
+
+from algorithms.algorithm_class import TradingAlgorithm
+from algorithms.algorithm_factory import algorithm_create_by_name
+from algorithms.bars import BarAggregator
+
+
+class TrendFilteredAlgorithm(TradingAlgorithm):
+    """
+    Trades a base strategy's signals, but only buys while the longer term trend is up: the
+    latest close of bars of bar_length prices (5 trading days is about a week) above the
+    average close of the last trend_length bars. The base strategy trades its own book as
+    usual; its buys and sells are copied as the same fraction of this algorithm's balance/shares
+    """
+
+    def __init__(self, starting_balance: float, starting_shares: float, base_type: str = "SIMPLE_MA",
+                 base_params: list = [], bar_length: int = 5, trend_length: int = 10):
+        super().__init__(starting_balance, starting_shares)
+        self.base = algorithm_create_by_name(base_type, starting_balance, starting_shares, base_params)
+        self.bars = BarAggregator(bar_length)
+        self.trend_length = trend_length
+        self.bar_closes: list[float] = []
+        # Only worked out when a bar completes, not every price
+        self.trend_up: bool = False
+
+    @override
+    def update_indicators(self, stock_price: float):
+        bar = self.bars.update(stock_price)
+        if bar is None:
+            return
+        self.bar_closes.append(bar[3])
+        if len(self.bar_closes) > self.trend_length:
+            del self.bar_closes[0]
+        self.trend_up = len(self.bar_closes) == self.trend_length and \
+            self.bar_closes[-1] > sum(self.bar_closes) / self.trend_length
+
+    @override
+    def decide(self, stock_price: float) -> tuple[float, float]:
+        current_balance = self.get_current_balance()
+        current_shares = self.get_current_shares()
+
+        base_balance, base_shares = self.base.get_current_balance(), self.base.get_current_shares()
+        self.base.give_data_point(stock_price)
+        new_balance, new_shares = self.base.get_current_balance(), self.base.get_current_shares()
+
+        if new_shares > base_shares and base_balance > 0:
+            if self.trend_up:
+                spent = current_balance * min((base_balance - new_balance) / base_balance, 1.0)
+                current_shares += spent / stock_price
+                current_balance -= spent
+        elif new_shares < base_shares and base_shares > 0:
+            sold = current_shares * min((base_shares - new_shares) / base_shares, 1.0)
+            current_balance += sold * stock_price
+            current_shares -= sold
+
+        return current_balance, current_shares
+
+    @override
+    def get_state(self) -> dict:
+        state = super().get_state()
+        state["base"] = {
+            "module": type(self.base).__module__,
+            "class": type(self.base).__qualname__,
+            "state": self.base.get_state(),
+        }
+        state["bars"] = dict(vars(self.bars))
+        return state
+
+    @override
+    def set_state(self, state: dict):
+        state = dict(state)
+        base = state.pop("base")
+        bars = state.pop("bars")
+        super().set_state(state)
+
+        base_class = getattr(import_module(base["module"]), base["class"])
+        self.base = base_class.__new__(base_class)
+        self.base.set_state(base["state"])
+        self.bars = BarAggregator.__new__(BarAggregator)
+        vars(self.bars).update(bars)
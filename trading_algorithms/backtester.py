@@ -1,16 +1,8 @@
-import matplotlib.pyplot as plt
-import mpl_axes_aligner as mpl
-from typing import cast
 from algorithms.algorithm_class import TradingAlgorithm
 from algorithms.algorithm_factory import algorithm_create, AlgorithmTypes
 from data_parser import parse_csv
 from metrics import sharpe, max_drawdown, calmar, cagr, average_trade
 from algorithms.true_optimal import get_optimal_worth_history
-from algorithms.simple_moving_average import SimpleMAAlgorithm
-from algorithms.expo_moving_average import ExponentialMAAlgorithm
-from algorithms.bollinger import BollingerBandsAlgorithm
-from algorithms.rsi import RSIAlgorithm
-from ppo_ml_files.ml_grab import ppo_ml_algorithm
 
 
 def backtest(algorithm: TradingAlgorithm, data: list[float], print_results: bool = True):
@@ -27,6 +19,19 @@ def backtest(algorithm: TradingAlgorithm, data: list[float], print_results: bool
                 f"Total worth: {algorithm.get_current_worth(datum):.03f}")
 
 
+def algorithm_metrics(algorithm: TradingAlgorithm) -> dict[str, float]:
+    """
+    Metrics of a finished back test, as printed by main()
+    """
+    return {
+        "sharpe": sharpe(algorithm.worth_history),
+        "cagr": cagr(algorithm.worth_history),
+        "max_drawdown": max_drawdown(algorithm.worth_history),
+        "calmar": calmar(algorithm.worth_history),
+        "average_trade": average_trade(algorithm.worth_history, algorithm.balance_history),
+    }
+
+
 test_ml = False
 plot_out = True
 
@@ -39,129 +44,142 @@ sample_stocks = ["AAPL", "ANZ.AX", "BHP.AX"]
 
 testing_stocks = bullish_stocks
 
-for stock in testing_stocks:
-    data = parse_csv(stock.lower() + ".csv")
-    # data = data[::-1]  # Haha bearish go brrr
-    # data = data * 10
-    start_balance = 1000
-    start_shares = 0
-    true_optimal = get_optimal_worth_history(data, start_balance, start_shares)
-    start_value = round(start_balance + start_shares * data[0], 3)
-
-    fig, stock_axes = plt.subplots()
-    # fig, (stock_axes, rsi_axes) = plt.subplots(2, 1, sharex=True,
-    #                                           gridspec_kw={"height_ratios": [3, 1]}, figsize=(10, 6))
-    plt.title(stock)
-    plt.xlabel("Days since start")
-    stock_axes.set_ylabel("Stock Value")
-    stock_axes.plot(data, 'k-+', label="Stock Price")
-    stock_axes.set_xlim(0, len(data) - 1)
-
-    # rsi_axes.set_xlabel("Days since start")
-    # rsi_axes.set_ylabel("RSI")
-    # rsi_axes.set_ylim(0, 100)
-    # rsi_axes.set_xlim(0, len(data) - 1)
-
-    print(f"\n=== {stock} ===")
-
-    greedy_long = algorithm_create(AlgorithmTypes.MAXIMALLY_GREEDY, start_balance, start_shares)
-    greedy_alt_long = algorithm_create(AlgorithmTypes.MAXIMALLY_GREEDY, start_balance, start_shares, [0.5, True])
-    random_long = algorithm_create(AlgorithmTypes.RANDOM_CHOICE, start_balance, start_shares, [0.3, (0.4, 0.4)])
-    best_after_long = algorithm_create(AlgorithmTypes.BEST_AFTER_N, start_balance, start_shares)
-    simple_ma_long = algorithm_create(AlgorithmTypes.SIMPLE_MA, start_balance, start_shares, [1.0, (5, 21)])
-    expo_ma_long = algorithm_create(AlgorithmTypes.EXPONENTIAL_MA, start_balance, start_shares, [1.0, (10, 20, 50)])
-    bb_1std = algorithm_create(AlgorithmTypes.BBANDS, start_balance, start_shares, (20, 1.0))
-    bb_2std = algorithm_create(AlgorithmTypes.BBANDS, start_balance, start_shares, (20, 2.0))
-    rsi_algo = algorithm_create(AlgorithmTypes.RSI, start_balance, start_shares, (50,))
-
-    algo_axes = stock_axes.twinx()
-    algo_axes.set_ylabel("Worth history")
-
-
-    def run_backtest(algorithm, name):
-        backtest(algorithm, data, False)
-        print('#', name)
-        print(
-            f"Balance: {start_balance} -> {algorithm.get_current_balance():.03f}\n"
-            f"Shares:  {start_shares} -> {algorithm.get_current_shares():.03f}   (at {data[-1]:.03f} each)\n"
-            f"TWorth:  {start_value} ({data[0]:.03f}) -> {algorithm.get_current_worth(data[-1]):.03f}\n"
-            f"Yearly Sharpe Ratio: {sharpe(algorithm.worth_history)}\n"
-            f"CAGR: {cagr(algorithm.worth_history)}\n"
-            f"Max Drawdown: {max_drawdown(algorithm.worth_history)}\n"
-            f"Calmar Ratio: {calmar(algorithm.worth_history)}\n"
-            f"Average Trade: {average_trade(algorithm.worth_history, algorithm.balance_history)}\n")
-
-
-    algs = [
-        (greedy_long, "GREEDY"),
-        (greedy_alt_long, "GREEDY (ALT)"),
-        (random_long, "RANDOM"),
-        (best_after_long, "BEST AFTER 10"),
-        (simple_ma_long, "SIMPLE MA (5, 21)"),
-        (expo_ma_long, "EXPO MA (10, 20, 50)"),
-        (bb_1std, "BOLLINGER 1STD"),
-        (bb_2std, "BOLLINGER 2STD"),
-        (rsi_algo, "RSI"),
-    ]
-
-    for alg in algs:
-        run_backtest(*alg[:2])
-        final_point = alg[0].get_current_worth(data[-1])
-        final_data = alg[0].get_worth_history() + [final_point]
-        algo_axes.plot(final_data, linestyle="--", label=alg[1])
-
-    # ---------------------- PLOTTING INDICATORS ----------------------
-
-    stock_axes_legend = ["Stock Value"]
-    # for length, history in cast(SimpleMAAlgorithm, simple_ma_long).ma_histories.items():
-    #     stock_axes.plot(history, label=f"SMA ({length})")
-    # for length, history in cast(ExponentialMAAlgorithm, expo_ma_long).ma_histories.items():
-    #     stock_axes.plot(history, label=f"EMA ({length})")
-    
-    # stock_axes.plot(bb_1std.upper_band_history, label="Bollinger Upper (1 STD)")
-    # stock_axes.plot(bb_1std.lower_band_history, label="Bollinger Lower (1 STD)")
-
-
-    # rsi_algo = cast(RSIAlgorithm, rsi_algo)
-    # rsi_axes.plot(rsi_algo.rsi_history, label="RSI")
-    # # Draw common RSI threshold lines
-    # rsi_axes.axhline(rsi_algo.overbought, color="red", linestyle="--", linewidth=0.7, label="Overbought")
-    # rsi_axes.axhline(rsi_algo.oversold, color="green", linestyle="--", linewidth=0.7, label="Oversold")
-    # rsi_axes.legend(loc="lower right")
-
-    # ---------------------------------------------------------------
-
-
-    if test_ml:
-        # PPO ML Attempt
-        ppo_data, ppo_long = ppo_ml_algorithm(stock.upper(), start_balance, time_period="5y", interval="1d", model="final_model", plot_graphs=False)
-
-        data_len_discrepancy = len(data) - len(ppo_data)
-        ppo_plot_data = [start_balance] * data_len_discrepancy + ppo_data
-        algo_axes.plot(ppo_plot_data, color="cyan", linestyle="--", label="PPO ML")
-
-        # algo_axes.plot(ppo_data)
-        print(
-            f"# PPO-ML\n"
-            f"Balance: {ppo_long.initial_balance} -> {ppo_long.balance:.03f}\n"
-            f"Shares:  0 -> {ppo_long.shares_held:.03f}   (at {data[-1]:.03f} each)\n"
-            f"TWorth:  {ppo_long.initial_balance} ({data[0]:.03f}) -> {ppo_data[-1]:.03f}\n"
-            f"Yearly Sharpe Ratio: {sharpe(ppo_data)}\n"
-            f"CAGR: {cagr(ppo_data)}\n"
-            f"Max Drawdown: {max_drawdown(ppo_data)}\n"
-            f"Calmar Ratio: {calmar(ppo_data)}\n"
-            # f"Average Trade: {average_trade(ppo_data, ppo_bal_history)}\n"
-            f"Average Trade: 0\n"  # Currently not working
-        )
-
-
-    # Finishing plotting
-    algo_axes.legend(loc="upper left")
-    stock_axes.legend(loc="lower left")
-
-    if plot_out:
-        plt.tight_layout()
-        first_worth = start_balance + data[0] * start_shares
-        mpl.align.yaxes(stock_axes, data[0], algo_axes, first_worth, 0.2)
-        plt.show()
 
+def main():
+    # Plotting (and the ML stack below) are heavy, so only imported once actually needed
+    import matplotlib.pyplot as plt
+    import mpl_axes_aligner as mpl
+    from render import lttb, DEFAULT_MAX_POINTS, MARKER_LIMIT
+
+    for stock in testing_stocks:
+        data = parse_csv(stock.lower() + ".csv")
+        # data = data[::-1]  # Haha bearish go brrr
+        # data = data * 10
+        start_balance = 1000
+        start_shares = 0
+        true_optimal = get_optimal_worth_history(data, start_balance, start_shares)
+        start_value = round(start_balance + start_shares * data[0], 3)
+
+        fig, stock_axes = plt.subplots()
+        # fig, (stock_axes, rsi_axes) = plt.subplots(2, 1, sharex=True,
+        #                                           gridspec_kw={"height_ratios": [3, 1]}, figsize=(10, 6))
+        plt.title(stock)
+        plt.xlabel("Days since start")
+        stock_axes.set_ylabel("Stock Value")
+        stock_axes.plot(*lttb(range(len(data)), data, DEFAULT_MAX_POINTS),
+                        'k-+' if len(data) <= MARKER_LIMIT else 'k-', label="Stock Price")
+        stock_axes.set_xlim(0, len(data) - 1)
+
+        # rsi_axes.set_xlabel("Days since start")
+        # rsi_axes.set_ylabel("RSI")
+        # rsi_axes.set_ylim(0, 100)
+        # rsi_axes.set_xlim(0, len(data) - 1)
+
+        print(f"\n=== {stock} ===")
+
+        greedy_long = algorithm_create(AlgorithmTypes.MAXIMALLY_GREEDY, start_balance, start_shares)
+        greedy_alt_long = algorithm_create(AlgorithmTypes.MAXIMALLY_GREEDY, start_balance, start_shares, [0.5, True])
+        random_long = algorithm_create(AlgorithmTypes.RANDOM_CHOICE, start_balance, start_shares, [0.3, (0.4, 0.4)])
+        best_after_long = algorithm_create(AlgorithmTypes.BEST_AFTER_N, start_balance, start_shares)
+        simple_ma_long = algorithm_create(AlgorithmTypes.SIMPLE_MA, start_balance, start_shares, [1.0, (5, 21)])
+        expo_ma_long = algorithm_create(AlgorithmTypes.EXPONENTIAL_MA, start_balance, start_shares, [1.0, (10, 20, 50)])
+        bb_1std = algorithm_create(AlgorithmTypes.BBANDS, start_balance, start_shares, (20, 1.0))
+        bb_2std = algorithm_create(AlgorithmTypes.BBANDS, start_balance, start_shares, (20, 2.0))
+        rsi_algo = algorithm_create(AlgorithmTypes.RSI, start_balance, start_shares, (50,))
+
+        algo_axes = stock_axes.twinx()
+        algo_axes.set_ylabel("Worth history")
+
+
+        def run_backtest(algorithm, name):
+            backtest(algorithm, data, False)
+            print('#', name)
+            print(
+                f"Balance: {start_balance} -> {algorithm.get_current_balance():.03f}\n"
+                f"Shares:  {start_shares} -> {algorithm.get_current_shares():.03f}   (at {data[-1]:.03f} each)\n"
+                f"TWorth:  {start_value} ({data[0]:.03f}) -> {algorithm.get_current_worth(data[-1]):.03f}\n"
+                f"Yearly Sharpe Ratio: {sharpe(algorithm.worth_history)}\n"
+                f"CAGR: {cagr(algorithm.worth_history)}\n"
+                f"Max Drawdown: {max_drawdown(algorithm.worth_history)}\n"
+                f"Calmar Ratio: {calmar(algorithm.worth_history)}\n"
+                f"Average Trade: {average_trade(algorithm.worth_history, algorithm.balance_history)}\n")
+
+
+        algs = [
+            (greedy_long, "GREEDY"),
+            (greedy_alt_long, "GREEDY (ALT)"),
+            (random_long, "RANDOM"),
+            (best_after_long, "BEST AFTER 10"),
+            (simple_ma_long, "SIMPLE MA (5, 21)"),
+            (expo_ma_long, "EXPO MA (10, 20, 50)"),
+            (bb_1std, "BOLLINGER 1STD"),
+            (bb_2std, "BOLLINGER 2STD"),
+            (rsi_algo, "RSI"),
+        ]
+
+        for alg in algs:
+            run_backtest(*alg[:2])
+            final_point = alg[0].get_current_worth(data[-1])
+            final_data = alg[0].get_worth_history() + [final_point]
+            algo_axes.plot(*lttb(range(len(final_data)), final_data, DEFAULT_MAX_POINTS), linestyle="--", label=alg[1])
+
+        # ---------------------- PLOTTING INDICATORS ----------------------
+
+        stock_axes_legend = ["Stock Value"]
+        # Uncommenting these needs `from typing import cast` and the algorithm classes imported here
+        # for length, history in cast(SimpleMAAlgorithm, simple_ma_long).ma_histories.items():
+        #     stock_axes.plot(history, label=f"SMA ({length})")
+        # for length, history in cast(ExponentialMAAlgorithm, expo_ma_long).ma_histories.items():
+        #     stock_axes.plot(history, label=f"EMA ({length})")
+
+        # stock_axes.plot(bb_1std.upper_band_history, label="Bollinger Upper (1 STD)")
+        # stock_axes.plot(bb_1std.lower_band_history, label="Bollinger Lower (1 STD)")
+
+
+        # rsi_algo = cast(RSIAlgorithm, rsi_algo)
+        # rsi_axes.plot(rsi_algo.rsi_history, label="RSI")
+        # # Draw common RSI threshold lines
+        # rsi_axes.axhline(rsi_algo.overbought, color="red", linestyle="--", linewidth=0.7, label="Overbought")
+        # rsi_axes.axhline(rsi_algo.oversold, color="green", linestyle="--", linewidth=0.7, label="Oversold")
+        # rsi_axes.legend(loc="lower right")
+
+        # ---------------------------------------------------------------
+
+
+        if test_ml:
+            # PPO ML Attempt
+            from ppo_ml_files.ml_grab import ppo_ml_algorithm
+            ppo_data, ppo_long = ppo_ml_algorithm(stock.upper(), start_balance, time_period="5y", interval="1d", model="final_model", plot_graphs=False)
+
+            data_len_discrepancy = len(data) - len(ppo_data)
+            ppo_plot_data = [start_balance] * data_len_discrepancy + ppo_data
+            algo_axes.plot(*lttb(range(len(ppo_plot_data)), ppo_plot_data, DEFAULT_MAX_POINTS), color="cyan", linestyle="--", label="PPO ML")
+
+            # algo_axes.plot(ppo_data)
+            print(
+                f"# PPO-ML\n"
+                f"Balance: {ppo_long.initial_balance} -> {ppo_long.balance:.03f}\n"
+                f"Shares:  0 -> {ppo_long.shares_held:.03f}   (at {data[-1]:.03f} each)\n"
+                f"TWorth:  {ppo_long.initial_balance} ({data[0]:.03f}) -> {ppo_data[-1]:.03f}\n"
+                f"Yearly Sharpe Ratio: {sharpe(ppo_data)}\n"
+                f"CAGR: {cagr(ppo_data)}\n"
+                f"Max Drawdown: {max_drawdown(ppo_data)}\n"
+                f"Calmar Ratio: {calmar(ppo_data)}\n"
+                # f"Average Trade: {average_trade(ppo_data, ppo_bal_history)}\n"
+                f"Average Trade: 0\n"  # Currently not working
+            )
+
+
+        # Finishing plotting
+        algo_axes.legend(loc="upper left")
+        stock_axes.legend(loc="lower left")
+
+        if plot_out:
+            plt.tight_layout()
+            first_worth = start_balance + data[0] * start_shares
+            mpl.align.yaxes(stock_axes, data[0], algo_axes, first_worth, 0.2)
+            plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# Headless batch back tests driven by a config file, for scheduled/production runs
+# python3 batch_runner.py <CONFIG> [--workers N] [--output-dir DIR] [--no-figures]
+# e.g. python3 batch_runner.py configs/sample.json
+#
+# Config (JSON):
+#   tickers:        stocks to test, as named in data/
+#   algorithms:     [{"name": ..., "type": <registered strategy, e.g. an AlgorithmTypes name>, "params": [...]}]
+#   data_dir:       defaults to "data"
+#   start_date, end_date:   optional ISO dates (inclusive) to cut each series to
+#   start_balance, start_shares:    default 1000 and 0
+#   output_dir:     where results.csv, results.txt and figures are written
+#   figures:        whether to save a png per ticker (default false)
+#   workers:        parallel processes (default 1)
+#   profile:        whether to time each algorithm phase and write profile_<ticker>.json (default false)
+#   store:          whether to also stream every result into a result store, <output_dir>/store,
+#                   as each ticker finishes (default false; see result_store.py)
+#   history_points: points of each worth history the store keeps, downsampled (default 0: none)
+
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from os.path import join
+
+from profiling import Profiler
+
+RESULT_FIELDS = ["ticker", "algorithm", "start_price", "end_price", "start_balance", "start_shares", "start_worth", "final_worth", "final_balance", "final_shares",
+                 "sharpe", "cagr", "max_drawdown", "calmar", "average_trade"]
+
+
+def load_config(path: str) -> dict:
+    with open(path) as INPUT:
+        config = json.load(INPUT)
+
+    config.setdefault("data_dir", "data")
+    config.setdefault("start_date", None)
+    config.setdefault("end_date", None)
+    config.setdefault("start_balance", 1000)
+    config.setdefault("start_shares", 0)
+    config.setdefault("output_dir", "results/batch")
+    config.setdefault("figures", False)
+    config.setdefault("workers", 1)
+    config.setdefault("profile", False)
+    config.setdefault("store", False)
+    config.setdefault("history_points", 0)
+
+    if not config.get("tickers"):
+        raise ValueError(f"{path}: no tickers given")
+    if not config.get("algorithms"):
+        raise ValueError(f"{path}: no algorithms given")
+    return config
+
+
+def _load_prices(stock: str, config: dict) -> list[float]:
+    from data_parser import get_stock_data
+
+    start = date.fromisoformat(config["start_date"]) if config["start_date"] else date.min
+    end = date.fromisoformat(config["end_date"]) if config["end_date"] else date.max
+    return [value for day, value in get_stock_data(stock, config["data_dir"]) if start <= day <= end]
+
+
+def run_ticker(stock: str, config: dict) -> list[dict]:
+    """
+    Back test every configured algorithm on one stock; returns one result row per algorithm
+    """
+    return _run_ticker(stock, config)[0]
+
+
+def _run_ticker(stock: str, config: dict) -> tuple[list[dict], list[list[float]]]:
+    # The result rows, and each algorithm's worth history
+    from algorithms.algorithm_factory import algorithm_create_by_name
+    from backtester import algorithm_metrics, backtest
+
+    data = _load_prices(stock, config)
+    if len(data) < 2:
+        raise ValueError(f"{stock}: not enough data between {config['start_date']} and {config['end_date']}")
+
+    start_balance = config["start_balance"]
+    start_shares = config["start_shares"]
+    profiler = Profiler() if config["profile"] else None
+    rows = []
+    worths = []
+    for spec in config["algorithms"]:
+        algorithm = algorithm_create_by_name(spec["type"], start_balance, start_shares, spec.get("params", []))
+        name = spec.get("name", spec["type"])
+        if profiler is not None:
+            profiler.attach(algorithm, name)
+        backtest(algorithm, data, False)
+        rows.append({
+            "ticker": stock,
+            "algorithm": name,
+            "start_price": data[0],
+            "end_price": data[-1],
+            "start_balance": start_balance,
+            "start_shares": start_shares,
+            "start_worth": start_balance + start_shares * data[0],
+            "final_worth": algorithm.get_current_worth(data[-1]),
+            "final_balance": algorithm.get_current_balance(),
+            "final_shares": algorithm.get_current_shares(),
+            **algorithm_metrics(algorithm),
+        })
+        worths.append((name, algorithm.get_worth_history() + [algorithm.get_current_worth(data[-1])]))
+
+    if profiler is not None:
+        profiler.write_report(join(config["output_dir"], f"profile_{stock.lower()}.json"))
+    if config["figures"]:
+        from render import render_backtest_figure
+        render_backtest_figure(stock, data, worths, join(config["output_dir"], stock.lower() + ".png"))
+    # Histories are only sent back if they're going to be stored
+    keep = config["store"] and config["history_points"]
+    return rows, [history if keep else None for _, history in worths]
+
+
+def _write_text(rows, path: str):
+    # Same layout as backtester.py prints, so results/get_stats.sh works on it
+    with open(path, "w") as OUTPUT:
+        ticker = None
+        for row in rows:
+            if row["ticker"] != ticker:
+                ticker = row["ticker"]
+                OUTPUT.write(f"\n=== {ticker} ===\n")
+            OUTPUT.write(
+                f"# {row['algorithm']}\n"
+                f"Balance: {row['start_balance']} -> {row['final_balance']:.03f}\n"
+                f"Shares:  {row['start_shares']} -> {row['final_shares']:.03f}   (at {row['end_price']:.03f} each)\n"
+                f"TWorth:  {round(row['start_worth'], 3)} ({row['start_price']:.03f}) -> {row['final_worth']:.03f}\n"
+                f"Yearly Sharpe Ratio: {row['sharpe']}\n"
+                f"CAGR: {row['cagr']}\n"
+                f"Max Drawdown: {row['max_drawdown']}\n"
+                f"Calmar Ratio: {row['calmar']}\n"
+                f"Average Trade: {row['average_trade']}\n\n")
+
+
+def result_types(config: dict) -> dict[str, str]:
+    """
+    Store types (see result_store.py) of the result fields that aren't floats
+    """
+    # Starting holdings are as given in the config, so they're the same type in every row
+    types = {"ticker": "str", "algorithm": "str"}
+    for field in ["start_balance", "start_shares"]:
+        types[field] = "int" if isinstance(config[field], int) else "float"
+    return types
+
+
+def run_batch(config: dict) -> int:
+    """
+    Back test every ticker and write the results; returns how many there are
+    """
+    os.makedirs(config["output_dir"], exist_ok=True)
+    tickers = config["tickers"]
+    store = None
+    if config["store"]:
+        from result_store import ResultWriter, read_rows
+        store = ResultWriter(join(config["output_dir"], "store"), RESULT_FIELDS, history_points=config["history_points"],
+                             types=result_types(config))
+
+    # With a store, rows go straight to it and the csv, and results.txt is written from the store,
+    # so a big campaign's results are never all in memory at once
+    rows = [] if store is None else None
+    count = 0
+    executor = ProcessPoolExecutor(max_workers=config["workers"]) if config["workers"] > 1 else None
+    try:
+        with open(join(config["output_dir"], "results.csv"), "w", newline="") as OUTPUT:
+            writer = csv.DictWriter(OUTPUT, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            # Results come back (in ticker order) as they finish, so they're written straight away
+            results = executor.map(_run_ticker, tickers, [config] * len(tickers)) if executor else \
+                (_run_ticker(stock, config) for stock in tickers)
+            for ticker_rows, histories in results:
+                writer.writerows(ticker_rows)
+                count += len(ticker_rows)
+                if store is None:
+                    rows.extend(ticker_rows)
+                else:
+                    for row, history in zip(ticker_rows, histories):
+                        store.append(row, history)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if store is not None:
+            store.close()
+
+    _write_text(rows if store is None else read_rows(store.store_dir), join(config["output_dir"], "results.txt"))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run back tests headlessly from a config file")
+    parser.add_argument("config")
+    parser.add_argument("--workers", type=int, help="Override the config's worker count")
+    parser.add_argument("--output-dir", help="Override the config's output directory")
+    parser.add_argument("--no-figures", action="store_true", help="Skip saving figures")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.workers is not None:
+        config["workers"] = args.workers
+    if args.output_dir is not None:
+        config["output_dir"] = args.output_dir
+    if args.no_figures:
+        config["figures"] = False
+
+    print(f"Wrote {run_batch(config)} results to {config['output_dir']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# Throughput benchmarks for every algorithm, the metrics, data loading and the PPO environment
+# python3 benchmark.py [--sizes 1000,10000,...] [--windows 14,50,200] [--label NAME] [--compare OLD.json]
+# e.g. python3 benchmark.py --sizes 1000,10000,100000,1000000,10000000 --no-memory
+#
+# Results are written to results/benchmarks/<label>.json (label defaults to the git commit)
+# so runs of different versions can be compared with --compare.
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from glob import glob
+from os.path import basename, join
+from typing import Callable
+
+from algorithms.algorithm_factory import algorithm_create, AlgorithmTypes
+from data_parser import get_stock_data, parse_csv
+from metrics import sharpe, max_drawdown, cagr, calmar, average_trade
+from synthetic import gbm
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_WINDOWS = [14, 50, 200]
+# Environment steps cost the same however long the episode (about 40us each), so every default
+# size is covered; the cap only keeps much bigger custom sizes from spending minutes in the
+# environment, which steps far slower than the algorithms
+DEFAULT_ENV_MAX_STEPS = 100000
+
+
+def _algorithm_cases(windows: list[int]) -> dict[str, Callable]:
+    cases = {t.name: lambda t=t: algorithm_create(t, 1000, 0) for t in AlgorithmTypes if t != AlgorithmTypes.OTHER}
+    for w in windows:
+        cases[f"SIMPLE_MA (5, {w})"] = lambda w=w: algorithm_create(AlgorithmTypes.SIMPLE_MA, 1000, 0, [1.0, (5, w)])
+        cases[f"BBANDS ({w})"] = lambda w=w: algorithm_create(AlgorithmTypes.BBANDS, 1000, 0, [w])
+        cases[f"RSI ({w})"] = lambda w=w: algorithm_create(AlgorithmTypes.RSI, 1000, 0, [w])
+        cases[f"BEST_AFTER_N ({w})"] = lambda w=w: algorithm_create(AlgorithmTypes.BEST_AFTER_N, 1000, 0, [w])
+    return cases
+
+
+def _run_algorithm(create: Callable, data: list[float]):
+    algorithm = create()
+    for datum in data:
+        algorithm.give_data_point(datum)
+
+
+def _measure(run: Callable, n: int, memory: bool) -> dict:
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    result = {"n": n, "seconds": seconds, "ticks_per_sec": n / seconds if seconds > 0 else math.inf}
+
+    if memory:
+        # Separate pass, since tracing slows everything down
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_mb"] = peak / 2**20
+    return result
+
+
+def _environment_step_runner(n: int) -> Callable | None:
+    try:
+        import numpy as np
+        from ppo_ml_files.environmentcreator import EnhancedStockTradingEnvironment
+    except ImportError:
+        return None
+
+    features = 20
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((n + 60, features)).astype(np.float32)
+    # (n, 60, features) windows as a view, rather than 60 copies of every row
+    states = np.lib.stride_tricks.sliding_window_view(matrix, 60, axis=0).transpose(0, 2, 1)[:n + 1]
+    rl_data = {"BENCH": {"states": states, "rewards": np.zeros(n + 1), "dates": list(range(n + 1))}}
+
+    def run():
+        env = EnhancedStockTradingEnvironment(rl_data, "BENCH", enable_logging=False)
+        env.reset(seed=0)
+        action_rng = np.random.default_rng(0)
+        done = False
+        while not done:
+            _, _, done, _, _ = env.step(action_rng.uniform([0, 0], [2, 1]))
+    return run
+
+
+def run_benchmarks(sizes: list[int], windows: list[int], memory: bool = True,
+                   env_max_steps: int = DEFAULT_ENV_MAX_STEPS, data_dir: str = "data") -> dict[str, list[dict]]:
+    results: dict[str, list[dict]] = {}
+
+    def record(case: str, result: dict):
+        results.setdefault(case, []).append(result)
+        peak = f"{result['peak_mb']:9.2f} MB" if "peak_mb" in result else ""
+        print(f"{case:28} {result['n']:>10} {result['ticks_per_sec']:>14.0f}/s {peak}", flush=True)
+
+    # Data loading over every real file
+    files = sorted(basename(path) for path in glob(join(data_dir, "*.csv")))
+    rows = sum(len(parse_csv(f, data_dir)) for f in files)
+    record("LOAD parse_csv", _measure(lambda: [parse_csv(f, data_dir) for f in files], rows, memory))
+    record("LOAD get_stock_data", _measure(lambda: [get_stock_data(f[:-len(".csv")], data_dir) for f in files], rows, memory))
+
+    cases = _algorithm_cases(windows)
+
+    # Every algorithm over all of the real data, one file at a time
+    real_data = [parse_csv(f, data_dir) for f in files]
+    for case, create in cases.items():
+        record(f"{case} [real]", _measure(lambda: [_run_algorithm(create, data) for data in real_data], rows, memory))
+
+    for n in sizes:
+        data = gbm(1, n, seed=0)[0].tolist()
+        for case, create in cases.items():
+            record(case, _measure(lambda: _run_algorithm(create, data), n, memory))
+
+        record("METRIC sharpe", _measure(lambda: sharpe(data), n, memory))
+        record("METRIC max_drawdown", _measure(lambda: max_drawdown(data), n, memory))
+        record("METRIC cagr", _measure(lambda: cagr(data), n, memory))
+        record("METRIC calmar", _measure(lambda: calmar(data), n, memory))
+        record("METRIC average_trade", _measure(lambda: average_trade(data, data), n, memory))
+
+        if n <= env_max_steps:
+            run = _environment_step_runner(n)
+            if run is None:
+                print("Skipping PPO environment: gymnasium/numpy not installed")
+                env_max_steps = 0
+            else:
+                record("PPO env step", _measure(run, n, memory))
+
+    return results
+
+
+def scaling_exponents(results: dict[str, list[dict]]) -> dict[str, float]:
+    """
+    Slope of log(time) against log(n): ~1 is linear, ~2 quadratic
+    """
+    exponents = {}
+    for case, runs in results.items():
+        points = [(math.log(r["n"]), math.log(r["seconds"])) for r in runs if r["seconds"] > 0]
+        if len(points) < 2:
+            continue
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        spread = sum((x - mean_x) ** 2 for x, _ in points)
+        if spread > 0:
+            exponents[case] = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+    return exponents
+
+
+def compare(old: dict, new: dict):
+    print(f"\n=== {new['label']} vs {old['label']} (ticks/sec ratio) ===")
+    for case, runs in new["results"].items():
+        old_runs = {r["n"]: r for r in old["results"].get(case, [])}
+        for run in runs:
+            if run["n"] in old_runs:
+                ratio = run["ticks_per_sec"] / old_runs[run["n"]]["ticks_per_sec"]
+                print(f"{case:28} {run['n']:>10} {ratio:8.2f}x")
+
+
+def _default_label() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark algorithm, metric, loading and environment throughput")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma separated synthetic series lengths")
+    parser.add_argument("--windows", default=",".join(map(str, DEFAULT_WINDOWS)), help="Comma separated window sizes")
+    parser.add_argument("--env-max-steps", type=int, default=DEFAULT_ENV_MAX_STEPS)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the (slow) peak memory pass")
+    parser.add_argument("--label", default=None, help="Name for the results file (default: git commit)")
+    parser.add_argument("--output-dir", default=join("results", "benchmarks"))
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    windows = [int(w) for w in args.windows.split(",")]
+    results = run_benchmarks(sizes, windows, not args.no_memory, args.env_max_steps)
+    exponents = scaling_exponents(results)
+
+    print("\n=== Scaling (time ~ n^k) ===")
+    for case, k in exponents.items():
+        print(f"{case:28} k = {k:.2f}")
+
+    output = {
+        "label": args.label or _default_label(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "sizes": sizes,
+        "windows": windows,
+        "results": results,
+        "scaling": exponents,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = join(args.output_dir, output["label"] + ".json")
+    with open(path, "w") as OUTPUT:
+        json.dump(output, OUTPUT, indent=2)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        with open(args.compare) as INPUT:
+            compare(json.load(INPUT), output)
+
+
+if __name__ == "__main__":
+    main()
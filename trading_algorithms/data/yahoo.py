@@ -1,4 +1,12 @@
-import yfinance
+# Refreshes the csvs in this directory from Yahoo Finance.
+# Existing files only get the rows after their last date; new stocks get 5 years
+
+import sys
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+from data_sources import YahooDataSource
+from refresh import refresh_stock
 
 stuffs = [
     "AAPL", "MSFT", "AMZN", "NVDA", "BTC-USD",
@@ -10,24 +18,7 @@ stuffs = [
     "QAN.AX", "ASX.AX"
 ]
 
+source = YahooDataSource(period="5y")
 for stock in stuffs:
-    ticker = yfinance.Ticker(stock)
-    historical_data = ticker.history(period="5y")
-    data = historical_data.to_csv(date_format="%d/%m/%Y")
-
-    # imagine having the data in DataFrame form, then just doing
-    # text processing on its CSV output.
-    output = []
-    for line in data.strip().split('\n'):
-        line = line.strip()
-        if line.startswith("Date"):
-            output.append("Date,Value")
-            continue
-        components = line.split(',')
-        key_points = (float(x) for x in components[1:5])
-        output.append(components[0] + ',' + str(sum(key_points) / 4))
-
-    fileout = stock.lower() + ".csv"
-    with open(fileout, "w") as OUTPUT:
-        OUTPUT.write('\n'.join(output))
-
+    new_rows = refresh_stock(stock, source, dirname(abspath(__file__)))
+    print(f"{stock}: {len(new_rows)} new rows")
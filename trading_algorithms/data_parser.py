@@ -1,25 +1,72 @@
 # Reads csv stock data and turns it into sequence of floats
 
+import os
 from os.path import join
 from datetime import date, datetime
 
+DATE_FORMAT = "%d/%m/%Y"
+# Full daily bars (for the PPO features) live in <data_dir>/ohlcv/<stock>.csv, with this header
+OHLCV_DIR = "ohlcv"
+OHLCV_HEADER = "Date,Open,High,Low,Close,Volume"
 
-def get_stock_data(stockname: str) -> list[tuple[date, float]]:
+
+def get_stock_data(stockname: str, data_dir: str = "data") -> list[tuple[date, float]]:
     lines: list[tuple[date, float]] = []
-    with open(join("data", stockname.lower() + ".csv")) as INPUT:
+    with open(join(data_dir, stockname.lower() + ".csv")) as INPUT:
         for line in INPUT.readlines()[1:]:
             parts = line.split(',')
-            found_date = datetime.strptime(parts[0], "%d/%m/%Y").date()
+            found_date = datetime.strptime(parts[0], DATE_FORMAT).date()
             lines.append((found_date, float(parts[1])))
 
     return lines
 
 
-def parse_csv(filename: str) -> list[float]:
+def parse_csv(filename: str, data_dir: str = "data") -> list[float]:
     lines: list[float] = []
-    with open(join("data", filename)) as INPUT:
+    with open(join(data_dir, filename)) as INPUT:
         for line in INPUT.readlines()[1:]:
             lines.append(float(line.split(',')[1]))
 
     return lines
 
+
+def get_last_date(stockname: str, data_dir: str = "data") -> date | None:
+    """
+    Date of the last row in a stock's csv, read from the end of the file.
+    None if the file doesn't exist or has no rows yet
+    """
+    path = join(data_dir, stockname.lower() + ".csv")
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as INPUT:
+        INPUT.seek(0, os.SEEK_END)
+        size = INPUT.tell()
+        # Rows are short, so the last 1KB always holds the final line
+        INPUT.seek(max(0, size - 1024))
+        tail = INPUT.read().decode("utf-8-sig")
+
+    lines = [line for line in tail.splitlines() if line.strip()]
+    if not lines or lines[-1].startswith("Date"):
+        return None
+    return datetime.strptime(lines[-1].split(',')[0], DATE_FORMAT).date()
+
+
+def append_stock_data(stockname: str, rows: list[tuple], data_dir: str = "data", header: str = "Date,Value"):
+    """
+    Append rows (a date, then the values for the rest of the header) to a stock's csv,
+    creating it (with header) if needed
+    """
+    path = join(data_dir, stockname.lower() + ".csv")
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        os.makedirs(data_dir, exist_ok=True)
+        prefix = header + "\n"
+    else:
+        # Older files were written without a trailing newline
+        with open(path, "rb") as INPUT:
+            INPUT.seek(-1, os.SEEK_END)
+            prefix = "" if INPUT.read() == b"\n" else "\n"
+
+    with open(path, "a") as OUTPUT:
+        OUTPUT.write(prefix + "\n".join(f"{row[0].strftime(DATE_FORMAT)}," + ",".join(str(value) for value in row[1:])
+                                        for row in rows) + "\n")
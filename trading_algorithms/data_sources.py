@@ -0,0 +1,68 @@
+# Pluggable sources of new price rows for the csvs in data/
+
+from datetime import date, datetime, timedelta
+from typing import Protocol
+
+from data_parser import get_stock_data
+
+
+class DataSource(Protocol):
+    def fetch(self, stockname: str, after: date | None) -> list[tuple[date, float]]:
+        """
+        Rows strictly after `after` (or the full history if None), oldest first
+        """
+        ...
+
+
+def bar_values(bars: list[tuple[date, float, float, float, float, float]]) -> list[tuple[date, float]]:
+    """
+    data/ rows of (date, open, high, low, close, volume) bars: each day valued at the average
+    of its open, high, low and close
+    """
+    return [(day, (open_ + high + low + close) / 4) for day, open_, high, low, close, _ in bars]
+
+
+class YahooDataSource:
+    """
+    Rows from Yahoo Finance, valued at the average of open, high, low and close
+    (fetch_bars gives the full bars). Only finished days are returned
+    """
+    def __init__(self, period: str = "5y"):
+        # Only used for tickers that have no csv yet
+        self.period = period
+
+    def fetch(self, stockname: str, after: date | None) -> list[tuple[date, float]]:
+        return bar_values(self.fetch_bars(stockname, after))
+
+    def fetch_bars(self, stockname: str, after: date | None) -> list[tuple[date, float, float, float, float, float]]:
+        """
+        Full (date, open, high, low, close, volume) bars strictly after `after`, oldest first
+        """
+        import yfinance  # Only needed when actually going to the network
+
+        ticker = yfinance.Ticker(stockname.upper())
+        if after is None:
+            history = ticker.history(period=self.period)
+        else:
+            history = ticker.history(start=after + timedelta(days=1))
+        if history.empty:
+            return []
+
+        # Today's bar (in the exchange's time zone) may still be trading. Once appended it's never
+        # fetched again, so it's left for a refresh after the day is over
+        today = datetime.now(history.index.tz).date()
+        bars = history[["Open", "High", "Low", "Close", "Volume"]]
+        rows = [(timestamp.date(), *map(float, values)) for timestamp, values in zip(bars.index, bars.to_numpy())]
+        return [row for row in rows if (after is None or row[0] > after) and row[0] < today]
+
+
+class LocalDataSource:
+    """
+    Offline stand-in: serves rows from another directory of csvs in the data/ format
+    """
+    def __init__(self, source_dir: str):
+        self.source_dir = source_dir
+
+    def fetch(self, stockname: str, after: date | None) -> list[tuple[date, float]]:
+        rows = get_stock_data(stockname, self.source_dir)
+        return [row for row in rows if after is None or row[0] > after]
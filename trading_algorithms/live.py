@@ -0,0 +1,186 @@
+# Live mode: price ticks for many stocks arrive from a feed and are dispatched
+# to a set of algorithms per stock, emitting decisions as they happen.
+# Running this file replays data/ through a local simulated feed server:
+# python3 live.py [--rate TICKS_PER_SEC] [STOCK ...]
+
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable
+
+from algorithms.algorithm_class import TradingAlgorithm
+from algorithms.algorithm_factory import algorithm_create, AlgorithmTypes
+from data_parser import parse_csv
+from profiling import LatencyHistogram
+
+
+@dataclass
+class Decision:
+    stock: str
+    name: str
+    action: str     # "BUY", "SELL" or "HOLD"
+    price: float
+    latency: float  # Seconds between the tick arriving and this decision
+
+
+class LiveRunner:
+    """
+    Each stock gets its own queue and worker task, so a stock with a backlog
+    (or slow algorithms) never holds up ticks for the others
+    """
+    def __init__(self, algorithms: dict[str, list[tuple[TradingAlgorithm, str]]],
+                 on_decision: Callable[[Decision], None] | None = None):
+        self.algorithms = algorithms
+        self.on_decision = on_decision
+        # Constant size however long the feed runs
+        self.latencies: dict[str, LatencyHistogram] = {stock: LatencyHistogram() for stock in algorithms}
+        self.max_latency = 0.0
+        self.ticks = 0
+        self.elapsed = 0.0
+
+    async def _worker(self, stock: str, queue: asyncio.Queue):
+        algorithms = self.algorithms[stock]
+        latencies = self.latencies[stock]
+        while True:
+            tick = await queue.get()
+            if tick is None:
+                return
+            price, arrived = tick
+
+            for algorithm, name in algorithms:
+                shares_before = algorithm.get_current_shares()
+                algorithm.give_data_point(price)
+                shares_after = algorithm.get_current_shares()
+                if self.on_decision is not None:
+                    action = "BUY" if shares_after > shares_before else "SELL" if shares_after < shares_before else "HOLD"
+                    self.on_decision(Decision(stock, name, action, price, time.perf_counter() - arrived))
+
+            latency = time.perf_counter() - arrived
+            latencies.add(int(latency * 1e9))
+            self.max_latency = max(self.max_latency, latency)
+            # queue.get() doesn't yield while items are waiting, so give the other stocks a turn
+            await asyncio.sleep(0)
+
+    async def run(self, feed: AsyncIterator[tuple[str, float]]):
+        queues = {stock: asyncio.Queue() for stock in self.algorithms}
+        workers = [asyncio.create_task(self._worker(stock, queue)) for stock, queue in queues.items()]
+
+        start = time.perf_counter()
+        async for stock, price in feed:
+            queue = queues.get(stock)
+            if queue is None:
+                continue  # Nothing is trading this stock
+            queue.put_nowait((price, time.perf_counter()))
+            self.ticks += 1
+
+        for queue in queues.values():
+            queue.put_nowait(None)
+        await asyncio.gather(*workers)
+        self.elapsed = time.perf_counter() - start
+
+    def summary(self) -> dict[str, float]:
+        latencies = LatencyHistogram()
+        for stock_latencies in self.latencies.values():
+            latencies.merge(stock_latencies)
+        if latencies.count == 0:
+            return {"ticks": 0}
+        # Percentiles are to within a histogram bucket (~20%); the max is exact
+        return {
+            "ticks": self.ticks,
+            "ticks_per_sec": self.ticks / self.elapsed if self.elapsed > 0 else 0,
+            "p50_latency_ms": min(latencies.percentile(0.5) / 1e9, self.max_latency) * 1e3,
+            "p99_latency_ms": min(latencies.percentile(0.99) / 1e9, self.max_latency) * 1e3,
+            "max_latency_ms": self.max_latency * 1e3,
+        }
+
+
+def _interleave(prices: dict[str, list[float]]):
+    # One tick per stock per "day", like a market where everything trades at once
+    for day in range(max(len(series) for series in prices.values())):
+        for stock, series in prices.items():
+            if day < len(series):
+                yield stock, series[day]
+
+
+async def replay_feed(prices: dict[str, list[float]]) -> AsyncIterator[tuple[str, float]]:
+    """
+    In-process feed replaying stored series, without going over a socket
+    """
+    for i, tick in enumerate(_interleave(prices)):
+        yield tick
+        if i % 1000 == 0:
+            await asyncio.sleep(0)
+
+
+async def serve_simulated_feed(prices: dict[str, list[float]], host: str = "127.0.0.1", port: int = 0,
+                               rate: float = 0) -> asyncio.Server:
+    """
+    Local stand-in for a market data feed. Every client gets all ticks as
+    "STOCK,price" lines; rate limits ticks per second (0 is unlimited)
+    """
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        batch_size = max(1, int(rate // 100)) if rate > 0 else 1000
+        start = time.perf_counter()
+        try:
+            for i, (stock, price) in enumerate(_interleave(prices), 1):
+                writer.write(f"{stock},{price}\n".encode())
+                if i % batch_size == 0:
+                    await writer.drain()
+                    if rate > 0:
+                        await asyncio.sleep(max(0.0, start + i / rate - time.perf_counter()))
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def tcp_feed(host: str, port: int) -> AsyncIterator[tuple[str, float]]:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while line := await reader.readline():
+            stock, price = line.decode().rstrip().split(',')
+            yield stock, float(price)
+    finally:
+        writer.close()
+
+
+def default_algorithms(start_balance: float = 1000, start_shares: float = 0) -> list[tuple[TradingAlgorithm, str]]:
+    return [
+        (algorithm_create(AlgorithmTypes.SIMPLE_MA, start_balance, start_shares, [1.0, (5, 21)]), "SIMPLE MA (5, 21)"),
+        (algorithm_create(AlgorithmTypes.EXPONENTIAL_MA, start_balance, start_shares, [1.0, (10, 20, 50)]), "EXPO MA (10, 20, 50)"),
+        (algorithm_create(AlgorithmTypes.BBANDS, start_balance, start_shares, (20, 2.0)), "BOLLINGER 2STD"),
+        (algorithm_create(AlgorithmTypes.RSI, start_balance, start_shares, (50,)), "RSI"),
+    ]
+
+
+async def _demo(stocks: list[str], rate: float):
+    prices = {stock: parse_csv(stock.lower() + ".csv") for stock in stocks}
+    server = await serve_simulated_feed(prices, rate=rate)
+    port = server.sockets[0].getsockname()[1]
+
+    trades = 0
+    def count_trades(decision: Decision):
+        nonlocal trades
+        trades += decision.action != "HOLD"
+
+    runner = LiveRunner({stock: default_algorithms() for stock in stocks}, count_trades)
+    async with server:
+        await runner.run(tcp_feed("127.0.0.1", port))
+
+    print(f"Trades: {trades}")
+    for key, value in runner.summary().items():
+        print(f"{key}: {value:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay stored data through a simulated live feed")
+    parser.add_argument("stocks", nargs="*", default=["AAPL", "ANZ.AX", "BHP.AX"])
+    parser.add_argument("--rate", type=float, default=0, help="Ticks per second (0 = as fast as possible)")
+    args = parser.parse_args()
+    asyncio.run(_demo(args.stocks, args.rate))
+
+
+if __name__ == "__main__":
+    main()
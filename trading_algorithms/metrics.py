@@ -61,3 +61,66 @@ def average_trade(worth_history, balance_history):
     if trades == 0:
         return 0
     return (worth_history[-1] - worth_history[0]) / trades
+
+
+class OnlineMetrics:
+    """
+    Running versions of the metrics above, updated one value at a time in O(1),
+    so a long-lived run never has to rescan its whole worth history
+    """
+    def __init__(self):
+        self.count = 0
+        self.first_worth = 0.0
+        self.last_worth = 0.0
+        # Welford's running mean/variance of returns
+        self.return_count = 0
+        self.return_mean = 0.0
+        self.return_m2 = 0.0
+        self.running_max = 0.0
+        self.maximum_drawdown = 0.0
+        self.last_balance: float | None = None
+        self.trades = 0
+
+    def update(self, worth: float):
+        if self.count == 0:
+            self.first_worth = worth
+        else:
+            r = worth / self.last_worth - 1
+            self.return_count += 1
+            delta = r - self.return_mean
+            self.return_mean += delta / self.return_count
+            self.return_m2 += delta * (r - self.return_mean)
+        self.last_worth = worth
+        self.count += 1
+
+        self.running_max = max(worth, self.running_max)
+        drawdown = abs((worth - self.running_max) / self.running_max)
+        self.maximum_drawdown = max(self.maximum_drawdown, drawdown)
+
+    def update_balance(self, balance: float):
+        if self.last_balance is not None and balance != self.last_balance:
+            self.trades += 1
+        self.last_balance = balance
+
+    def sharpe(self, risk_free_rate=0, yearly=True):
+        if self.return_count == 0:
+            return 0
+        std_dev = (self.return_m2 / self.return_count)**0.5
+        if std_dev == 0:
+            return 0
+        daily = (self.return_mean - risk_free_rate) / std_dev
+        return daily * 252**0.5 if yearly else daily
+
+    def max_drawdown(self):
+        return self.maximum_drawdown
+
+    def cagr(self):
+        return (self.last_worth/self.first_worth)**(252/self.count) - 1
+
+    def calmar(self):
+        return self.cagr() / max(1, abs(self.maximum_drawdown))
+
+    def average_trade(self):
+        if self.trades == 0:
+            return 0
+        return (self.last_worth - self.first_worth) / self.trades
@@ -1,29 +1,37 @@
 # Plots a stock from csv in data/
-# python3 plotter.py <STOCK>
+# python3 plotter.py <STOCK> [--save] [--max-points N]
 # e.g. python3 plotter.py googl
+# --save writes images/<STOCK>.png off-screen instead of opening a window
 
-import matplotlib.pyplot as plt
-from matplotlib.dates import DateFormatter, DayLocator, WeekdayLocator
-import matplot2tikz
-from sys import argv
+import argparse
 from data_parser import get_stock_data
+from render import tikz_code, DEFAULT_MAX_POINTS
+
 
+parser = argparse.ArgumentParser(description="Plot a stock and print its TikZ")
+parser.add_argument("stock")
+parser.add_argument("--save", action="store_true", help="Save to images/ instead of showing")
+parser.add_argument("--max-points", type=int, default=DEFAULT_MAX_POINTS, help="Points kept per line in the TikZ output")
+args = parser.parse_args()
 
-if len(argv) <= 1:
-    exit(-1)
+import matplotlib
+if args.save:
+    matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.dates import DateFormatter, DayLocator
 
-stockname = argv[1].strip()
+stockname = args.stock.strip()
 stock = get_stock_data(stockname)
 dates = [p[0] for p in stock]
 values = [p[1] for p in stock]
 
 # Attempt to put x labels on the same day every month
-date_ticks = []
-for date in dates:
-    month_days = (d.day for d in dates if (d.month, d.year) == (date.month, date.year) and d.day >= dates[-1].day)
-    if date.day == min(month_days):
-        date_ticks.append(date)
-        continue
+first_days: dict[tuple[int, int], int] = {}
+for d in dates:
+    if d.day >= dates[-1].day:
+        key = (d.month, d.year)
+        first_days[key] = min(d.day, first_days.get(key, d.day))
+date_ticks = [date for date in dates if first_days.get((date.month, date.year)) == date.day]
 date_ticks.append(dates[0])
 
 date_labels = [date.strftime("%d/%m/%Y") for date in date_ticks]
@@ -41,7 +49,8 @@ plt.ylabel("Value")
 plt.title("Stock")
 plt.grid(True)
 
-print(matplot2tikz.get_tikz_code())
-plt.show()
-# plt.savefig("images/" + stockname + ".png")
-
+if args.save:
+    plt.savefig("images/" + stockname + ".png")
+print(tikz_code(plt.gcf(), args.max_points))
+if not args.save:
+    plt.show()
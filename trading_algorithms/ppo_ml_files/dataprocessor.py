@@ -1,6 +1,6 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import List, Dict, Optional, Tuple
 import os
 import logging
@@ -9,6 +9,8 @@ import pickle
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 from sklearn.preprocessing import MinMaxScaler, StandardScaler
+from ppo_ml_files.price_providers import PriceProvider, LocalPriceProvider, YahooPriceProvider
+from ppo_ml_files.feature_cache import FeatureCache
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -16,32 +18,322 @@ warnings.filterwarnings('ignore')
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 # logger = logging.getLogger(__name__)
 
+# Bump whenever the features the pipeline produces change, so cached results are not reused
+FEATURE_VERSION = 2
+
+# Number of days each RL state looks back
+SEQUENCE_LENGTH = 60
+
+# Columns create_lagged_features makes lags of
+LAG_FEATURE_COLUMNS = ['Close', 'Volume', 'Price_Change', 'RSI', 'MACD', 'Volatility']
+
+
+class _TickerGroups:
+    """
+    Layout of a frame sorted by ticker, so per-stock operations can run over
+    the whole frame at once instead of masking out one stock at a time
+    """
+    def __init__(self, codes: np.ndarray):
+        self.codes = codes
+        n = len(codes)
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if n else np.array([], dtype=int)
+        ends = np.r_[starts[1:], n]
+        lengths = ends - starts
+        self.starts, self.ends = starts, ends
+        # Rows before / after each row within its own stock
+        self.position = np.arange(n) - np.repeat(starts, lengths)
+        self.remaining = np.repeat(ends, lengths) - np.arange(n) - 1
+
+    def shift(self, values: np.ndarray, periods: int) -> np.ndarray:
+        """Series.shift within each stock"""
+        shifted = np.full(len(values), np.nan)
+        if periods > 0:
+            shifted[periods:] = values[:-periods]
+            shifted[self.position < periods] = np.nan
+        elif periods < 0:
+            shifted[:periods] = values[-periods:]
+            shifted[self.remaining < -periods] = np.nan
+        else:
+            shifted[:] = values
+        return shifted
+
+    def rolling(self, values: np.ndarray, window: int):
+        return pd.Series(values).groupby(self.codes, sort=False).rolling(window=window)
+
+    def ewm(self, values: np.ndarray, span: int):
+        return pd.Series(values).groupby(self.codes, sort=False).ewm(span=span)
+
+
+def _group_by_ticker(df: pd.DataFrame) -> Tuple[pd.DataFrame, _TickerGroups]:
+    """
+    Sort by ticker (in order of first appearance) then date, without copying if already sorted
+    """
+    codes, _ = pd.factorize(df['Ticker'])
+    keys = pd.DataFrame({'code': codes, 'date': df['Date'].to_numpy()})
+    order = keys.sort_values(['code', 'date'], kind='stable').index.to_numpy()
+    if np.array_equal(order, np.arange(len(df))):
+        df = df.reset_index(drop=True)
+    else:
+        df = df.iloc[order].reset_index(drop=True)
+        codes = codes[order]
+    return df, _TickerGroups(codes)
+
+
+def _sliding_windows(features: np.ndarray, length: int) -> np.ndarray:
+    """
+    (rows - length, length, features) windows, window i covering rows [i, i + length).
+    A read-only strided view over features: nothing is copied until a window is used
+    """
+    if len(features) <= length:
+        return np.empty((0, length, features.shape[1]), dtype=features.dtype)
+    # The last window would end on the last row, which has nothing after it to reward
+    return sliding_window_view(features, length, axis=0)[:-1].transpose(0, 2, 1)
+
+
+def _scaler_params(scaler: StandardScaler) -> Dict:
+    return {
+        'mean': scaler.mean_.tolist(),
+        'var': scaler.var_.tolist(),
+        'scale': scaler.scale_.tolist(),
+        'n_samples_seen': int(scaler.n_samples_seen_),
+        'feature_names': [str(name) for name in scaler.feature_names_in_],
+    }
+
+
+def _scaler_from_params(params: Dict) -> StandardScaler:
+    """A fitted StandardScaler equal to the one _scaler_params was given"""
+    scaler = StandardScaler()
+    scaler.mean_ = np.array(params['mean'])
+    scaler.var_ = np.array(params['var'])
+    scaler.scale_ = np.array(params['scale'])
+    scaler.n_samples_seen_ = params['n_samples_seen']
+    scaler.feature_names_in_ = np.array(params['feature_names'], dtype=object)
+    scaler.n_features_in_ = len(params['feature_names'])
+    return scaler
+
+
+def _ticker_arrays(df: pd.DataFrame, state_features: List[str]) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """
+    One ticker's unscaled state features, rewards and dates, and (json-able) meta with the
+    statistics the scaler is fitted from: row count, mean and sum of squared deviations of each
+    feature. This is what the feature cache stores per ticker
+    """
+    df, groups = _group_by_ticker(df)
+    features = df[state_features].to_numpy(dtype=float)
+    mean = features.mean(axis=0)
+
+    # Reward: next day return (can be modified based on your RL objective)
+    if 'Future_Return_1d' in df.columns:
+        rewards = df['Future_Return_1d'].to_numpy(dtype=float)
+    else:
+        close = df['Close'].to_numpy(dtype=float)
+        rewards = np.nan_to_num(groups.shift(close, -1) / close - 1, nan=0.)
+
+    dates = pd.DatetimeIndex(df['Date'])
+    tz = None if dates.tz is None else str(dates.tz)
+    if tz is not None:
+        dates = dates.tz_convert('UTC').tz_localize(None)
+
+    arrays = {
+        'features': features,
+        'rewards': rewards,
+        'dates': dates.values.astype('datetime64[ns]').view(np.int64),
+    }
+    meta = {
+        'ticker': df['Ticker'].iloc[0],
+        'state_features': state_features,
+        'tz': tz,
+        'count': len(df),
+        'mean': mean.tolist(),
+        'm2': ((features - mean) ** 2).sum(axis=0).tolist(),
+    }
+    return arrays, meta
+
+
+def _combined_scaler(metas: List[Dict]) -> StandardScaler:
+    """
+    The StandardScaler fitted on every ticker's features together, merged from each ticker's
+    statistics (Chan et al.'s pairwise update) instead of refitted on all their rows
+    """
+    count, mean, m2 = 0, 0., 0.
+    for meta in metas:
+        n, ticker_mean = meta['count'], np.array(meta['mean'])
+        delta = ticker_mean - mean
+        mean = mean + delta * n / (count + n)
+        m2 = m2 + np.array(meta['m2']) + delta ** 2 * count * n / (count + n)
+        count += n
+
+    var = m2 / count
+    # Features constant to within rounding are left unscaled, as StandardScaler does
+    eps = np.finfo(np.float64).eps
+    constant = var <= count * eps * var + (count * mean * eps) ** 2
+    return _scaler_from_params({
+        'mean': mean.tolist(),
+        'var': var.tolist(),
+        'scale': np.where(constant, 1., np.sqrt(var)).tolist(),
+        'n_samples_seen': count,
+        'feature_names': metas[0]['state_features'],
+    })
+
+
+def _combine_tickers(entries: List[Tuple[Dict[str, np.ndarray], Dict]]) -> Tuple[Dict[str, np.ndarray], Dict, StandardScaler]:
+    """
+    Flat arrays (and json-able meta) covering every ticker, as _rl_data_from_arrays takes them,
+    from each ticker's _ticker_arrays. Features are normalised into one contiguous float32 matrix
+    every ticker's states view
+    """
+    metas = [meta for _, meta in entries]
+    scaler = _combined_scaler(metas)
+    lengths = np.array([meta['count'] for meta in metas], dtype=np.int64)
+    ends = np.cumsum(lengths)
+
+    features = np.concatenate([arrays['features'] for arrays, _ in entries])
+    arrays = {
+        'features': ((features - scaler.mean_) / scaler.scale_).astype(np.float32),
+        'rewards': np.concatenate([arrays['rewards'] for arrays, _ in entries]),
+        'dates': np.concatenate([arrays['dates'] for arrays, _ in entries]),
+        'starts': ends - lengths,
+        'ends': ends,
+    }
+    meta = {
+        'tickers': [meta['ticker'] for meta in metas],
+        'state_features': metas[0]['state_features'],
+        'tz': metas[0]['tz'],
+        'scaler': _scaler_params(scaler),
+    }
+    return arrays, meta, scaler
+
+
+def _rl_data_from_arrays(arrays: Dict[str, np.ndarray], meta: Dict) -> Dict:
+    """
+    rl_data (as create_rl_states_actions returns it) from the flat arrays of every ticker
+    """
+    dates = pd.to_datetime(np.asarray(arrays['dates']))
+    if meta['tz'] is not None:
+        dates = dates.tz_localize('UTC').tz_convert(meta['tz'])
+
+    rl_data = {}
+    for ticker, start, end in zip(meta['tickers'], arrays['starts'], arrays['ends']):
+        # State i: the SEQUENCE_LENGTH days of technical indicators before day i
+        rl_data[ticker] = {
+            'states': _sliding_windows(arrays['features'][start:end], SEQUENCE_LENGTH),
+            'rewards': arrays['rewards'][start + SEQUENCE_LENGTH:end],
+            'dates': dates[start + SEQUENCE_LENGTH:end].tolist(),
+            'state_features': meta['state_features']
+        }
+    return rl_data
+
+
+def _with_columns(df: pd.DataFrame, columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Add (or replace) many columns with a single concat rather than one insert each"""
+    new = pd.DataFrame(columns, index=df.index)
+    return pd.concat([df.drop(columns=[c for c in columns if c in df.columns]), new], axis=1)
+
+
+def _technical_indicators(df: pd.DataFrame, groups: _TickerGroups) -> Dict[str, np.ndarray]:
+    open_, high, low = (df[c].to_numpy(dtype=float) for c in ('Open', 'High', 'Low'))
+    close = df['Close'].to_numpy(dtype=float)
+    volume = df['Volume'].to_numpy(dtype=float)
+
+    def rolling_mean(values, window):
+        return groups.rolling(values, window).mean().to_numpy()
+
+    def ewm_mean(values, span):
+        return groups.ewm(values, span).mean().to_numpy()
+
+    f = {}
+    # Moving averages
+    for window in (5, 10, 20, 50):
+        f[f'SMA_{window}'] = rolling_mean(close, window)
+
+    # Exponential moving averages
+    f['EMA_12'] = ewm_mean(close, 12)
+    f['EMA_26'] = ewm_mean(close, 26)
+
+    # MACD
+    f['MACD'] = f['EMA_12'] - f['EMA_26']
+    f['MACD_Signal'] = ewm_mean(f['MACD'], 9)
+    f['MACD_Histogram'] = f['MACD'] - f['MACD_Signal']
+
+    # RSI
+    delta = close - groups.shift(close, 1)
+    gain = rolling_mean(np.where(delta > 0, delta, 0), 14)
+    loss = rolling_mean(np.where(delta < 0, -delta, 0), 14)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+        f['RSI'] = 100 - (100 / (1 + rs))
+
+    # Bollinger Bands
+    bb_std = groups.rolling(close, 20).std().to_numpy()
+    f['BB_Middle'] = f['SMA_20']
+    f['BB_Upper'] = f['BB_Middle'] + (bb_std * 2)
+    f['BB_Lower'] = f['BB_Middle'] - (bb_std * 2)
+    f['BB_Width'] = f['BB_Upper'] - f['BB_Lower']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f['BB_Position'] = (close - f['BB_Lower']) / f['BB_Width']
+
+        # Volatility
+        f['Volatility'] = bb_std
+
+        # Price change features
+        f['Price_Change'] = close / groups.shift(close, 1) - 1
+        f['Price_Change_5d'] = close / groups.shift(close, 5) - 1
+        f['High_Low_Ratio'] = high / low
+        f['Open_Close_Ratio'] = open_ / close
+
+        # Volume features
+        f['Volume_SMA'] = rolling_mean(volume, 20)
+        f['Volume_Ratio'] = volume / f['Volume_SMA']
+    return f
+
+
+def _lagged_features(columns: Dict[str, np.ndarray], groups: _TickerGroups, lags: List[int]) -> Dict[str, np.ndarray]:
+    return {f'{col}_lag_{lag}': groups.shift(values, lag) for col, values in columns.items() for lag in lags}
+
+
+def _future_returns(close: np.ndarray, groups: _TickerGroups, horizons: List[int]) -> Dict[str, np.ndarray]:
+    f = {}
+    for horizon in horizons:
+        returns = groups.shift(close, -horizon) / close - 1
+        f[f'Future_Return_{horizon}d'] = returns
+
+        # Create binary classification targets
+        f[f'Future_Up_{horizon}d'] = (returns > 0).astype(int)
+
+        # Create categorical targets (strong down, down, up, strong up)
+        f[f'Future_Category_{horizon}d'] = pd.cut(
+            returns,
+            bins=[-np.inf, -0.02, 0, 0.02, np.inf],
+            labels=[0, 1, 2, 3]
+        ).astype(float)
+    return f
+
+
 class StockDataProcessor:
     """
     A comprehensive class for downloading, processing, and preprocessing stock data
-    from Yahoo Finance for reinforcement learning applications.
+    for reinforcement learning applications.
+
+    Raw data comes from a PriceProvider: the local csvs in data/ by default, or
+    Yahoo Finance if a YahooPriceProvider is passed in.
     """
     
-    def __init__(self, data_dir: str = "stock_data", cache_dir: str = "cache"):
+    def __init__(self, data_dir: str = "stock_data", cache_dir: str = "cache",
+                 provider: Optional[PriceProvider] = None, cache_max_bytes: int = 2 * 1024 ** 3):
         self.data_dir = data_dir
         self.cache_dir = cache_dir
+        self.provider = provider if provider is not None else LocalPriceProvider()
         self.scalers = {}
         
         # Create directories if they don't exist
         os.makedirs(data_dir, exist_ok=True)
-        os.makedirs(cache_dir, exist_ok=True)
+        self.cache = FeatureCache(cache_dir, cache_max_bytes)
         
     def get_sp500_tickers(self) -> List[str]:
-        """Get S&P 500 stock tickers"""
+        """Get the provider's universe of tickers (S&P 500 for Yahoo, every local csv otherwise)"""
         try:
-            # Download S&P 500 list from Wikipedia
-            url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-            tables = pd.read_html(url)
-            sp500_table = tables[0]
-            tickers = sp500_table['Symbol'].tolist()
-            # Clean tickers (remove dots, etc.)
-            tickers = [ticker.replace('.', '-') for ticker in tickers]
-            # logger.info(f"Retrieved {len(tickers)} S&P 500 tickers")
+            tickers = self.provider.list_tickers()
+            # logger.info(f"Retrieved {len(tickers)} tickers")
             return tickers
         except Exception as e:
             # logger.error(f"Error fetching S&P 500 tickers: {e}")
@@ -53,24 +345,23 @@ class StockDataProcessor:
                           period: str = "10y", 
                           interval: str = "1d") -> Optional[pd.DataFrame]:
         """
-        Download stock data for a single ticker
+        Download stock data for a single ticker from the provider
         
         Args:
             ticker: Stock symbol
             period: Time period (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)
-            interval: Data interval (1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo)
+            interval: Data interval (1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo;
+                      local data supports 1d, 1wk and 1mo)
         """
         try:
-            stock = yf.Ticker(ticker)
-            data = stock.history(period=period, interval=interval)
+            data = self.provider.download(ticker, period, interval)
             
-            if data.empty:
+            if data is None or data.empty:
                 # logger.warning(f"No data found for {ticker}")
                 return None
                 
             # Add ticker column
             data['Ticker'] = ticker
-            data.reset_index(inplace=True)
             
             # logger.info(f"Downloaded {len(data)} records for {ticker}")
             return data
@@ -87,7 +378,7 @@ class StockDataProcessor:
         """
         Download stock data for multiple tickers using parallel processing
         """
-        all_data = []
+        all_data = {}
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Submit all download tasks
@@ -102,16 +393,18 @@ class StockDataProcessor:
                 try:
                     data = future.result()
                     if data is not None:
-                        all_data.append(data)
+                        all_data[ticker] = data
                 except Exception as e:
                     # logger.error(f"Error processing {ticker}: {e}")
                     pass
                 
                 # Rate limiting
-                time.sleep(0.1)
+                if self.provider.rate_limit > 0:
+                    time.sleep(self.provider.rate_limit)
         
         if all_data:
-            combined_data = pd.concat(all_data, ignore_index=True)
+            # In the order asked for, not the order downloads finished, so runs are deterministic
+            combined_data = pd.concat([all_data[t] for t in tickers if t in all_data], ignore_index=True)
             # logger.info(f"Combined data shape: {combined_data.shape}")
             return combined_data
         else:
@@ -123,58 +416,8 @@ class StockDataProcessor:
         """
         # logger.info("Calculating technical indicators...")
         
-        result_dfs = []
-        
-        for ticker in df['Ticker'].unique():
-            ticker_data = df[df['Ticker'] == ticker].copy()
-            ticker_data = ticker_data.sort_values('Date')
-            
-            # Moving averages
-            ticker_data['SMA_5'] = ticker_data['Close'].rolling(window=5).mean()
-            ticker_data['SMA_10'] = ticker_data['Close'].rolling(window=10).mean()
-            ticker_data['SMA_20'] = ticker_data['Close'].rolling(window=20).mean()
-            ticker_data['SMA_50'] = ticker_data['Close'].rolling(window=50).mean()
-            
-            # Exponential moving averages
-            ticker_data['EMA_12'] = ticker_data['Close'].ewm(span=12).mean()
-            ticker_data['EMA_26'] = ticker_data['Close'].ewm(span=26).mean()
-            
-            # MACD
-            ticker_data['MACD'] = ticker_data['EMA_12'] - ticker_data['EMA_26']
-            ticker_data['MACD_Signal'] = ticker_data['MACD'].ewm(span=9).mean()
-            ticker_data['MACD_Histogram'] = ticker_data['MACD'] - ticker_data['MACD_Signal']
-            
-            # RSI
-            delta = ticker_data['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            ticker_data['RSI'] = 100 - (100 / (1 + rs))
-            
-            # Bollinger Bands
-            ticker_data['BB_Middle'] = ticker_data['Close'].rolling(window=20).mean()
-            bb_std = ticker_data['Close'].rolling(window=20).std()
-            ticker_data['BB_Upper'] = ticker_data['BB_Middle'] + (bb_std * 2)
-            ticker_data['BB_Lower'] = ticker_data['BB_Middle'] - (bb_std * 2)
-            ticker_data['BB_Width'] = ticker_data['BB_Upper'] - ticker_data['BB_Lower']
-            ticker_data['BB_Position'] = (ticker_data['Close'] - ticker_data['BB_Lower']) / ticker_data['BB_Width']
-            
-            # Volatility
-            ticker_data['Volatility'] = ticker_data['Close'].rolling(window=20).std()
-            
-            # Price change features
-            ticker_data['Price_Change'] = ticker_data['Close'].pct_change()
-            ticker_data['Price_Change_5d'] = ticker_data['Close'].pct_change(periods=5)
-            ticker_data['High_Low_Ratio'] = ticker_data['High'] / ticker_data['Low']
-            ticker_data['Open_Close_Ratio'] = ticker_data['Open'] / ticker_data['Close']
-            
-            # Volume features
-            ticker_data['Volume_SMA'] = ticker_data['Volume'].rolling(window=20).mean()
-            ticker_data['Volume_Ratio'] = ticker_data['Volume'] / ticker_data['Volume_SMA']
-            
-            result_dfs.append(ticker_data)
-        
-        result = pd.concat(result_dfs, ignore_index=True)
+        df, groups = _group_by_ticker(df)
+        result = _with_columns(df, _technical_indicators(df, groups))
         # logger.info(f"Technical indicators calculated. New shape: {result.shape}")
         return result
     
@@ -184,21 +427,9 @@ class StockDataProcessor:
         """
         # logger.info("Creating lagged features...")
         
-        result_dfs = []
-        feature_columns = ['Close', 'Volume', 'Price_Change', 'RSI', 'MACD', 'Volatility']
-        
-        for ticker in df['Ticker'].unique():
-            ticker_data = df[df['Ticker'] == ticker].copy()
-            ticker_data = ticker_data.sort_values('Date')
-            
-            for col in feature_columns:
-                if col in ticker_data.columns:
-                    for lag in lags:
-                        ticker_data[f'{col}_lag_{lag}'] = ticker_data[col].shift(lag)
-            
-            result_dfs.append(ticker_data)
-        
-        result = pd.concat(result_dfs, ignore_index=True)
+        df, groups = _group_by_ticker(df)
+        columns = {col: df[col].to_numpy(dtype=float) for col in LAG_FEATURE_COLUMNS if col in df.columns}
+        result = _with_columns(df, _lagged_features(columns, groups, lags))
         # logger.info(f"Lagged features created. New shape: {result.shape}")
         return result
     
@@ -208,31 +439,32 @@ class StockDataProcessor:
         """
         # logger.info("Creating future return targets...")
         
-        result_dfs = []
-        
-        for ticker in df['Ticker'].unique():
-            ticker_data = df[df['Ticker'] == ticker].copy()
-            ticker_data = ticker_data.sort_values('Date')
-            
-            for horizon in horizons:
-                ticker_data[f'Future_Return_{horizon}d'] = ticker_data['Close'].shift(-horizon) / ticker_data['Close'] - 1
-                
-                # Create binary classification targets
-                ticker_data[f'Future_Up_{horizon}d'] = (ticker_data[f'Future_Return_{horizon}d'] > 0).astype(int)
-                
-                # Create categorical targets (strong down, down, up, strong up)
-                returns = ticker_data[f'Future_Return_{horizon}d']
-                ticker_data[f'Future_Category_{horizon}d'] = pd.cut(
-                    returns, 
-                    bins=[-np.inf, -0.02, 0, 0.02, np.inf], 
-                    labels=[0, 1, 2, 3]
-                ).astype(float)
-            
-            result_dfs.append(ticker_data)
-        
-        result = pd.concat(result_dfs, ignore_index=True)
+        df, groups = _group_by_ticker(df)
+        result = _with_columns(df, _future_returns(df['Close'].to_numpy(dtype=float), groups, horizons))
         # logger.info(f"Future return targets created. New shape: {result.shape}")
         return result
+
+    def create_features(self, df: pd.DataFrame,
+                        lags: List[int] = [1, 2, 3, 5, 10],
+                        horizons: List[int] = [1, 5, 10, 20]) -> pd.DataFrame:
+        """
+        Indicators, lagged features and future return targets in one pass.
+        Same result as calculate_technical_indicators, create_lagged_features and
+        create_future_returns in turn, but the frame is sorted once and only copied once
+        
+        Args:
+            df: Raw OHLCV data with Date and Ticker columns
+            lags: Lags for the lagged features
+            horizons: Horizons (in rows) of the future return targets
+        """
+        df, groups = _group_by_ticker(df)
+
+        features = _technical_indicators(df, groups)
+        columns = {col: features[col] if col in features else df[col].to_numpy(dtype=float)
+                   for col in LAG_FEATURE_COLUMNS}
+        features.update(_lagged_features(columns, groups, lags))
+        features.update(_future_returns(df['Close'].to_numpy(dtype=float), groups, horizons))
+        return _with_columns(df, features)
     
     def clean_and_normalize_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -243,9 +475,9 @@ class StockDataProcessor:
         # Remove rows with too many NaN values
         df = df.dropna(thresh=len(df.columns) * 0.7)
         
-        # Forward fill remaining NaN values
+        # Forward fill remaining NaN values (within each stock, never from one stock into the next)
         numeric_columns = df.select_dtypes(include=[np.number]).columns
-        df[numeric_columns] = df[numeric_columns].fillna(method='ffill')
+        df[numeric_columns] = df.groupby('Ticker', sort=False)[numeric_columns].ffill()
         
         # Remove infinite values
         df = df.replace([np.inf, -np.inf], np.nan)
@@ -254,12 +486,10 @@ class StockDataProcessor:
         # logger.info(f"Data cleaned. Final shape: {df.shape}")
         return df
     
-    def create_rl_states_actions(self, df: pd.DataFrame) -> Dict:
+    def state_features(self, df: pd.DataFrame) -> List[str]:
         """
-        Create state and action spaces suitable for reinforcement learning
+        Columns of df that make up each day of an RL state
         """
-        # logger.info("Creating RL state and action representations...")
-        
         # Define state features (technical indicators and market data)
         state_features = [
             'Open', 'High', 'Low', 'Close', 'Volume',
@@ -274,55 +504,64 @@ class StockDataProcessor:
         state_features.extend(lag_features)
         
         # Filter existing features
-        state_features = [feat for feat in state_features if feat in df.columns]
-        
-        # Normalize state features
-        scaler = StandardScaler()
-        df_scaled = df.copy()
-        df_scaled[state_features] = scaler.fit_transform(df[state_features])
-        
-        # Define action space (0: Hold, 1: Buy, 2: Sell)
-        # You can expand this based on your RL strategy
-        
-        # Create sequences for each stock
-        rl_data = {}
-        sequence_length = 60  # Number of days to look back
+        return [feat for feat in state_features if feat in df.columns]
+
+    def create_rl_states_actions(self, df: pd.DataFrame) -> Dict:
+        """
+        Create state and action spaces suitable for reinforcement learning
+        """
+        # logger.info("Creating RL state and action representations...")
         
-        for ticker in df_scaled['Ticker'].unique():
-            ticker_data = df_scaled[df_scaled['Ticker'] == ticker].sort_values('Date')
-            
-            states = []
-            rewards = []
-            dates = []
-            
-            for i in range(sequence_length, len(ticker_data)):
-                # State: sequence of technical indicators
-                state_sequence = ticker_data.iloc[i-sequence_length:i][state_features].values
-                states.append(state_sequence)
-                
-                # Reward: next day return (can be modified based on your RL objective)
-                if 'Future_Return_1d' in ticker_data.columns:
-                    reward = ticker_data.iloc[i]['Future_Return_1d']
-                else:
-                    current_price = ticker_data.iloc[i]['Close']
-                    if i < len(ticker_data) - 1:
-                        next_price = ticker_data.iloc[i+1]['Close']
-                        reward = (next_price - current_price) / current_price
-                    else:
-                        reward = 0
-                
-                rewards.append(reward)
-                dates.append(ticker_data.iloc[i]['Date'])
-            
-            rl_data[ticker] = {
-                'states': np.array(states),
-                'rewards': np.array(rewards),
-                'dates': dates,
-                'state_features': state_features
-            }
+        state_features = self.state_features(df)
+        arrays, meta, scaler = self._rl_arrays(df, state_features)
+        rl_data = _rl_data_from_arrays(arrays, meta)
         
         # logger.info(f"RL data created for {len(rl_data)} stocks")
         return rl_data, scaler
+
+    def _rl_arrays(self, df: pd.DataFrame, state_features: List[str]) -> Tuple[Dict[str, np.ndarray], Dict, StandardScaler]:
+        """
+        Everything rl_data is made of, as a few flat arrays (and json-able meta) covering every ticker
+        """
+        df, groups = _group_by_ticker(df)
+        entries = [_ticker_arrays(df.iloc[start:end], state_features) for start, end in zip(groups.starts, groups.ends)]
+        return _combine_tickers(entries)
+
+    def _process_tickers(self, tickers: List[str], period: str, interval: str,
+                         use_cache: bool) -> List[Tuple[pd.DataFrame, Dict[str, np.ndarray], Dict]]:
+        """
+        (cleaned frame, _ticker_arrays arrays, meta) of each ticker that has data, in order.
+        Every ticker is processed (and cached) on its own, so a ticker list reuses the entries
+        of any other list sharing tickers with it, and only tickers not cached are downloaded
+        """
+        results, keys = {}, {}
+        if use_cache:
+            for ticker in tickers:
+                keys[ticker] = FeatureCache.key(
+                    ticker=ticker, period=period, interval=interval, version=FEATURE_VERSION,
+                    provider=type(self.provider).__name__, source=self.provider.cache_token(ticker),
+                )
+                cached = self.cache.load(keys[ticker])
+                if cached is not None:
+                    results[ticker] = cached
+
+        missing = [ticker for ticker in tickers if ticker not in results]
+        # logger.info(f"Downloading data for {len(missing)} tickers...")
+        raw_data = self.download_multiple_stocks(missing, period, interval) if missing else pd.DataFrame()
+        for ticker, raw in (raw_data.groupby('Ticker', sort=False) if not raw_data.empty else []):
+            raw = raw.reset_index(drop=True)
+            raw['Date'] = raw['Date'].values[::-1]
+
+            # Process data
+            cleaned_data = self.clean_and_normalize_data(self.create_features(raw)).reset_index(drop=True)
+            if cleaned_data.empty:
+                continue
+            arrays, meta = _ticker_arrays(cleaned_data, self.state_features(cleaned_data))
+            if ticker in keys:
+                self.cache.store(keys[ticker], cleaned_data, arrays, meta)
+            results[ticker] = (cleaned_data, arrays, meta)
+
+        return [results[ticker] for ticker in tickers if ticker in results]
     
     def save_processed_data(self, data: pd.DataFrame, rl_data: Dict, scaler, filename_prefix: str = "processed_stock_data"):
         """
@@ -353,9 +592,20 @@ class StockDataProcessor:
                                tickers: Optional[List[str]] = None,
                                period: str = "10y",
                                interval: str = "1d",
-                               use_sp500: bool = True) -> Tuple[pd.DataFrame, Dict, object]:
+                               use_sp500: bool = True,
+                               use_cache: bool = True,
+                               save: bool = False) -> Tuple[pd.DataFrame, Dict, object]:
         """
         Complete pipeline for processing stock data
+        
+        Args:
+            tickers: Stocks to process (default: the provider's universe, see use_sp500)
+            period: Time period of data to download
+            interval: Data interval
+            use_sp500: Whether tickers=None means every ticker get_sp500_tickers gives
+            use_cache: Reuse (and store) each ticker's features in the feature cache, skipping
+                       download and feature engineering for tickers processed before
+            save: Also write timestamped csv/pickle copies with save_processed_data
         """
         # logger.info("Starting stock data processing pipeline...")
         
@@ -365,28 +615,21 @@ class StockDataProcessor:
                 tickers = self.get_sp500_tickers()
             else:
                 tickers = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA']  # Default list
-        
-        # Download data
-        # logger.info(f"Downloading data for {len(tickers)} tickers...")
-        raw_data = self.download_multiple_stocks(tickers, period, interval)
 
-        raw_data['Date'] = raw_data['Date'].values[::-1]
-        
-        if raw_data.empty:
+        processed = self._process_tickers(list(tickers), period, interval, use_cache)
+        if not processed:
             # logger.error("No data downloaded. Exiting.")
             return None, None, None
-        
-        # Process data
-        data_with_indicators = self.calculate_technical_indicators(raw_data)
-        data_with_lags = self.create_lagged_features(data_with_indicators)
-        data_with_targets = self.create_future_returns(data_with_lags)
-        cleaned_data = self.clean_and_normalize_data(data_with_targets)
+
+        cleaned_data = pd.concat([frame for frame, _, _ in processed], ignore_index=True)
         
         # Create RL data
-        rl_data, scaler = self.create_rl_states_actions(cleaned_data)
+        arrays, meta, scaler = _combine_tickers([(arrays, meta) for _, arrays, meta in processed])
+        rl_data = _rl_data_from_arrays(arrays, meta)
         
         # Save data
-        self.save_processed_data(cleaned_data, rl_data, scaler)
+        if save:
+            self.save_processed_data(cleaned_data, rl_data, scaler)
         
         # logger.info("Pipeline completed successfully!")
         return cleaned_data, rl_data, scaler
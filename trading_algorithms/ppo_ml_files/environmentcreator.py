@@ -34,6 +34,77 @@ class TradingMetrics:
     calmar_ratio: float = 0.0
     sortino_ratio: float = 0.0
 
+# Row layouts of the episode logs
+PORTFOLIO_DTYPE = np.dtype([
+    ('step', np.int64), ('balance', np.float64), ('shares_held', np.float64),
+    ('position_value', np.float64), ('net_worth', np.float64), ('price', np.float64),
+])
+ACTION_DTYPE = np.dtype([('step', np.int64), ('action_type', np.int64), ('position_size', np.float64)])
+# action is an ActionType value; value is the cost of a buy or the revenue of a sell
+TRADE_DTYPE = np.dtype([
+    ('step', np.int64), ('action', np.int64), ('shares', np.int64),
+    ('price', np.float64), ('value', np.float64), ('transaction_cost', np.float64),
+])
+
+
+class _RunningMoments:
+    """
+    Mean and standard deviation of the last maxlen values, and of the negative
+    values among them, kept up to date in O(1) per new value
+    """
+    def __init__(self, maxlen: int):
+        self.values = deque(maxlen=maxlen)
+        self.clear()
+
+    def clear(self):
+        self.values.clear()
+        self.count = self.total = self.total_sq = 0.0
+        self.neg_count = self.neg_total = self.neg_total_sq = 0.0
+        self._evicted = 0
+
+    def _add(self, value: float, sign: int):
+        self.count += sign
+        self.total += sign * value
+        self.total_sq += sign * value * value
+        if value < 0:
+            self.neg_count += sign
+            self.neg_total += sign * value
+            self.neg_total_sq += sign * value * value
+
+    def append(self, value: float):
+        if len(self.values) == self.values.maxlen:
+            self._add(self.values[0], -1)
+            self._evicted += 1
+        self.values.append(value)
+        self._add(value, 1)
+
+        # Adding and removing leaves rounding error behind; recompute exactly once per full window
+        if self._evicted >= self.values.maxlen:
+            values = list(self.values)
+            self.clear()
+            for value in values:
+                self.values.append(value)
+                self._add(value, 1)
+
+    @staticmethod
+    def _std(count: float, total: float, total_sq: float) -> float:
+        if count == 0:
+            return 0.0
+        mean = total / count
+        return float(np.sqrt(max(total_sq / count - mean * mean, 0.0)))
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def std(self) -> float:
+        """Population standard deviation (as np.std)"""
+        return self._std(self.count, self.total, self.total_sq)
+
+    def downside_std(self) -> float:
+        """Population standard deviation of the negative values"""
+        return self._std(self.neg_count, self.neg_total, self.neg_total_sq)
+
+
 class EnhancedStockTradingEnvironment(gym.Env):
     """
     Enhanced stock trading environment with comprehensive metrics and logging
@@ -47,7 +118,8 @@ class EnhancedStockTradingEnvironment(gym.Env):
                  max_position_size: float = 1.0,   # Maximum position size as fraction of portfolio
                  lookback_window: int = 60,        # Number of days to look back
                  reward_type: str = "return",      # "return", "sharpe", "sortino"
-                 enable_logging: bool = True):
+                 enable_logging: bool = True,
+                 log_history: bool = True):        # Keep per-step logs (off for faster training)
         
         super().__init__()
         
@@ -59,6 +131,7 @@ class EnhancedStockTradingEnvironment(gym.Env):
         self.lookback_window = lookback_window
         self.reward_type = reward_type
         self.enable_logging = enable_logging
+        self.log_history = log_history
         
         # Get data for the specific ticker
         self.stock_data = rl_data[ticker]
@@ -73,16 +146,18 @@ class EnhancedStockTradingEnvironment(gym.Env):
         # Portfolio state
         self.reset_portfolio()
         
-        # Trading history
-        self.trade_history = []
-        self.portfolio_history = []
-        self.action_history = []
-        self.reward_history = []
+        # Trading history, preallocated for a whole episode (see the *_history properties)
+        log_size = len(self.states) if log_history else 0
+        self._portfolio_log = np.zeros(log_size, dtype=PORTFOLIO_DTYPE)
+        self._action_log = np.zeros(log_size, dtype=ACTION_DTYPE)
+        self._trade_log = np.zeros(log_size, dtype=TRADE_DTYPE)
+        self._reward_log = np.zeros(log_size)
+        self._drawdown_log = np.zeros(log_size)
         
         # Performance tracking
-        self.daily_returns = deque(maxlen=252)  # 1 year of returns for Sharpe calculation
-        self.drawdown_history = []
-        self.peak_portfolio_value = initial_balance
+        self.return_moments = _RunningMoments(252)  # 1 year of returns for Sharpe calculation
+        self.daily_returns = self.return_moments.values
+        self._clear_history()
         
         # Action space: 0 = Hold, 1 = Buy, 2 = Sell, with continuous position sizing
         self.action_space = spaces.Box(
@@ -101,6 +176,9 @@ class EnhancedStockTradingEnvironment(gym.Env):
             shape=(market_state_size + portfolio_state_size,),
             dtype=np.float32
         )
+        # Filled in place by _get_observation
+        self._observation = np.zeros(market_state_size + portfolio_state_size, dtype=np.float32)
+        self._market_state = self._observation[:market_state_size].reshape(self.states.shape[1:])
         
         if self.enable_logging:
             logger.info(f"Environment initialized for {ticker}")
@@ -110,7 +188,8 @@ class EnhancedStockTradingEnvironment(gym.Env):
     def _extract_prices(self) -> np.ndarray:
         """Extract actual prices from the state data"""
         # Assuming the first feature in states is the close price
-        return self.states[:, -1, 3]  # Close price is typically at index 3
+        # (states may be float32; portfolio arithmetic stays in float64)
+        return self.states[:, -1, 3].astype(np.float64)  # Close price is typically at index 3
     
     def reset_portfolio(self):
         """Reset portfolio to initial state"""
@@ -128,15 +207,42 @@ class EnhancedStockTradingEnvironment(gym.Env):
         self.reset_portfolio()
         
         # Clear histories
-        self.trade_history.clear()
-        self.portfolio_history.clear()
-        self.action_history.clear()
-        self.reward_history.clear()
-        self.daily_returns.clear()
-        self.drawdown_history.clear()
-        self.peak_portfolio_value = self.initial_balance
+        self._clear_history()
         
         return self._get_observation(), {}
+
+    def _clear_history(self):
+        # Logs are overwritten in place, so only the counts need resetting
+        self._step_count = 0
+        self._trade_count = 0
+        self._trade_counts = [0, 0, 0]  # By ActionType value
+        self._profitable_steps = 0
+        self._reward_total = 0.
+        self._previous_net_worth = None
+        self.return_moments.clear()
+        self.max_drawdown = 0
+        self.peak_portfolio_value = self.initial_balance
+
+    # Views of the steps logged so far this episode (empty if log_history is off)
+    @property
+    def portfolio_history(self) -> np.ndarray:
+        return self._portfolio_log[:self._step_count]
+
+    @property
+    def action_history(self) -> np.ndarray:
+        return self._action_log[:self._step_count]
+
+    @property
+    def trade_history(self) -> np.ndarray:
+        return self._trade_log[:self._trade_count]
+
+    @property
+    def reward_history(self) -> np.ndarray:
+        return self._reward_log[:self._step_count]
+
+    @property
+    def drawdown_history(self) -> np.ndarray:
+        return self._drawdown_log[:self._step_count]
     
     def step(self, action):
         # Parse action
@@ -185,14 +291,7 @@ class EnhancedStockTradingEnvironment(gym.Env):
                     self.balance -= (cost + transaction_cost)
                     self.total_transaction_costs += transaction_cost
                     
-                    self.trade_history.append({
-                        'step': self.current_step,
-                        'action': 'BUY',
-                        'shares': shares_to_buy,
-                        'price': current_price,
-                        'cost': cost,
-                        'transaction_cost': transaction_cost
-                    })
+                    self._record_trade(ActionType.BUY, shares_to_buy, current_price, cost, transaction_cost)
         
         elif action_type == ActionType.SELL.value:
             # Calculate how much to sell
@@ -206,14 +305,7 @@ class EnhancedStockTradingEnvironment(gym.Env):
                 self.balance += (revenue - transaction_cost)
                 self.total_transaction_costs += transaction_cost
                 
-                self.trade_history.append({
-                    'step': self.current_step,
-                    'action': 'SELL',
-                    'shares': shares_to_sell,
-                    'price': current_price,
-                    'revenue': revenue,
-                    'transaction_cost': transaction_cost
-                })
+                self._record_trade(ActionType.SELL, shares_to_sell, current_price, revenue, transaction_cost)
         
         # Calculate new net worth
         self.position_value = self.shares_held * current_price
@@ -224,6 +316,12 @@ class EnhancedStockTradingEnvironment(gym.Env):
         
         return reward
     
+    def _record_trade(self, action: ActionType, shares: int, price: float, value: float, transaction_cost: float):
+        if self.log_history:
+            self._trade_log[self._trade_count] = (self.current_step, action.value, shares, price, value, transaction_cost)
+        self._trade_count += 1
+        self._trade_counts[action.value] += 1
+
     def _calculate_reward(self, previous_net_worth: float) -> float:
         """Calculate reward based on the selected reward type"""
         if self.reward_type == "return":
@@ -233,19 +331,18 @@ class EnhancedStockTradingEnvironment(gym.Env):
         elif self.reward_type == "sharpe":
             # Sharpe ratio-based reward
             if len(self.daily_returns) > 1:
-                returns = np.array(self.daily_returns)
-                if np.std(returns) > 0:
-                    sharpe = np.mean(returns) / np.std(returns) * np.sqrt(252)
+                std = self.return_moments.std()
+                if std > 0:
+                    sharpe = self.return_moments.mean() / std * np.sqrt(252)
                     return sharpe / 100  # Scale down
             return 0
         
         elif self.reward_type == "sortino":
             # Sortino ratio-based reward
             if len(self.daily_returns) > 1:
-                returns = np.array(self.daily_returns)
-                negative_returns = returns[returns < 0]
-                if len(negative_returns) > 0 and np.std(negative_returns) > 0:
-                    sortino = np.mean(returns) / np.std(negative_returns) * np.sqrt(252)
+                downside_std = self.return_moments.downside_std()
+                if self.return_moments.neg_count > 0 and downside_std > 0:
+                    sortino = self.return_moments.mean() / downside_std * np.sqrt(252)
                     return sortino / 100  # Scale down
             return 0
         
@@ -255,39 +352,36 @@ class EnhancedStockTradingEnvironment(gym.Env):
     def _update_portfolio_metrics(self):
         """Update portfolio performance metrics"""
         # Calculate daily return
-        if len(self.portfolio_history) > 0:
-            daily_return = (self.net_worth - self.portfolio_history[-1]['net_worth']) / self.portfolio_history[-1]['net_worth']
-            self.daily_returns.append(daily_return)
+        if self._previous_net_worth is not None:
+            daily_return = (self.net_worth - self._previous_net_worth) / self._previous_net_worth
+            self.return_moments.append(daily_return)
         
         # Update peak and drawdown
         if self.net_worth > self.peak_portfolio_value:
             self.peak_portfolio_value = self.net_worth
         
         current_drawdown = (self.peak_portfolio_value - self.net_worth) / self.peak_portfolio_value
-        self.drawdown_history.append(current_drawdown)
+        if self.log_history:
+            self._drawdown_log[self._step_count] = current_drawdown
+        self.max_drawdown = max(self.max_drawdown, current_drawdown)
     
     def _store_step_data(self, action_type: int, position_size: float, reward: float):
         """Store data for analysis"""
-        self.action_history.append({
-            'step': self.current_step,
-            'action_type': action_type,
-            'position_size': position_size
-        })
-        
-        self.portfolio_history.append({
-            'step': self.current_step,
-            'balance': self.balance,
-            'shares_held': self.shares_held,
-            'position_value': self.position_value,
-            'net_worth': self.net_worth,
-            'price': self.prices[self.current_step]
-        })
-        
-        self.reward_history.append(reward)
+        if self.log_history:
+            i = self._step_count
+            self._action_log[i] = (self.current_step, action_type, position_size)
+            self._portfolio_log[i] = (self.current_step, self.balance, self.shares_held,
+                                      self.position_value, self.net_worth, self.prices[self.current_step])
+            self._reward_log[i] = reward
+        
+        self._step_count += 1
+        self._previous_net_worth = self.net_worth
+        self._profitable_steps += reward > 0
+        self._reward_total += reward
     
     def _calculate_episode_metrics(self) -> Dict:
         """Calculate comprehensive episode metrics"""
-        if len(self.portfolio_history) == 0:
+        if self._step_count == 0:
             return {}
         
         # Basic returns
@@ -295,7 +389,7 @@ class EnhancedStockTradingEnvironment(gym.Env):
         
         # Risk metrics
         returns = np.array(self.daily_returns) if self.daily_returns else np.array([0])
-        max_drawdown = max(self.drawdown_history) if self.drawdown_history else 0
+        max_drawdown = self.max_drawdown
         volatility = np.std(returns) * np.sqrt(252)
         
         # Sharpe ratio
@@ -309,13 +403,10 @@ class EnhancedStockTradingEnvironment(gym.Env):
         calmar_ratio = (np.mean(returns) * 252) / max_drawdown if max_drawdown > 0 else 0
         
         # Trading metrics
-        total_trades = len(self.trade_history)
-        buy_trades = [t for t in self.trade_history if t['action'] == 'BUY']
-        sell_trades = [t for t in self.trade_history if t['action'] == 'SELL']
+        total_trades = self._trade_count
         
         # Win rate calculation (simplified)
-        profitable_trades = len([r for r in self.reward_history if r > 0])
-        win_rate = profitable_trades / len(self.reward_history) if len(self.reward_history) > 0 else 0
+        win_rate = self._profitable_steps / self._step_count
         
         metrics = {
             'total_return': total_return,
@@ -326,13 +417,13 @@ class EnhancedStockTradingEnvironment(gym.Env):
             'volatility': volatility,
             'win_rate': win_rate,
             'total_trades': total_trades,
-            'buy_trades': len(buy_trades),
-            'sell_trades': len(sell_trades),
+            'buy_trades': self._trade_counts[ActionType.BUY.value],
+            'sell_trades': self._trade_counts[ActionType.SELL.value],
             'final_balance': self.balance,
             'final_shares': self.shares_held,
             'final_net_worth': self.net_worth,
             'total_transaction_costs': self.total_transaction_costs,
-            'average_reward': np.mean(self.reward_history) if self.reward_history else 0
+            'average_reward': self._reward_total / self._step_count
         }
         
         if self.enable_logging:
@@ -348,25 +439,25 @@ class EnhancedStockTradingEnvironment(gym.Env):
         """Get current observation"""
         if self.current_step >= len(self.states):
             # Return last available state if we're at the end
-            market_state = self.states[-1].flatten()
+            self._market_state[:] = self.states[-1]
         else:
-            market_state = self.states[self.current_step].flatten()
+            self._market_state[:] = self.states[self.current_step]
         
         # Portfolio state (normalized)
         current_price = self.prices[min(self.current_step, len(self.prices)-1)]
         
-        portfolio_state = np.array([
-            self.balance / self.initial_balance,                    # Normalized balance
-            self.shares_held * current_price / self.initial_balance, # Normalized position value
-            self.net_worth / self.initial_balance,                  # Normalized net worth
-            (self.net_worth - self.initial_balance) / self.initial_balance, # Return
-            len(self.trade_history) / 100,                          # Number of trades (normalized)
-            self.total_transaction_costs / self.initial_balance,    # Transaction costs
-            max(self.drawdown_history) if self.drawdown_history else 0, # Current max drawdown
-            np.std(self.daily_returns) if len(self.daily_returns) > 1 else 0 # Volatility
-        ])
-        
-        return np.concatenate([market_state, portfolio_state]).astype(np.float32)
+        portfolio_state = self._observation[self._market_state.size:]
+        portfolio_state[0] = self.balance / self.initial_balance                     # Normalized balance
+        portfolio_state[1] = self.shares_held * current_price / self.initial_balance # Normalized position value
+        portfolio_state[2] = self.net_worth / self.initial_balance                   # Normalized net worth
+        portfolio_state[3] = (self.net_worth - self.initial_balance) / self.initial_balance # Return
+        portfolio_state[4] = self._trade_count / 100                                 # Number of trades (normalized)
+        portfolio_state[5] = self.total_transaction_costs / self.initial_balance     # Transaction costs
+        portfolio_state[6] = self.max_drawdown                                       # Current max drawdown
+        portfolio_state[7] = self.return_moments.std() if len(self.daily_returns) > 1 else 0 # Volatility
+        
+        # A copy, so callers holding on to observations don't see them change
+        return self._observation.copy()
     
     def render(self, mode='human'):
         """Render environment state"""
@@ -380,11 +471,11 @@ class EnhancedStockTradingEnvironment(gym.Env):
         print(f"Position Value: ${self.position_value:.2f}")
         print(f"Net Worth: ${self.net_worth:.2f}")
         print(f"Total Return: {((self.net_worth - self.initial_balance) / self.initial_balance):.2%}")
-        print(f"Total Trades: {len(self.trade_history)}")
+        print(f"Total Trades: {self._trade_count}")
         print(f"Transaction Costs: ${self.total_transaction_costs:.2f}")
         
-        if self.drawdown_history:
-            print(f"Max Drawdown: {max(self.drawdown_history):.2%}")
+        if self._step_count:
+            print(f"Max Drawdown: {self.max_drawdown:.2%}")
         
         print("=" * 40)
     
@@ -398,9 +489,10 @@ class EnhancedStockTradingEnvironment(gym.Env):
         fig.suptitle(f'{self.ticker} Trading Performance', fontsize=16)
         
         # Portfolio value over time
-        steps = [p['step'] for p in self.portfolio_history]
-        net_worths = [p['net_worth'] for p in self.portfolio_history]
-        prices = [p['price'] for p in self.portfolio_history]
+        history = self.portfolio_history
+        steps = history['step']
+        net_worths = history['net_worth']
+        prices = history['price']
         
         axes[0, 0].plot(steps, net_worths, label='Portfolio Value', linewidth=2)
         axes[0, 0].axhline(y=self.initial_balance, color='r', linestyle='--', label='Initial Balance')
@@ -419,7 +511,7 @@ class EnhancedStockTradingEnvironment(gym.Env):
         axes[0, 1].grid(True)
         
         # Drawdown
-        if self.drawdown_history:
+        if len(self.drawdown_history):
             axes[1, 0].fill_between(range(len(self.drawdown_history)), 
                                    self.drawdown_history, 0, 
                                    alpha=0.3, color='red')
@@ -430,8 +522,7 @@ class EnhancedStockTradingEnvironment(gym.Env):
             axes[1, 0].grid(True)
         
         # Action distribution
-        actions = [a['action_type'] for a in self.action_history]
-        action_counts = [actions.count(i) for i in range(3)]
+        action_counts = np.bincount(self.action_history['action_type'], minlength=3)
         action_labels = ['Hold', 'Buy', 'Sell']
         
         axes[1, 1].pie(action_counts, labels=action_labels, autopct='%1.1f%%')
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _frame_columns(frame: pd.DataFrame) -> Tuple[List[np.ndarray], List[Optional[str]]]:
+    """
+    A frame's columns as arrays np.save can write without pickling (and np.load can memory-map),
+    with what each needs to be turned back into its column: the timezone of tz-aware dates
+    (stored as UTC), 'str' for string and object columns, else None
+    """
+    columns, kinds = [], []
+    for name in frame.columns:
+        column = frame[name]
+        if isinstance(column.dtype, pd.DatetimeTZDtype):
+            kinds.append(str(column.dt.tz))
+            columns.append(column.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy(dtype='datetime64[ns]'))
+        elif column.dtype == object or pd.api.types.is_string_dtype(column.dtype):
+            kinds.append('str')
+            columns.append(column.to_numpy().astype(str))
+        else:
+            kinds.append(None)
+            columns.append(column.to_numpy())
+    return columns, kinds
+
+
+def _frame_from_columns(names: List[str], columns: List[np.ndarray], kinds: List[Optional[str]]) -> pd.DataFrame:
+    """The frame _frame_columns was given"""
+    data = {}
+    for name, column, kind in zip(names, columns, kinds):
+        if kind == 'str':
+            data[name] = column.astype(object)
+        elif kind is not None:
+            data[name] = pd.Series(column).dt.tz_localize('UTC').dt.tz_convert(kind)
+        else:
+            data[name] = column
+    return pd.DataFrame(data)
+
+
+class FeatureCache:
+    """
+    Content-addressed store of processed PPO pipeline output.
+
+    Each entry is a directory named by the hash of everything that determines its
+    contents (e.g. ticker, period, interval, feature pipeline version, source data), holding
+    its arrays and the cleaned frame's columns as .npy files (memory-mapped on load, so
+    loading is close to free) and a meta.json. Least recently used entries are evicted
+    once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3):
+        """
+        Args:
+            cache_dir: Directory entries are kept in
+            max_bytes: Total size the cache is trimmed back to after each store
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(**parts) -> str:
+        """Hash of the (json serialisable) parts that determine an entry"""
+        encoded = json.dumps(parts, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key: str) -> Optional[Tuple[pd.DataFrame, Dict[str, np.ndarray], Dict]]:
+        """
+        (cleaned frame, arrays, meta) of an entry, or None if it isn't cached
+        """
+        entry = self._entry_dir(key)
+        meta_path = os.path.join(entry, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(entry, name + '.npy'), mmap_mode='r') for name in meta['arrays']}
+        columns = [np.load(os.path.join(entry, f'column_{i}.npy'), mmap_mode='r')
+                   for i in range(len(meta['columns']))]
+        frame = _frame_from_columns(meta['columns'], columns, meta['column_kinds'])
+
+        # Mark as recently used for eviction
+        os.utime(meta_path)
+        return frame, arrays, meta
+
+    def store(self, key: str, frame: pd.DataFrame, arrays: Dict[str, np.ndarray], meta: Dict):
+        """
+        Write an entry. Written to a temporary directory and renamed into place,
+        so readers never see half an entry
+        """
+        entry = self._entry_dir(key)
+        if os.path.exists(entry):
+            return
+
+        temp = f"{entry}.tmp{os.getpid()}"
+        os.makedirs(temp, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(temp, name + '.npy'), np.ascontiguousarray(array))
+        columns, kinds = _frame_columns(frame)
+        for i, column in enumerate(columns):
+            np.save(os.path.join(temp, f'column_{i}.npy'), column)
+        with open(os.path.join(temp, 'meta.json'), 'w') as f:
+            json.dump(dict(meta, arrays=list(arrays), columns=[str(name) for name in frame.columns],
+                           column_kinds=kinds, created=time.time()), f)
+
+        try:
+            os.replace(temp, entry)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(temp, ignore_errors=True)
+        self.evict()
+
+    def entries(self) -> List[Tuple[str, float, int]]:
+        """(key, last used time, size in bytes) of every complete entry"""
+        result = []
+        for key in os.listdir(self.cache_dir):
+            meta_path = os.path.join(self._entry_dir(key), 'meta.json')
+            if '.tmp' in key or not os.path.exists(meta_path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(self._entry_dir(key)))
+            result.append((key, os.path.getmtime(meta_path), size))
+        return result
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for key, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for key, _, _ in self.entries():
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
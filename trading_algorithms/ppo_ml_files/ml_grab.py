@@ -1,37 +1,93 @@
-from stable_baselines3 import PPO
+from ppo_ml_files.model_cache import load_model
 from ppo_ml_files.environmentcreator import ActionType, EnhancedStockTradingEnvironment
 from ppo_ml_files.dataprocessor import StockDataProcessor
-import yfinance
+from ppo_ml_files.price_providers import PriceProvider, LocalPriceProvider
+import numpy as np
+import os
+
+
+def _price_points(ticker: str, provider: PriceProvider, time_period: str = "5y", interval: str = "1d") -> list[float]:
+    """
+    Daily value of a ticker, the average of open, high, low and close (as stored in data/)
+    """
+    hist_data = provider.download(ticker, time_period, interval)
+    if hist_data is None:
+        raise FileNotFoundError(f"No price data for {ticker}")
+    return hist_data[["Open", "High", "Low", "Close"]].mean(axis=1).tolist()
+
+
+def _local_provider(tickers: list[str]) -> LocalPriceProvider:
+    """
+    The default provider: the local store, refusing tickers that only have daily values, since
+    the model was trained on real OHLCV bars and synthesised ones would silently skew its features.
+    Checked up front because the processing pipeline skips tickers that fail to load
+    """
+    provider = LocalPriceProvider(allow_synthetic=False)
+    provider.require_ohlcv(tickers)
+    return provider
+
+
+def _model_path(model: str) -> str:
+    """
+    Saved model to load: its NumPy export (model.npz) if there is an up to date one, else model.zip
+    """
+    path = "ppo_ml_files/models/" + model
+    if os.path.exists(path + ".npz") and (not os.path.exists(path + ".zip")
+                                          or os.path.getmtime(path + ".npz") >= os.path.getmtime(path + ".zip")):
+        return path + ".npz"
+    return path + ".zip"
+
+
+class _Holdings:
+    """
+    Balance/shares bookkeeping of one ticker as the model's actions are applied
+    """
+    def __init__(self, starting_balance: float, data_points: list[float]):
+        self.data_points = data_points
+        self.balance_history = [starting_balance]
+        self.shares_history = [0]
+        self.net_worth_history = [starting_balance]
+        self.i = 0
+
+    def apply(self, action):
+        current_balance = self.balance_history[-1]
+        current_shares = self.shares_history[-1]
+
+        if round(action[0]) == ActionType.BUY:
+            amount_to_spend = current_balance * action[1]
+            current_balance -= amount_to_spend
+            current_shares += amount_to_spend / self.data_points[self.i]
+        elif round(action[0]) == ActionType.SELL:
+            amount_to_sell = current_shares * action[1]
+            current_shares -= amount_to_sell
+            current_balance += amount_to_sell * self.data_points[self.i]
+        else:
+            pass
+
+        self.i += 1
+        self.balance_history.append(current_balance)
+        self.shares_history.append(current_shares)
+        self.net_worth_history.append(current_balance + self.data_points[self.i] * current_shares)
 
 
 def ppo_ml_algorithm(ticker: str, starting_balance: float,
-                     time_period: str = "5y", interval: str = "1d", model: str = "final_model", plot_graphs: bool = False):
-    # Load local model
+                     time_period: str = "5y", interval: str = "1d", model: str = "final_model", plot_graphs: bool = False,
+                     provider: PriceProvider | None = None):
+    # Local bars unless a network provider (e.g. YahooPriceProvider) is asked for
+    provider = provider if provider is not None else _local_provider([ticker])
+
+    # Load local model (cached, so only read from disk once per run)
     # print("Loading model")
-    ml_model = PPO.load("ppo_ml_files/models/" + model + ".zip")
+    ml_model = load_model(_model_path(model))
 
     # The second returnee of PSP normalises the stock values by a significant margin.
     # e.g. 200 -> 1.2, because PPOs are generally sensitive
     # This also puts flags on certain indicators
     # print("Loading and processing stock data")
-    _, le_data, _ = StockDataProcessor("ppo_ml_files/dummy_stock", "ppo_ml_files/dummy_cache").process_stocks_pipeline([ticker], time_period, interval)
-
-    yticker = yfinance.Ticker(ticker)
-    hist_data = yticker.history(period="5y")
-    data = hist_data.to_csv(date_format="%d/%m/%y")
-
-    data_points = []
-    for line in data.strip().split('\n'):
-        line = line.strip()
-        if line.startswith("Date"):
-            continue
-        components = line.split(',')
-        key_points = (float(x) for x in components[1:5])
-        data_points.append(sum(key_points) / 4)
+    _, le_data, _ = StockDataProcessor("ppo_ml_files/dummy_stock", "ppo_ml_files/dummy_cache",
+                                       provider).process_stocks_pipeline([ticker], time_period, interval)
 
-    balance_history = [starting_balance]
-    shares_history = [0]
-    net_worth_history = [starting_balance]
+    holdings = _Holdings(starting_balance, _price_points(ticker, provider, time_period, interval))
 
     # print("Running predictions...")
     env = EnhancedStockTradingEnvironment(le_data, ticker, starting_balance, 
@@ -40,32 +96,61 @@ def ppo_ml_algorithm(ticker: str, starting_balance: float,
 
     action, _ = ml_model.predict(obs, deterministic=True)
     info = {}
-    i = 0
     while not info:
         obs, _, _, _, info = env.step(action)
         action, _ = ml_model.predict(obs, deterministic=True)
+        holdings.apply(action)
 
-        current_balance = balance_history[-1]
-        current_shares = shares_history[-1]
+    if plot_graphs:
+        env.plot_performance()
 
-        if round(action[0]) == ActionType.BUY:
-            amount_to_spend = current_balance * action[1]
-            current_balance -= amount_to_spend
-            current_shares += amount_to_spend / data_points[i]
-        elif round(action[0]) == ActionType.SELL:
-            amount_to_sell = current_shares * action[1]
-            current_shares -= amount_to_sell
-            current_balance += amount_to_sell * data_points[i]
-        else:
-            pass
+    return holdings.net_worth_history, env
 
-        i += 1
-        balance_history.append(current_balance)
-        shares_history.append(current_shares)
-        net_worth_history.append(current_balance + data_points[i] * current_shares)
 
-    if plot_graphs:
-        env.plot_performance()
+def ppo_ml_algorithm_batch(tickers: list[str], starting_balance: float,
+                           time_period: str = "5y", interval: str = "1d", model: str = "final_model",
+                           provider: PriceProvider | None = None):
+    """
+    ppo_ml_algorithm over many tickers at once. Every ticker's environment is
+    stepped in lockstep and the policy runs one batched forward pass per step
+    for all tickers still trading, rather than one pass per ticker per step.
+    Returns {ticker: (net worth history, environment)}
+    """
+    ml_model = load_model(_model_path(model))
+    provider = provider if provider is not None else _local_provider(tickers)
+    processor = StockDataProcessor("ppo_ml_files/dummy_stock", "ppo_ml_files/dummy_cache", provider)
+
+    # Processed one ticker at a time, so each is normalised exactly as ppo_ml_algorithm would
+    le_data = {}
+    for ticker in tickers:
+        _, ticker_data, _ = processor.process_stocks_pipeline([ticker], time_period, interval)
+        if ticker_data:
+            le_data.update(ticker_data)
+    tickers = [ticker for ticker in tickers if ticker in le_data]
+
+    envs = [EnhancedStockTradingEnvironment(le_data, ticker, starting_balance,
+                                            transaction_cost=0., enable_logging=False) for ticker in tickers]
+    holdings = [_Holdings(starting_balance, _price_points(ticker, provider, time_period, interval)) for ticker in tickers]
+
+    observations = np.stack([env.reset()[0] for env in envs])
+    actions, _ = ml_model.predict(observations, deterministic=True)
+    active = list(range(len(envs)))
+    while active:
+        still_active = []
+        next_observations = []
+        for row, index in enumerate(active):
+            obs, _, _, _, info = envs[index].step(actions[row])
+            next_observations.append(obs)
+            if not info:
+                still_active.append(index)
+
+        next_actions, _ = ml_model.predict(np.stack(next_observations), deterministic=True)
+        for row, index in enumerate(active):
+            holdings[index].apply(next_actions[row])
 
-    return net_worth_history, env
+        # Keep only the rows of tickers whose episodes are still running
+        keep = [row for row, index in enumerate(active) if index in still_active]
+        actions = next_actions[keep]
+        active = still_active
 
+    return {ticker: (h.net_worth_history, env) for ticker, h, env in zip(tickers, holdings, envs)}
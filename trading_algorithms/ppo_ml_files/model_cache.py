@@ -0,0 +1,65 @@
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+# (absolute path, modification time) -> loaded model
+_models: Dict[Tuple[str, float], object] = {}
+_lock = threading.Lock()
+_configured_threads: Optional[int] = None
+
+
+def configure_torch_threads(threads: int = 1):
+    """
+    Fix torch's CPU thread counts for this process. One thread is fastest for
+    single-observation inference on a small MLP: thread hand-off costs more than the maths
+    """
+    global _configured_threads
+    if _configured_threads == threads:
+        return
+
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(threads)
+    except RuntimeError:
+        # Can only be set before torch starts any parallel work
+        pass
+    _configured_threads = threads
+
+
+def load_model(path: str, threads: int = 1):
+    """
+    Load a PPO model once per process and share it between every caller.
+
+    Args:
+        path: Path to the saved model (.zip, or a NumPy export .npz)
+        threads: Torch CPU threads to use for inference
+
+    The cache is keyed by path and modification time, so a retrained model
+    saved over the old file is picked up on the next call. Policies exported
+    to NumPy (.npz, see numpy_policy.py) load without torch or stable_baselines3.
+    """
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            if path.endswith(".npz"):
+                from ppo_ml_files.numpy_policy import NumpyPolicy
+                model = NumpyPolicy.load(path)
+            else:
+                from stable_baselines3 import PPO
+
+                configure_torch_threads(threads)
+                model = PPO.load(path, device="cpu")
+                model.policy.set_training_mode(False)  # Eval mode: no dropout/batch-norm updates
+
+            # Forget older versions of the same file
+            for stale in [k for k in _models if k[0] == key[0]]:
+                del _models[stale]
+            _models[key] = model
+    return model
+
+
+def clear_model_cache():
+    with _lock:
+        _models.clear()
@@ -0,0 +1,121 @@
+# Export a trained PPO model's deterministic policy to plain NumPy weights (.npz),
+# and run it without importing torch or stable_baselines3
+# Run from trading_algorithms/:
+# python3 -m ppo_ml_files.numpy_policy <MODEL.zip> [OUTPUT.npz]
+# e.g. python3 -m ppo_ml_files.numpy_policy ppo_ml_files/models/final_model.zip
+
+import argparse
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+_ACTIVATIONS = {
+    "Tanh": np.tanh,
+    "ReLU": lambda x: np.maximum(x, 0),
+    "Identity": lambda x: x,
+}
+
+
+class NumpyPolicy:
+    """
+    The deterministic action of an exported PPO MLP policy: the actor network's
+    mean action, clipped to the action space, as PPO.predict(obs, deterministic=True) gives
+    """
+
+    def __init__(self, weights: List[np.ndarray], biases: List[np.ndarray], activations: List[str],
+                 action_low: np.ndarray, action_high: np.ndarray):
+        """
+        Args:
+            weights: (inputs, outputs) matrix of each linear layer, in order
+            biases: Bias of each linear layer
+            activations: Activation after each layer (the last is normally Identity)
+            action_low: Lower bound of each action
+            action_high: Upper bound of each action
+        """
+        self.weights = weights
+        self.biases = biases
+        self.activations = [_ACTIVATIONS[name] for name in activations]
+        self.activation_names = activations
+        self.action_low = action_low
+        self.action_high = action_high
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyPolicy":
+        with np.load(path) as data:
+            layers = int(data["layers"])
+            return cls([data[f"w{i}"] for i in range(layers)], [data[f"b{i}"] for i in range(layers)],
+                       [str(name) for name in data["activations"]], data["action_low"], data["action_high"])
+
+    def save(self, path: str):
+        arrays = {f"w{i}": w for i, w in enumerate(self.weights)}
+        arrays.update({f"b{i}": b for i, b in enumerate(self.biases)})
+        np.savez(path, layers=len(self.weights), activations=np.array(self.activation_names),
+                 action_low=self.action_low, action_high=self.action_high, **arrays)
+
+    def predict(self, observation: np.ndarray, deterministic: bool = True) -> Tuple[np.ndarray, None]:
+        """
+        Same call and return shape as PPO.predict: one observation or a batch of them.
+        Only deterministic prediction is supported (there is no policy noise to sample)
+        """
+        x = np.asarray(observation, dtype=np.float32)
+        for weight, bias, activation in zip(self.weights, self.biases, self.activations):
+            x = activation(x @ weight + bias)
+        return np.clip(x, self.action_low, self.action_high), None
+
+
+def export_policy(model, path: Optional[str] = None) -> NumpyPolicy:
+    """
+    NumpyPolicy of a stable_baselines3 PPO model (or the path of a saved one).
+
+    Args:
+        model: PPO model, or path to its .zip
+        path: Where to also save the exported weights (.npz), if given
+
+    Only MLP policies on flat Box observations without observation normalisation are supported.
+    """
+    import torch.nn as nn
+    from stable_baselines3.common.torch_layers import FlattenExtractor
+
+    if isinstance(model, str):
+        from stable_baselines3 import PPO
+        model = PPO.load(model, device="cpu")
+
+    policy = model.policy
+    if not isinstance(getattr(policy, "pi_features_extractor", policy.features_extractor), FlattenExtractor):
+        raise ValueError("Only MLP policies over flat observations can be exported")
+    if getattr(policy, "squash_output", False):
+        raise ValueError("Policies with squashed output are not supported")
+
+    weights, biases, activations = [], [], []
+    for module in list(policy.mlp_extractor.policy_net) + [policy.action_net]:
+        if isinstance(module, nn.Linear):
+            weights.append(np.ascontiguousarray(module.weight.detach().cpu().numpy().T, dtype=np.float32))
+            biases.append(module.bias.detach().cpu().numpy().astype(np.float32))
+            activations.append("Identity")
+        elif type(module).__name__ in _ACTIVATIONS:
+            # Applies to the linear layer before it
+            activations[-1] = type(module).__name__
+        else:
+            raise ValueError(f"Can't export layer {module}")
+
+    space = model.action_space
+    exported = NumpyPolicy(weights, biases, activations,
+                           space.low.astype(np.float32), space.high.astype(np.float32))
+    if path is not None:
+        exported.save(path)
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a PPO model's policy to NumPy weights")
+    parser.add_argument("model", help="Saved PPO model (.zip)")
+    parser.add_argument("output", nargs="?", help="Where to write the weights (default: the model path with .npz)")
+    args = parser.parse_args()
+
+    output = args.output or args.model.removesuffix(".zip") + ".npz"
+    export_policy(args.model, output)
+    print(f"Exported policy to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import logging
+import os
+import re
+from datetime import date
+from glob import glob
+from typing import List, Optional, Protocol
+
+import pandas as pd
+
+from data_parser import DATE_FORMAT, OHLCV_DIR, get_stock_data
+
+
+class PriceProvider(Protocol):
+    """
+    Where StockDataProcessor gets raw OHLCV data from.
+    Frames have Date, Open, High, Low, Close and Volume columns, oldest first
+    """
+    # Seconds to wait between tickers when downloading many (to be polite to remote APIs)
+    rate_limit: float
+
+    def download(self, ticker: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+        ...
+
+    def list_tickers(self) -> List[str]:
+        ...
+
+    def cache_token(self, ticker: str) -> str:
+        """Changes whenever the data download() would return for ticker changes"""
+        ...
+
+
+def _period_start(end: pd.Timestamp, period: str) -> Optional[pd.Timestamp]:
+    """First date covered by a yfinance-style period ("5d", "6mo", "5y", "ytd", "max") ending at end"""
+    if period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=end.year, month=1, day=1)
+
+    match = re.fullmatch(r"(\d+)(d|mo|y)", period)
+    if match is None:
+        raise ValueError(f"Unsupported period: {period}")
+    amount, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return end - pd.DateOffset(days=amount)
+    if unit == "mo":
+        return end - pd.DateOffset(months=amount)
+    return end - pd.DateOffset(years=amount)
+
+
+# yfinance interval -> pandas resample rule
+_RESAMPLE_RULES = {"1d": None, "1wk": "W-FRI", "1mo": "ME"}
+
+
+class LocalPriceProvider:
+    """
+    Reads the local store the classical backtester uses, so runs are offline and deterministic.
+    Real daily bars come from data/ohlcv/<ticker>.csv (kept up to date by refresh.py from Yahoo).
+    A ticker without them only has data/<ticker>.csv, one averaged value per day: its bars are
+    synthesised, with Open/High/Low/Close all that value and Volume a constant 1, which makes
+    the range, body and volume features constant. Models trained on real bars shouldn't be
+    fed those, so set allow_synthetic=False to get an error instead
+    """
+    rate_limit = 0.0
+
+    def __init__(self, data_dir: str = "data", allow_synthetic: bool = True):
+        self.data_dir = data_dir
+        self.allow_synthetic = allow_synthetic
+        self._warned = set()
+
+    def _ohlcv_path(self, ticker: str) -> str:
+        return os.path.join(self.data_dir, OHLCV_DIR, ticker.lower() + ".csv")
+
+    def has_ohlcv(self, ticker: str) -> bool:
+        """Whether ticker has real bars stored, rather than only daily values"""
+        return os.path.exists(self._ohlcv_path(ticker))
+
+    def require_ohlcv(self, tickers: List[str]):
+        """
+        Raise unless every ticker has real bars stored (or synthesised ones are allowed).
+        Worth checking up front: processing pipelines skip tickers whose download fails
+        """
+        missing = [ticker for ticker in tickers if not self.has_ohlcv(ticker)]
+        if missing and not self.allow_synthetic:
+            raise ValueError(f"No OHLCV bars stored in {os.path.join(self.data_dir, OHLCV_DIR)} for "
+                             f"{', '.join(missing)}; run refresh.py to fetch them, or allow synthesised bars")
+
+    def _synthetic_bars(self, ticker: str) -> Optional[pd.DataFrame]:
+        if not self.allow_synthetic:
+            raise ValueError(f"No OHLCV bars stored for {ticker} ({self._ohlcv_path(ticker)}); "
+                             f"run refresh.py to fetch them, or allow synthesised bars")
+        if ticker not in self._warned:
+            self._warned.add(ticker)
+            logging.getLogger(__name__).warning(
+                "%s: no OHLCV bars stored, synthesising them from daily values (constant range and volume)", ticker)
+
+        rows = get_stock_data(ticker, self.data_dir)
+        if not rows:
+            return None
+        values = [value for _, value in rows]
+        return pd.DataFrame({"Date": pd.to_datetime([day for day, _ in rows]), "Open": values, "High": values,
+                             "Low": values, "Close": values, "Volume": 1.0})
+
+    def download(self, ticker: str, period: str = "5y", interval: str = "1d") -> Optional[pd.DataFrame]:
+        if not os.path.exists(os.path.join(self.data_dir, ticker.lower() + ".csv")) and not self.has_ohlcv(ticker):
+            return None
+        if interval not in _RESAMPLE_RULES:
+            raise ValueError(f"Unsupported interval for local data: {interval}")
+
+        if self.has_ohlcv(ticker):
+            data = pd.read_csv(self._ohlcv_path(ticker))
+            data["Date"] = pd.to_datetime(data["Date"], format=DATE_FORMAT)
+        else:
+            data = self._synthetic_bars(ticker)
+        if data is None or data.empty:
+            return None
+
+        start = _period_start(data["Date"].iloc[-1], period)
+        if start is not None:
+            data = data[data["Date"] > start]
+
+        rule = _RESAMPLE_RULES[interval]
+        if rule is not None:
+            data = data.resample(rule, on="Date").agg(
+                {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+            ).dropna().reset_index()
+
+        return data.reset_index(drop=True)
+
+    def list_tickers(self) -> List[str]:
+        paths = glob(os.path.join(self.data_dir, "*.csv"))
+        return sorted(os.path.basename(path)[:-len(".csv")].upper() for path in paths)
+
+    def cache_token(self, ticker: str) -> str:
+        path = os.path.abspath(self._ohlcv_path(ticker) if self.has_ohlcv(ticker)
+                               else os.path.join(self.data_dir, ticker.lower() + ".csv"))
+        if not os.path.exists(path):
+            return f"{path}:missing"
+        stat = os.stat(path)
+        return f"{path}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class YahooPriceProvider:
+    """
+    Downloads from Yahoo Finance. Opt-in: needs network access and results change over time
+    """
+    rate_limit = 0.1
+
+    def download(self, ticker: str, period: str = "5y", interval: str = "1d") -> Optional[pd.DataFrame]:
+        import yfinance as yf
+
+        data = yf.Ticker(ticker).history(period=period, interval=interval)
+        if data.empty:
+            return None
+        return data.reset_index()
+
+    def list_tickers(self) -> List[str]:
+        # Download S&P 500 list from Wikipedia
+        url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
+        tables = pd.read_html(url)
+        tickers = tables[0]['Symbol'].tolist()
+        # Clean tickers (remove dots, etc.)
+        return [ticker.replace('.', '-') for ticker in tickers]
+
+    def cache_token(self, ticker: str) -> str:
+        # Yahoo gains a new day of data every day
+        return f"yahoo:{date.today().isoformat()}"
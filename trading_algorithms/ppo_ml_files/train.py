@@ -0,0 +1,226 @@
+# Train the PPO model ml_grab.py uses, on many tickers at once from local data
+# Run from trading_algorithms/ (so data/ and ppo_ml_files/ resolve):
+# python3 -m ppo_ml_files.train [TICKERS...] [--timesteps N] [--workers N] [--name final_model]
+# e.g. python3 -m ppo_ml_files.train AAPL MSFT BHP.AX --timesteps 200000 --workers 4
+#
+# With no tickers, trains on every csv in --data-dir. Tickers need real OHLCV bars stored
+# (data/ohlcv/, fetched by refresh.py), the same as ml_grab.py needs to evaluate them, unless
+# --allow-synthetic is given. Each worker process runs its own
+# environment, cycling through its share of the tickers one episode at a time.
+# Checkpoints go to <output-dir>/checkpoints/ every --checkpoint-every steps and the
+# final model to <output-dir>/<name>.zip.
+
+import argparse
+import os
+import time
+from typing import Dict, List, Optional
+
+import gymnasium as gym
+
+from ppo_ml_files.dataprocessor import StockDataProcessor
+from ppo_ml_files.environmentcreator import EnhancedStockTradingEnvironment
+from ppo_ml_files.model_cache import configure_torch_threads
+from ppo_ml_files.price_providers import LocalPriceProvider
+
+
+def load_rl_data(tickers: List[str], period: str = "5y", interval: str = "1d",
+                 data_dir: str = "data", cache_dir: str = "ppo_ml_files/dummy_cache",
+                 allow_synthetic: bool = False) -> Dict:
+    """
+    rl_data of every ticker with enough data for at least one step.
+
+    Args:
+        tickers: Stocks to load
+        period: Time period of data for each ticker
+        interval: Data interval
+        data_dir: Directory of the local price csvs
+        cache_dir: Feature cache directory (shared with ml_grab, so its features match training)
+        allow_synthetic: Train on bars synthesised from daily values for tickers without real
+                         OHLCV bars, instead of raising (ml_grab refuses to evaluate on those)
+
+    Each ticker is processed on its own, exactly as ml_grab.ppo_ml_algorithm does at inference.
+    """
+    provider = LocalPriceProvider(data_dir, allow_synthetic)
+    provider.require_ohlcv(tickers)
+    processor = StockDataProcessor("ppo_ml_files/dummy_stock", cache_dir, provider)
+    rl_data = {}
+    for ticker in tickers:
+        _, ticker_data, _ = processor.process_stocks_pipeline([ticker], period, interval)
+        if ticker_data and len(ticker_data[ticker]['states']) > 1:
+            rl_data.update(ticker_data)
+    return rl_data
+
+
+class TickerCycleEnv(gym.Env):
+    """
+    One environment over several tickers: each reset moves on to the next ticker's episode
+    """
+
+    def __init__(self, rl_data: Dict, tickers: List[str], initial_balance: float = 10000,
+                 transaction_cost: float = 0.001, reward_type: str = "return"):
+        super().__init__()
+        self.envs = [EnhancedStockTradingEnvironment(rl_data, ticker, initial_balance, transaction_cost,
+                                                     reward_type=reward_type, enable_logging=False,
+                                                     log_history=False)
+                     for ticker in tickers]
+        shapes = {env.observation_space.shape for env in self.envs}
+        if len(shapes) != 1:
+            raise ValueError(f"Tickers have different observation shapes: {shapes}")
+        self.observation_space = self.envs[0].observation_space
+        self.action_space = self.envs[0].action_space
+        self.current = -1
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        self.current = (self.current + 1) % len(self.envs)
+        return self.envs[self.current].reset(seed=seed, options=options)
+
+    def step(self, action):
+        return self.envs[self.current].step(action)
+
+
+class _EnvFactory:
+    """
+    Builds one worker's environment inside its subprocess. Only the settings are pickled
+    across; the worker reads its tickers' features from the feature cache itself
+    (memory-mapped) rather than having every state window copied to it
+    """
+
+    def __init__(self, tickers: List[str], args: argparse.Namespace):
+        self.tickers = tickers
+        self.period = args.period
+        self.interval = args.interval
+        self.data_dir = args.data_dir
+        self.cache_dir = args.cache_dir
+        self.initial_balance = args.initial_balance
+        self.transaction_cost = args.transaction_cost
+        self.reward_type = args.reward_type
+        self.allow_synthetic = args.allow_synthetic
+
+    def __call__(self) -> gym.Env:
+        from stable_baselines3.common.monitor import Monitor
+
+        # Parallelism comes from the worker processes, so keep each to one torch thread
+        configure_torch_threads(1)
+        rl_data = load_rl_data(self.tickers, self.period, self.interval, self.data_dir, self.cache_dir,
+                               self.allow_synthetic)
+        return Monitor(TickerCycleEnv(rl_data, self.tickers, self.initial_balance,
+                                      self.transaction_cost, self.reward_type))
+
+
+def _split(tickers: List[str], parts: int) -> List[List[str]]:
+    """Round-robin tickers into (at most) parts non-empty groups"""
+    groups = [tickers[i::parts] for i in range(parts)]
+    return [group for group in groups if group]
+
+
+def _throughput_callback(report_every: int):
+    from stable_baselines3.common.callbacks import BaseCallback
+
+    class ThroughputCallback(BaseCallback):
+        """Print environment steps per second every report_every steps"""
+
+        def _on_training_start(self):
+            self.start = time.perf_counter()
+            self.start_steps = self.num_timesteps
+            self.next_report = self.num_timesteps + report_every
+
+        def _on_step(self) -> bool:
+            if self.num_timesteps >= self.next_report:
+                elapsed = time.perf_counter() - self.start
+                rate = (self.num_timesteps - self.start_steps) / elapsed
+                print(f"{self.num_timesteps} steps, {rate:.0f} steps/s")
+                self.next_report += report_every
+            return True
+
+    return ThroughputCallback()
+
+
+def train(args: argparse.Namespace) -> Optional[str]:
+    """
+    Train (or continue training) a PPO model as described by the command line arguments;
+    returns the path of the saved model, or None if there was nothing to train on
+    """
+    from stable_baselines3 import PPO
+    from stable_baselines3.common.callbacks import CallbackList, CheckpointCallback
+    from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+
+    tickers = args.tickers or LocalPriceProvider(args.data_dir).list_tickers()
+    # Build (or reuse) each ticker's cached features once up front, so workers only read them
+    usable = list(load_rl_data(tickers, args.period, args.interval, args.data_dir, args.cache_dir,
+                               args.allow_synthetic))
+    skipped = [ticker for ticker in tickers if ticker not in usable]
+    if skipped:
+        print(f"Skipping (no usable data): {', '.join(skipped)}")
+    if not usable:
+        return None
+
+    factories = [_EnvFactory(group, args) for group in _split(usable, args.workers)]
+    vec_env = SubprocVecEnv(factories) if len(factories) > 1 else DummyVecEnv(factories)
+    print(f"Training on {len(usable)} tickers in {len(factories)} environments")
+
+    configure_torch_threads(args.torch_threads)
+    if args.resume:
+        model = PPO.load(args.resume, env=vec_env, device="cpu")
+    else:
+        model = PPO("MlpPolicy", vec_env, n_steps=args.n_steps, batch_size=args.batch_size,
+                    learning_rate=args.learning_rate, seed=args.seed, device="cpu", verbose=0)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    callbacks = CallbackList([
+        # save_freq counts calls, and each call is one step of every environment
+        CheckpointCallback(save_freq=max(args.checkpoint_every // len(factories), 1),
+                           save_path=os.path.join(args.output_dir, "checkpoints"), name_prefix=args.name),
+        _throughput_callback(args.report_every),
+    ])
+
+    start = time.perf_counter()
+    start_steps = model.num_timesteps if args.resume else 0
+    try:
+        model.learn(total_timesteps=args.timesteps, callback=callbacks, reset_num_timesteps=not args.resume)
+    finally:
+        vec_env.close()
+    elapsed = time.perf_counter() - start
+    # Rollouts are whole, so this can be a little past args.timesteps
+    trained = model.num_timesteps - start_steps
+
+    path = os.path.join(args.output_dir, args.name)
+    model.save(path)
+    print(f"Trained {trained} steps in {elapsed:.1f}s ({trained / elapsed:.0f} steps/s)")
+    print(f"Saved model to {path}.zip")
+    return path + ".zip"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the PPO trading model on local data")
+    parser.add_argument("tickers", nargs="*", help="Stocks to train on (default: every csv in --data-dir)")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--cache-dir", default="ppo_ml_files/dummy_cache", help="Feature cache directory")
+    parser.add_argument("--allow-synthetic", action="store_true",
+                        help="Train on bars synthesised from daily values for tickers without OHLCV bars")
+    parser.add_argument("--period", default="5y")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--timesteps", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Environment worker processes (default: one per CPU)")
+    parser.add_argument("--torch-threads", type=int, default=1, help="Torch threads for the policy updates")
+    parser.add_argument("--n-steps", type=int, default=2048, help="PPO rollout length per environment")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--learning-rate", type=float, default=3e-4)
+    parser.add_argument("--reward-type", default="return", choices=["return", "sharpe", "sortino"])
+    parser.add_argument("--initial-balance", type=float, default=10000)
+    parser.add_argument("--transaction-cost", type=float, default=0.001)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--checkpoint-every", type=int, default=50000, help="Save a checkpoint every N steps")
+    parser.add_argument("--report-every", type=int, default=10000, help="Print steps/s every N steps")
+    parser.add_argument("--output-dir", default="ppo_ml_files/models")
+    parser.add_argument("--name", default="final_model", help="File name (without .zip) of the final model")
+    parser.add_argument("--resume", help="Continue training from this saved model")
+    args = parser.parse_args()
+
+    if train(args) is None:
+        print("No tickers with usable data")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# Record the classical strategies trading in the PPO environment, as
+# (observation, action, reward) data for behaviour cloning / offline RL
+# Run from trading_algorithms/:
+# python3 -m ppo_ml_files.trajectories <CONFIG> [--output-dir DIR] [--workers N] [--allow-synthetic]
+# e.g. python3 -m ppo_ml_files.trajectories configs/sample.json --workers 4
+#
+# CONFIG is a batch_runner.py config: its tickers, algorithms, data_dir, start_balance and workers are used.
+# One shard (<output-dir>/<ticker>.npz) is written per ticker, holding every strategy's episode.
+# Like training, tickers need real OHLCV bars stored (data/ohlcv/, fetched by refresh.py) unless
+# --allow-synthetic is given.
+#
+# Observations aren't stored whole: consecutive observations share all but one day of their
+# 60 day market window, so a shard holds the ticker's feature matrix once plus, per step,
+# where its window starts and the 8 portfolio values. observations() rebuilds them exactly.
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ppo_ml_files.dataprocessor import StockDataProcessor, SEQUENCE_LENGTH
+from ppo_ml_files.environmentcreator import ActionType, EnhancedStockTradingEnvironment
+from ppo_ml_files.price_providers import LocalPriceProvider
+
+
+def _strategy_action(balance: float, shares: float, new_balance: float, new_shares: float) -> np.ndarray:
+    """
+    A strategy's move as an environment action: [action type, fraction of balance spent / shares sold]
+    """
+    if new_shares > shares and balance > 0:
+        return np.array([ActionType.BUY.value, min((balance - new_balance) / balance, 1.)], dtype=np.float32)
+    if new_shares < shares and shares > 0:
+        return np.array([ActionType.SELL.value, min((shares - new_shares) / shares, 1.)], dtype=np.float32)
+    return np.array([ActionType.HOLD.value, 0.], dtype=np.float32)
+
+
+def generate_ticker(ticker: str, algorithms: List[Dict], output_dir: str, data_dir: str = "data",
+                    cache_dir: str = "ppo_ml_files/dummy_cache", initial_balance: float = 1000,
+                    period: str = "5y", interval: str = "1d", seed: int = 0, allow_synthetic: bool = False) -> int:
+    """
+    Run every strategy for one episode of ticker's environment and write the shard;
+    returns the number of steps written.
+
+    Args:
+        ticker: Stock to trade
+        algorithms: [{"name": ..., "type": <registered strategy>, "params": [...]}], as in batch_runner configs
+        output_dir: Directory the shard is written to
+        data_dir: Directory of the local price csvs
+        cache_dir: Feature cache directory
+        initial_balance: Starting balance of both the strategies and the environment
+        period: Time period of data
+        interval: Data interval
+        seed: Seed for strategies that make random choices
+        allow_synthetic: Use bars synthesised from daily values if ticker has no real OHLCV bars,
+                         instead of raising
+    """
+    from algorithms.algorithm_factory import algorithm_create_by_name
+
+    provider = LocalPriceProvider(data_dir, allow_synthetic)
+    provider.require_ohlcv([ticker])
+    processor = StockDataProcessor("ppo_ml_files/dummy_stock", cache_dir, provider)
+    frame, rl_data, _ = processor.process_stocks_pipeline([ticker], period, interval)
+    if not rl_data or len(rl_data[ticker]['states']) < 2:
+        return 0
+    # Unscaled closes, one per row of the feature matrix the states are windows of
+    closes = frame['Close'].to_numpy(dtype=float)
+    states = rl_data[ticker]['states']
+    env = EnhancedStockTradingEnvironment(rl_data, ticker, initial_balance, enable_logging=False,
+                                          log_history=False)
+
+    steps = env.max_steps
+    window_starts, portfolios, actions, rewards, dones, strategy_ids = [], [], [], [], [], []
+    for strategy_id, spec in enumerate(algorithms):
+        random.seed(seed)
+        algorithm = algorithm_create_by_name(spec["type"], initial_balance, 0, spec.get("params", []))
+
+        # The strategy sees every day up to the last of the current observation's window
+        for close in closes[:SEQUENCE_LENGTH - 1]:
+            algorithm.give_data_point(close)
+
+        observation, _ = env.reset()
+        episode_portfolio = np.empty((steps, 8), dtype=np.float32)
+        episode_actions = np.empty((steps, 2), dtype=np.float32)
+        episode_rewards = np.empty(steps, dtype=np.float32)
+        for step in range(steps):
+            episode_portfolio[step] = observation[-8:]
+            balance, shares = algorithm.get_current_balance(), algorithm.get_current_shares()
+            algorithm.give_data_point(closes[step + SEQUENCE_LENGTH - 1])
+            action = _strategy_action(balance, shares, algorithm.get_current_balance(), algorithm.get_current_shares())
+            observation, reward, _, _, _ = env.step(action)
+            episode_actions[step] = action
+            episode_rewards[step] = reward
+
+        window_starts.append(np.arange(steps, dtype=np.int32))
+        portfolios.append(episode_portfolio)
+        actions.append(episode_actions)
+        rewards.append(episode_rewards)
+        episode_dones = np.zeros(steps, dtype=bool)
+        episode_dones[-1] = True
+        dones.append(episode_dones)
+        strategy_ids.append(np.full(steps, strategy_id, dtype=np.int16))
+
+    # The feature rows every window covers, once
+    features = np.ascontiguousarray(np.concatenate([states[0], states[1:steps, -1]]))
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, ticker.lower() + ".npz")
+    temp = path + f".tmp{os.getpid()}.npz"
+    np.savez(temp, ticker=ticker, strategies=np.array([spec.get("name", spec["type"]) for spec in algorithms]),
+             features=features, window_starts=np.concatenate(window_starts), portfolio=np.concatenate(portfolios),
+             actions=np.concatenate(actions), rewards=np.concatenate(rewards), dones=np.concatenate(dones),
+             strategy_ids=np.concatenate(strategy_ids))
+    os.replace(temp, path)
+    return steps * len(algorithms)
+
+
+def load_shard(path: str) -> Dict[str, np.ndarray]:
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def observations(shard: Dict[str, np.ndarray], indices: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Environment observations of the given steps (default: all) of a shard
+    """
+    if indices is None:
+        indices = np.arange(len(shard['window_starts']))
+    starts = shard['window_starts'][indices]
+    windows = shard['features'][starts[:, None] + np.arange(SEQUENCE_LENGTH)]
+    return np.concatenate([windows.reshape(len(indices), -1), shard['portfolio'][indices]], axis=1)
+
+
+def _generate_job(args) -> int:
+    return generate_ticker(*args)
+
+
+def generate(config: Dict, output_dir: str, allow_synthetic: bool = False) -> int:
+    """
+    Write a shard per config ticker, in parallel over config["workers"] processes; returns total steps
+    """
+    # Checked before any work starts, rather than by whichever job reaches a bad ticker first
+    LocalPriceProvider(config["data_dir"], allow_synthetic).require_ohlcv(config["tickers"])
+    jobs = [(ticker, config["algorithms"], output_dir, config["data_dir"], "ppo_ml_files/dummy_cache",
+             config["start_balance"], "5y", "1d", 0, allow_synthetic) for ticker in config["tickers"]]
+    if config["workers"] > 1:
+        with ProcessPoolExecutor(max_workers=config["workers"]) as executor:
+            return sum(executor.map(_generate_job, jobs))
+    return sum(_generate_job(job) for job in jobs)
+
+
+def main():
+    from batch_runner import load_config
+
+    parser = argparse.ArgumentParser(description="Record classical strategies' trades as PPO training data")
+    parser.add_argument("config", help="batch_runner config (tickers, algorithms, ...)")
+    parser.add_argument("--output-dir", default="ppo_ml_files/trajectories")
+    parser.add_argument("--workers", type=int, help="Override the config's worker count")
+    parser.add_argument("--allow-synthetic", action="store_true",
+                        help="Use bars synthesised from daily values for tickers without OHLCV bars")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.workers is not None:
+        config["workers"] = args.workers
+
+    start = time.perf_counter()
+    steps = generate(config, args.output_dir, args.allow_synthetic)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {steps} steps to {args.output_dir} in {elapsed:.1f}s ({steps / elapsed:.0f} steps/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# Price series loaded once into shared memory, for worker processes to read without parsing
+# the csvs again or being sent pickled copies: the panel is one float64 array holding every
+# ticker's prices back to back, and workers are given a small handle to attach to it by
+#
+#   with PricePanel.load(tickers, "data") as panel:
+#       executor.map(job, [panel.handle] * n, ...)
+#   # in the worker
+#   prices = attach(handle).series("AAPL")
+#
+# Views are read-only; the process that created the panel frees the memory when it's closed.
+
+import sys
+from dataclasses import dataclass
+from datetime import date
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# Panels this process has created or attached to, by shared memory name
+_attached: dict[str, "PricePanel"] = {}
+
+
+@dataclass(frozen=True)
+class PanelHandle:
+    """
+    What a worker needs to attach to a panel: the shared memory block's name, and where each ticker's prices are
+    """
+    name: str
+    offsets: dict[str, tuple[int, int]]
+
+
+class PricePanel:
+    def __init__(self, memory: shared_memory.SharedMemory, offsets: dict[str, tuple[int, int]], owner: bool):
+        self.memory = memory
+        self.offsets = offsets
+        self.owner = owner
+        total = max((end for _, end in offsets.values()), default=0)
+        self.values = np.ndarray((total,), dtype=np.float64, buffer=memory.buf)
+        self.values.flags.writeable = False
+
+    @classmethod
+    def create(cls, prices: dict[str, list[float]]) -> "PricePanel":
+        """
+        A new panel holding a copy of each ticker's prices
+        """
+        offsets = {}
+        start = 0
+        for ticker, series in prices.items():
+            offsets[ticker] = (start, start + len(series))
+            start += len(series)
+
+        # A zero size block isn't allowed
+        memory = shared_memory.SharedMemory(create=True, size=max(start, 1) * 8)
+        values = np.ndarray((start,), dtype=np.float64, buffer=memory.buf)
+        for ticker, series in prices.items():
+            values[offsets[ticker][0]:offsets[ticker][1]] = series
+        del values
+        panel = _attached[memory.name] = cls(memory, offsets, owner=True)
+        return panel
+
+    @classmethod
+    def load(cls, tickers: list[str], data_dir: str = "data", start_date: str | None = None,
+             end_date: str | None = None) -> "PricePanel":
+        """
+        A new panel of the tickers' stored prices, optionally cut to ISO dates (inclusive)
+        """
+        from data_parser import get_stock_data
+
+        start = date.fromisoformat(start_date) if start_date else date.min
+        end = date.fromisoformat(end_date) if end_date else date.max
+        return cls.create({stock: [value for day, value in get_stock_data(stock, data_dir) if start <= day <= end]
+                           for stock in tickers})
+
+    @classmethod
+    def attach(cls, handle: PanelHandle) -> "PricePanel":
+        """
+        Another process's panel. Prefer the module's attach(), which only attaches once per process
+        """
+        if sys.version_info >= (3, 13):
+            # Otherwise a process that wasn't started by multiprocessing (so doesn't share the
+            # owner's resource tracker) would free the panel when it exits
+            memory = shared_memory.SharedMemory(name=handle.name, track=False)
+        else:
+            memory = shared_memory.SharedMemory(name=handle.name)
+        return cls(memory, handle.offsets, owner=False)
+
+    @property
+    def handle(self) -> PanelHandle:
+        return PanelHandle(self.memory.name, self.offsets)
+
+    @property
+    def tickers(self) -> list[str]:
+        return list(self.offsets)
+
+    def __getitem__(self, ticker: str) -> np.ndarray:
+        """
+        A read-only view of a ticker's prices
+        """
+        start, end = self.offsets[ticker]
+        return self.values[start:end]
+
+    def series(self, ticker: str) -> memoryview:
+        """
+        A ticker's prices as a sequence of floats, without copying them. Faster than the
+        array view to loop over one price at a time (as back tests do): items are plain floats
+        """
+        return self[ticker].data
+
+    def close(self):
+        """
+        Let go of the panel; the owner also frees it, so every view of it must be finished with
+        """
+        self.values = None
+        _attached.pop(self.memory.name, None)
+        if self.owner:
+            self.memory.unlink()
+        self.memory.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(handle: PanelHandle) -> PricePanel:
+    """
+    The panel a handle refers to, attached to once per process (and not at all by the
+    process that created it)
+    """
+    panel = _attached.get(handle.name)
+    if panel is None:
+        panel = _attached[handle.name] = PricePanel.attach(handle)
+    return panel
@@ -0,0 +1,114 @@
+# Opt-in per-tick profiling of TradingAlgorithm phases.
+# Attaching wraps an algorithm's phase methods on that instance only; algorithms
+# that aren't attached run the plain methods, so disabled profiling costs nothing.
+#
+#   profiler = Profiler()
+#   profiler.attach(algorithm, "SIMPLE MA")
+#   backtest(algorithm, data, False)
+#   profiler.print_report()
+
+import json
+import time
+
+from algorithms.algorithm_class import TradingAlgorithm
+
+# "tick" is the whole of give_data_point; the rest are its phases
+PHASES = ("tick", "record_data_point", "update_indicators", "decide", "record_holdings")
+_METHODS = {"tick": "give_data_point"}
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed histogram of durations in nanoseconds, with 4 buckets per
+    power of two, so percentiles are accurate to within ~20% in constant memory
+    """
+    def __init__(self):
+        self.counts = [0] * (64 * 4)
+        self.count = 0
+        self.total = 0
+
+    def add(self, ns: int):
+        bits = ns.bit_length()
+        # Top bit selects the power of two, the next two bits the bucket within it
+        index = (bits << 2) | ((ns >> (bits - 3)) & 3) if bits > 2 else ns
+        self.counts[index] += 1
+        self.count += 1
+        self.total += ns
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add every duration other has seen"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+
+    @staticmethod
+    def _bucket_value(index: int) -> float:
+        bits = index >> 2
+        if bits < 3:
+            return index
+        lower = (4 | (index & 3)) << (bits - 3)
+        return lower + (1 << (bits - 3)) / 2
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return 0
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return self._bucket_value(index)
+        return 0
+
+
+def _timed(method, histogram: LatencyHistogram):
+    clock = time.perf_counter_ns
+    add = histogram.add
+
+    def timed(*args):
+        start = clock()
+        result = method(*args)
+        add(clock() - start)
+        return result
+    return timed
+
+
+class Profiler:
+    def __init__(self):
+        self.histograms: dict[str, dict[str, LatencyHistogram]] = {}
+
+    def attach(self, algorithm: TradingAlgorithm, name: str):
+        histograms = self.histograms.setdefault(name, {phase: LatencyHistogram() for phase in PHASES})
+        for phase in PHASES:
+            method_name = _METHODS.get(phase, phase)
+            setattr(algorithm, method_name, _timed(getattr(algorithm, method_name), histograms[phase]))
+
+    def detach(self, algorithm: TradingAlgorithm):
+        for phase in PHASES:
+            vars(algorithm).pop(_METHODS.get(phase, phase), None)
+
+    def report(self) -> dict[str, dict[str, dict[str, float]]]:
+        return {
+            name: {
+                phase: {
+                    "count": h.count,
+                    "total_ms": h.total / 1e6,
+                    "mean_us": h.total / h.count / 1e3 if h.count else 0,
+                    "p50_us": h.percentile(0.5) / 1e3,
+                    "p99_us": h.percentile(0.99) / 1e3,
+                }
+                for phase, h in histograms.items()
+            }
+            for name, histograms in self.histograms.items()
+        }
+
+    def write_report(self, path: str):
+        with open(path, "w") as OUTPUT:
+            json.dump(self.report(), OUTPUT, indent=2)
+
+    def print_report(self):
+        for name, phases in self.report().items():
+            print(f"# {name}")
+            for phase, stats in phases.items():
+                print(f"  {phase:18} mean {stats['mean_us']:8.2f}us  p50 {stats['p50_us']:8.2f}us  "
+                      f"p99 {stats['p99_us']:8.2f}us  total {stats['total_ms']:9.2f}ms")
@@ -0,0 +1,133 @@
+# Incrementally brings data/ up to date, then advances checkpointed algorithms
+# and their running metrics by just the new rows: checkpoints only hold what each algorithm
+# needs to carry on (see algorithms/checkpoint.py) and metrics are running accumulators, so a
+# refresh costs the same however much history has built up
+# python3 refresh.py [--source-dir DIR] [--checkpoint-dir DIR] [STOCK ...]
+# e.g. python3 refresh.py --checkpoint-dir checkpoints aapl bhp.ax
+
+import argparse
+import os
+import pickle
+from datetime import date
+from glob import glob
+from os.path import basename, join
+
+from algorithms.algorithm_class import TradingAlgorithm
+from algorithms.checkpoint import load_checkpoint, save_checkpoint
+from data_parser import OHLCV_DIR, OHLCV_HEADER, append_stock_data, get_last_date, parse_csv
+from data_sources import DataSource, LocalDataSource, YahooDataSource, bar_values
+from metrics import OnlineMetrics
+
+
+def _metrics_path(checkpoint_path: str) -> str:
+    return checkpoint_path[:-len(".pkl")] + ".metrics"
+
+
+def _save_metrics(metrics: OnlineMetrics, path: str):
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as OUTPUT:
+        pickle.dump(metrics, OUTPUT, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+
+def _feed(algorithm: TradingAlgorithm, metrics: OnlineMetrics, prices: list[float]):
+    worth_seen = len(algorithm.worth_history)
+    balance_seen = len(algorithm.balance_history)
+    for price in prices:
+        algorithm.give_data_point(price)
+    for worth in algorithm.worth_history[worth_seen:]:
+        metrics.update(worth)
+    for balance in algorithm.balance_history[balance_seen:]:
+        metrics.update_balance(balance)
+
+
+def start_tracking(stockname: str, name: str, algorithm: TradingAlgorithm,
+                   data_dir: str = "data", checkpoint_dir: str = "checkpoints"):
+    """
+    Run a fresh algorithm over a stock's stored history once and checkpoint it,
+    so later refreshes only have to feed it new rows
+    """
+    stock_dir = join(checkpoint_dir, stockname.lower())
+    os.makedirs(stock_dir, exist_ok=True)
+    metrics = OnlineMetrics()
+    _feed(algorithm, metrics, parse_csv(stockname.lower() + ".csv", data_dir))
+
+    path = join(stock_dir, name + ".pkl")
+    save_checkpoint(algorithm, path)
+    _save_metrics(metrics, _metrics_path(path))
+
+
+def advance_checkpoints(stockname: str, prices: list[float], checkpoint_dir: str = "checkpoints") -> dict[str, OnlineMetrics]:
+    """
+    Feed new prices to every algorithm checkpointed for a stock
+    """
+    results: dict[str, OnlineMetrics] = {}
+    for path in sorted(glob(join(checkpoint_dir, stockname.lower(), "*.pkl"))):
+        if os.path.exists(_metrics_path(path)):
+            algorithm = load_checkpoint(path)
+            with open(_metrics_path(path), "rb") as INPUT:
+                metrics = pickle.load(INPUT)
+        else:
+            # One-off catch up for checkpoints made without start_tracking, which needs the full histories
+            algorithm = load_checkpoint(path, histories=True)
+            metrics = OnlineMetrics()
+            for worth in algorithm.worth_history:
+                metrics.update(worth)
+            for balance in algorithm.balance_history:
+                metrics.update_balance(balance)
+
+        _feed(algorithm, metrics, prices)
+        save_checkpoint(algorithm, path)
+        _save_metrics(metrics, _metrics_path(path))
+        results[basename(path)[:-len(".pkl")]] = metrics
+
+    return results
+
+
+def refresh_stock(stockname: str, source: DataSource, data_dir: str = "data",
+                  checkpoint_dir: str | None = None) -> list[tuple[date, float]]:
+    """
+    Fetch only rows after the last stored date, append them, and advance any checkpoints.
+    Returns the new rows
+    """
+    last_date = get_last_date(stockname, data_dir)
+    if hasattr(source, "fetch_bars"):
+        # Sources with full bars also keep data/ohlcv/ up to date, which the PPO features are
+        # built from. Both files are brought up to date from one fetch, from whichever is behind
+        ohlcv_dir = join(data_dir, OHLCV_DIR)
+        ohlcv_last_date = get_last_date(stockname, ohlcv_dir)
+        behind = None if last_date is None or ohlcv_last_date is None else min(last_date, ohlcv_last_date)
+        bars = source.fetch_bars(stockname, behind)
+        new_bars = [bar for bar in bars if ohlcv_last_date is None or bar[0] > ohlcv_last_date]
+        if new_bars:
+            append_stock_data(stockname, new_bars, ohlcv_dir, OHLCV_HEADER)
+        new_rows = bar_values([bar for bar in bars if last_date is None or bar[0] > last_date])
+    else:
+        new_rows = source.fetch(stockname, last_date)
+    if not new_rows:
+        return []
+
+    append_stock_data(stockname, new_rows, data_dir)
+    if checkpoint_dir is not None:
+        advance_checkpoints(stockname, [value for _, value in new_rows], checkpoint_dir)
+    return new_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally refresh stock data and checkpointed algorithms")
+    parser.add_argument("stocks", nargs="*", help="Stocks to refresh (default: every csv in the data directory)")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--source-dir", help="Read new rows from this directory of csvs instead of Yahoo Finance")
+    parser.add_argument("--checkpoint-dir", help="Advance algorithms checkpointed under this directory")
+    args = parser.parse_args()
+
+    source = LocalDataSource(args.source_dir) if args.source_dir else YahooDataSource()
+    stocks = args.stocks or sorted(basename(path)[:-len(".csv")] for path in glob(join(args.data_dir, "*.csv")))
+
+    for stock in stocks:
+        new_rows = refresh_stock(stock, source, args.data_dir, args.checkpoint_dir)
+        print(f"{stock}: {len(new_rows)} new rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# Off-screen (Agg) figure rendering with shape-preserving downsampling
+# python3 render.py [--workers N] [--max-points N] [--output-dir DIR] [STOCK ...]
+# renders every stock in data/ (or just those given) to images/<stock>.png in parallel
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+from os.path import basename, join
+
+import numpy as np
+
+# A few thousand points is already more than a figure has pixels across
+DEFAULT_MAX_POINTS = 2000
+# Above this many points, markers just turn the line into a smear
+MARKER_LIMIT = 300
+
+
+def lttb(x, y, threshold: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets downsampling: keeps the first and last points,
+    plus the point in each bucket that forms the largest triangle with its neighbours,
+    which preserves peaks and troughs far better than taking every nth point
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # Bucket i covers [edges[i], edges[i + 1]); the first and last points are buckets of their own
+    every = (n - 2) / (threshold - 2)
+    edges = np.append((np.arange(threshold - 2) * every).astype(int) + 1, n - 1)
+    indices = np.empty(threshold, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        indices[i + 1] = a
+
+    return x[indices], y[indices]
+
+
+def downsample_figure(figure, max_points: int = DEFAULT_MAX_POINTS):
+    """
+    Downsample every line already drawn on a figure, in place
+    """
+    for axes in figure.axes:
+        for line in axes.get_lines():
+            x = line.get_xdata(orig=False)
+            if len(x) > max_points:
+                line.set_data(*lttb(x, line.get_ydata(orig=False), max_points))
+
+
+def tikz_code(figure, max_points: int = 500) -> str:
+    """
+    TikZ for a figure, capped at max_points per line so the output stays small.
+    The figure's lines are left with all their points
+    """
+    import matplot2tikz
+
+    originals = [(line, line.get_data(orig=True)) for axes in figure.axes for line in axes.get_lines()]
+    downsample_figure(figure, max_points)
+    try:
+        return matplot2tikz.get_tikz_code(figure=figure)
+    finally:
+        for line, data in originals:
+            line.set_data(*data)
+
+
+def render_backtest_figure(stock: str, data: list[float], worths: list[tuple[str, list[float]]], path: str,
+                           max_points: int = DEFAULT_MAX_POINTS):
+    """
+    Stock price with every algorithm's worth history on a second axis, saved to path
+    """
+    import matplotlib
+    matplotlib.use("Agg")  # Never open windows, even if a display is available
+    import matplotlib.pyplot as plt
+
+    fig, stock_axes = plt.subplots()
+    stock_axes.set_title(stock)
+    stock_axes.set_xlabel("Days since start")
+    stock_axes.set_ylabel("Stock Value")
+    stock_axes.plot(*lttb(range(len(data)), data, max_points), 'k-+' if len(data) <= MARKER_LIMIT else 'k-',
+                    label="Stock Price")
+    stock_axes.set_xlim(0, len(data) - 1)
+
+    algo_axes = stock_axes.twinx()
+    algo_axes.set_ylabel("Worth history")
+    for name, worth in worths:
+        algo_axes.plot(*lttb(range(len(worth)), worth, max_points), linestyle="--", label=name)
+
+    algo_axes.legend(loc="upper left")
+    stock_axes.legend(loc="lower left")
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def render_stock_figure(stockname: str, path: str, max_points: int = DEFAULT_MAX_POINTS, data_dir: str = "data"):
+    """
+    Stock value over time, as plotter.py draws it, saved to path
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.dates import date2num, AutoDateLocator, DateFormatter
+    from data_parser import get_stock_data
+
+    stock = get_stock_data(stockname, data_dir)
+    dates = date2num([p[0] for p in stock])
+    values = [p[1] for p in stock]
+
+    fig, axes = plt.subplots()
+    axes.plot(*lttb(dates, values, max_points))
+    axes.xaxis.set_major_locator(AutoDateLocator())
+    axes.xaxis.set_major_formatter(DateFormatter("%d/%m/%Y"))
+    axes.set_xlim(dates[0], dates[-1])
+    fig.autofmt_xdate()
+    axes.set_xlabel("Date")
+    axes.set_ylabel("Value")
+    axes.set_title(stockname.upper())
+    axes.grid(True)
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def render_stock_figures(stocknames: list[str], output_dir: str = "images", workers: int | None = None,
+                         max_points: int = DEFAULT_MAX_POINTS, data_dir: str = "data") -> list[str]:
+    """
+    Render many stocks' figures in parallel worker processes; returns the paths written
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [join(output_dir, stockname.lower() + ".png") for stockname in stocknames]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(render_stock_figure, stocknames, paths,
+                          [max_points] * len(paths), [data_dir] * len(paths)))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render stock figures off-screen")
+    parser.add_argument("stocks", nargs="*", help="Stocks to render (default: every csv in the data directory)")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--output-dir", default="images")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    parser.add_argument("--max-points", type=int, default=DEFAULT_MAX_POINTS)
+    args = parser.parse_args()
+
+    stocks = args.stocks or sorted(basename(path)[:-len(".csv")] for path in glob(join(args.data_dir, "*.csv")))
+    paths = render_stock_figures(stocks, args.output_dir, args.workers, args.max_points, args.data_dir)
+    print(f"Rendered {len(paths)} figures to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Coarser bars (weekly, monthly, every N days, ...) built from a base price series, all at once
+# with numpy, and cached per stock so repeated runs don't rebuild them
+# python3 resample.py <RULE> [--data-dir DIR] [--output-dir DIR] [STOCK ...]
+# e.g. python3 resample.py W --output-dir data_weekly
+# writes each stock's (default: every stock in data-dir) bar closes, in the same csv format as
+# data/, so anything that reads a data directory (backtester, batch_runner, ...) can run on them
+#
+# RULE is a count of prices per bar, or W/M/Q/Y for calendar weeks/months/quarters/years,
+# optionally several of them (e.g. 2W). For bars built one price at a time (e.g. inside a
+# strategy) see algorithms/bars.py, which uses the same rules and lines up with these.
+
+import argparse
+import os
+from glob import glob
+from os.path import basename, join
+
+import numpy as np
+
+from algorithms.bars import parse_rule
+from data_parser import DATE_FORMAT, get_stock_data
+
+# (csv path, modification time, rule) -> bars
+_cache: dict[tuple[str, float, int | str], dict[str, np.ndarray]] = {}
+
+
+def _period_keys(days: np.ndarray, count: int, unit: str) -> np.ndarray:
+    # Same numbering as algorithms.bars.period_key, for a whole array of datetime64[D] days
+    if unit == "W":
+        keys = (days.astype(np.int64) + 3) // 7
+    elif unit == "Y":
+        keys = days.astype("datetime64[Y]").astype(np.int64)
+    else:
+        keys = days.astype("datetime64[M]").astype(np.int64)
+        if unit == "Q":
+            keys //= 3
+    return keys // count
+
+
+def resample(values, days=None, rule: int | str = "W") -> dict[str, np.ndarray]:
+    """
+    Bars of a price series: open, high, low and close of each, how many prices it covers,
+    and (when days are given) the day of its last price. The last bar may be partial.
+    Calendar rules need the days, in order
+    """
+    values = np.asarray(values, dtype=float)
+    count, unit = parse_rule(rule)
+    if days is not None:
+        days = np.asarray(days, dtype="datetime64[D]")
+    if unit is None:
+        keys = np.arange(len(values)) // count
+    elif days is None:
+        raise ValueError(f"Calendar bars ({rule}) need the day of every price")
+    else:
+        keys = _period_keys(days, count, unit)
+
+    starts = np.flatnonzero(np.concatenate([[len(values) > 0], keys[1:] != keys[:-1]]))
+    ends = np.append(starts[1:], len(values))[:len(starts)].astype(np.int64)
+    # reduceat can't take an empty series
+    reduce = len(values) > 0
+    bars = {
+        "open": values[starts],
+        "high": np.maximum.reduceat(values, starts) if reduce else values[:0],
+        "low": np.minimum.reduceat(values, starts) if reduce else values[:0],
+        "close": values[ends - 1],
+        "count": ends - starts,
+    }
+    if days is not None:
+        bars["day"] = days[ends - 1]
+    return bars
+
+
+def load_bars(stock: str, rule: int | str = "W", data_dir: str = "data") -> dict[str, np.ndarray]:
+    """
+    resample() of a stored stock, cached until its csv changes. The arrays are shared between
+    callers, so don't modify them
+    """
+    path = os.path.abspath(join(data_dir, stock.lower() + ".csv"))
+    key = (path, os.path.getmtime(path), rule)
+    bars = _cache.get(key)
+    if bars is None:
+        rows = get_stock_data(stock, data_dir)
+        bars = resample([value for _, value in rows], [day for day, _ in rows], rule)
+        for array in bars.values():
+            array.flags.writeable = False
+        # Forget bars of older versions of the file
+        for stale in [k for k in _cache if k[0] == path and k[2] == rule]:
+            del _cache[stale]
+        _cache[key] = bars
+    return bars
+
+
+def write_bars(stock: str, rule: int | str, data_dir: str, output_dir: str):
+    """
+    Write a stock's bar closes (dated by each bar's last day) to output_dir, in data/'s csv format
+    """
+    bars = load_bars(stock, rule, data_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(join(output_dir, stock.lower() + ".csv"), "w") as OUTPUT:
+        OUTPUT.write("Date,Value\n")
+        for day, close in zip(bars["day"].tolist(), bars["close"].tolist()):
+            OUTPUT.write(f"{day.strftime(DATE_FORMAT)},{close}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resample stored stocks into coarser bars")
+    parser.add_argument("rule", help="Prices per bar, or W/M/Q/Y (optionally several, e.g. 2W)")
+    parser.add_argument("stocks", nargs="*", help="Stocks to resample (default: all in the data directory)")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--output-dir", help="Where to write the bars (default: data_<rule>)")
+    args = parser.parse_args()
+
+    rule = int(args.rule) if args.rule.isdigit() else args.rule
+    parse_rule(rule)
+    output_dir = args.output_dir or f"data_{args.rule.lower()}"
+    stocks = args.stocks or [basename(path)[:-len(".csv")] for path in sorted(glob(join(args.data_dir, "*.csv")))]
+    for stock in stocks:
+        write_bars(stock, rule, args.data_dir, output_dir)
+    print(f"Wrote {len(stocks)} stocks' {args.rule} bars to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# Append-only store for the results of long sweeps: rows (and optionally downsampled worth
+# histories) are buffered and written out as they come in, as numbered chunks of columns, so
+# memory stays flat however many back tests a sweep runs
+# python3 result_store.py <STORE_DIR> [--csv FILE]     summarise a store, or export its rows to csv
+#
+# Store layout: <STORE_DIR>/chunk_<n>.npz, one array per field, plus, when histories are kept,
+# history_day/history_worth (every row's points, one after another) and history_offsets
+# (where each row's points start and end). <STORE_DIR>/schema.json fixes each field's type
+# (int, float or str) for every chunk, so chunks always concatenate: fields not declared up
+# front are inferred from the first chunk (numbers as float, anything else as str), and later
+# rows are cast to it, or rejected if they can't be.
+# Chunks are written aside and renamed in, so after a crash a store holds every chunk flushed
+# before it and nothing half written; reopening it carries on after the last chunk.
+
+import argparse
+import csv
+import json
+import os
+import time
+from glob import glob
+from os.path import basename, join
+
+import numpy as np
+
+from render import lttb
+
+CHUNK_PATTERN = "chunk_*.npz"
+SCHEMA_FILE = "schema.json"
+TYPES = {"int": np.int64, "float": np.float64, "str": np.str_}
+
+
+def _chunk_number(path: str) -> int:
+    return int(basename(path)[len("chunk_"):-len(".npz")])
+
+
+def chunk_paths(store_dir: str) -> list[str]:
+    return sorted(glob(join(store_dir, CHUNK_PATTERN)), key=_chunk_number)
+
+
+def read_schema(store_dir: str) -> dict[str, str] | None:
+    """
+    Each field's type (see TYPES), or None if nothing has been written yet
+    """
+    path = join(store_dir, SCHEMA_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as INPUT:
+        return json.load(INPUT)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+def _infer_type(values: list) -> str:
+    # Numbers are float even when whole, since later rows of the field may not be
+    numbers = all(value is None or _is_number(value) for value in values) and any(value is not None for value in values)
+    return "float" if numbers else "str"
+
+
+def _column(field: str, values: list, type_: str) -> np.ndarray:
+    if type_ == "str":
+        return np.array(["" if value is None else str(value) for value in values])
+    for value in values:
+        if type_ == "int" and not (isinstance(value, (int, np.integer)) and not isinstance(value, bool)) or \
+                type_ == "float" and not (value is None or _is_number(value)):
+            raise ValueError(f"{field} is stored as {type_}, but got {value!r}")
+    if type_ == "int":
+        return np.array(values, dtype=np.int64)
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+class ResultWriter:
+    """
+    Buffers result rows and writes them to store_dir as a new chunk every chunk_rows rows,
+    or on the first append flush_interval seconds after the last write
+    """
+
+    def __init__(self, store_dir: str, fields: list[str], chunk_rows: int = 1000, flush_interval: float = 30,
+                 history_points: int = 0, types: dict[str, str] | None = None):
+        """
+        fields: columns to keep from each row
+        history_points: points each worth history is downsampled to (by LTTB); 0 keeps none
+        types: type (see TYPES) of any fields whose type shouldn't be inferred from the first chunk
+        """
+        self.store_dir = store_dir
+        self.fields = fields
+        self.types = dict(types or {})
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.history_points = history_points
+        os.makedirs(store_dir, exist_ok=True)
+
+        # Leftovers of a chunk that was being written when a run died
+        for temp in glob(join(store_dir, "*.tmp*")):
+            os.remove(temp)
+        existing = chunk_paths(store_dir)
+        self.next_chunk = _chunk_number(existing[-1]) + 1 if existing else 0
+        # Reopening a store carries on with its types
+        self.schema = read_schema(store_dir)
+        if self.schema is not None and set(self.schema) != set(fields):
+            raise ValueError(f"{store_dir} holds fields {sorted(self.schema)}, not {sorted(fields)}")
+        if self.schema is not None and any(self.schema[field] != type_ for field, type_ in self.types.items()):
+            raise ValueError(f"{store_dir} stores its fields as {self.schema}, not {self.types}")
+
+        self.rows = []
+        self.histories = []
+        self.last_flush = time.monotonic()
+        self.written = 0
+
+    def append(self, row: dict, history: list[float] | None = None):
+        self.rows.append(row)
+        if self.history_points:
+            if history is None:
+                self.histories.append((np.empty(0), np.empty(0)))
+            else:
+                self.histories.append(lttb(np.arange(len(history)), history, self.history_points))
+        if len(self.rows) >= self.chunk_rows or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows as a chunk
+        """
+        self.last_flush = time.monotonic()
+        if not self.rows:
+            return
+
+        columns = {field: [row.get(field) for row in self.rows] for field in self.fields}
+        schema = self.schema or {field: self.types.get(field) or _infer_type(values) for field, values in columns.items()}
+        arrays = {field: _column(field, values, schema[field]) for field, values in columns.items()}
+        if self.schema is None:
+            temp = join(self.store_dir, f"{SCHEMA_FILE}.tmp{os.getpid()}")
+            with open(temp, "w") as OUTPUT:
+                json.dump(schema, OUTPUT)
+            os.replace(temp, join(self.store_dir, SCHEMA_FILE))
+            self.schema = schema
+        if self.history_points:
+            lengths = [len(days) for days, _ in self.histories]
+            arrays["history_offsets"] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+            arrays["history_day"] = np.concatenate([days for days, _ in self.histories]).astype(np.int32)
+            arrays["history_worth"] = np.concatenate([worths for _, worths in self.histories])
+
+        path = join(self.store_dir, f"chunk_{self.next_chunk:06}.npz")
+        temp = f"{path}.tmp{os.getpid()}.npz"
+        with open(temp, "wb") as OUTPUT:
+            np.savez(OUTPUT, **arrays)
+            OUTPUT.flush()
+            os.fsync(OUTPUT.fileno())
+        os.replace(temp, path)
+
+        self.next_chunk += 1
+        self.written += len(self.rows)
+        self.rows = []
+        self.histories = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_chunks(store_dir: str, columns: list[str] | None = None):
+    """
+    Each chunk's columns (default: all, histories aside) as a dict of arrays, one chunk at a time
+    """
+    for path in chunk_paths(store_dir):
+        with np.load(path) as chunk:
+            names = columns or [name for name in chunk.files if not name.startswith("history_")]
+            yield {name: chunk[name] for name in names}
+
+
+def read_rows(store_dir: str):
+    """
+    Every row in the store, as dicts, read one chunk at a time
+    """
+    for chunk in read_chunks(store_dir):
+        names = list(chunk)
+        for values in zip(*(chunk[name].tolist() for name in names)):
+            yield dict(zip(names, values))
+
+
+def read_column(store_dir: str, column: str) -> np.ndarray:
+    """
+    One column across the whole store (only that column is read from each chunk)
+    """
+    parts = [chunk[column] for chunk in read_chunks(store_dir, [column])]
+    return np.concatenate(parts) if parts else np.empty(0)
+
+
+def read_histories(store_dir: str):
+    """
+    Every row's downsampled worth history, as (days, worths), one chunk at a time
+    """
+    for path in chunk_paths(store_dir):
+        with np.load(path) as chunk:
+            if "history_offsets" not in chunk.files:
+                continue
+            offsets, days, worths = chunk["history_offsets"], chunk["history_day"], chunk["history_worth"]
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                yield days[start:end], worths[start:end]
+
+
+def export_csv(store_dir: str, path: str) -> int:
+    """
+    Write every row in the store to a csv; returns the number of rows
+    """
+    count = 0
+    with open(path, "w", newline="") as OUTPUT:
+        writer = None
+        for row in read_rows(store_dir):
+            if writer is None:
+                writer = csv.DictWriter(OUTPUT, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise or export a result store")
+    parser.add_argument("store_dir")
+    parser.add_argument("--csv", help="Export every row to this csv")
+    args = parser.parse_args()
+
+    if args.csv:
+        print(f"Wrote {export_csv(args.store_dir, args.csv)} rows to {args.csv}")
+        return
+
+    paths = chunk_paths(args.store_dir)
+    rows = sum(len(next(iter(chunk.values()))) for chunk in read_chunks(args.store_dir))
+    print(f"{args.store_dir}: {rows} rows in {len(paths)} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# Vectorised synthetic price paths for stress and scale testing
+# python3 synthetic.py <MODEL> <N_PATHS> <N_STEPS> [--seed S] [--output-dir DIR]
+# e.g. python3 synthetic.py regime 100 1250 --output-dir data_synthetic
+#
+# Every generator returns an (n_paths, n_steps) array and is reproducible from its seed.
+# write_csv/write_batch produce files in the same Date,Value format parse_csv reads.
+
+import argparse
+import os
+from datetime import date
+from os.path import join
+
+import numpy as np
+
+from data_parser import DATE_FORMAT
+
+TRADING_DAYS = 252
+
+# Annualised (drift, volatility) per regime, ordered bull, sideways, bear
+REGIMES = {
+    "bull": (0.20, 0.15),
+    "sideways": (0.0, 0.12),
+    "bear": (-0.25, 0.30),
+}
+# Daily probability of switching from each regime (row) to each other regime (column)
+DEFAULT_TRANSITIONS = np.array([
+    [0.990, 0.007, 0.003],
+    [0.006, 0.988, 0.006],
+    [0.004, 0.011, 0.985],
+])
+
+
+def _log_paths(log_returns: np.ndarray, start_price: float) -> np.ndarray:
+    return start_price * np.exp(np.cumsum(log_returns, axis=1))
+
+
+def gbm(n_paths: int, n_steps: int, drift: float = 0.08, volatility: float = 0.2,
+        start_price: float = 100.0, seed: int | None = None) -> np.ndarray:
+    """
+    Geometric Brownian motion with annualised drift and volatility
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1 / TRADING_DAYS
+    shocks = rng.standard_normal((n_paths, n_steps))
+    return _log_paths((drift - volatility**2 / 2) * dt + volatility * np.sqrt(dt) * shocks, start_price)
+
+
+def regime_switching(n_paths: int, n_steps: int, transitions: np.ndarray = DEFAULT_TRANSITIONS,
+                     start_price: float = 100.0, seed: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    GBM whose drift and volatility follow a Markov chain over bull/sideways/bear regimes.
+    Returns the prices and the regime index (into REGIMES) of every step
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1 / TRADING_DAYS
+    drifts, volatilities = (np.array(v) for v in zip(*REGIMES.values()))
+    cumulative = np.cumsum(transitions, axis=1)
+
+    # The chain is inherently sequential in time, but every path advances at once
+    regimes = np.empty((n_paths, n_steps), dtype=np.int8)
+    regimes[:, 0] = rng.integers(0, len(REGIMES), n_paths)
+    draws = rng.random((n_paths, n_steps))
+    for t in range(1, n_steps):
+        thresholds = cumulative[regimes[:, t - 1]]
+        regimes[:, t] = np.minimum((draws[:, t, None] > thresholds).sum(axis=1), len(REGIMES) - 1)
+
+    mu = drifts[regimes]
+    sigma = volatilities[regimes]
+    shocks = rng.standard_normal((n_paths, n_steps))
+    return _log_paths((mu - sigma**2 / 2) * dt + sigma * np.sqrt(dt) * shocks, start_price), regimes
+
+
+def jump_diffusion(n_paths: int, n_steps: int, drift: float = 0.08, volatility: float = 0.2,
+                   jump_rate: float = 2.0, jump_mean: float = -0.05, jump_std: float = 0.1,
+                   start_price: float = 100.0, seed: int | None = None) -> np.ndarray:
+    """
+    Merton jump diffusion: GBM plus Poisson (jump_rate per year) log-normal jumps
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1 / TRADING_DAYS
+    shocks = rng.standard_normal((n_paths, n_steps))
+    jump_counts = rng.poisson(jump_rate * dt, (n_paths, n_steps))
+    # Sum of k normal jumps is normal with k times the mean and variance
+    jumps = jump_mean * jump_counts + jump_std * np.sqrt(jump_counts) * rng.standard_normal((n_paths, n_steps))
+    # Compensate the drift so jumps don't change the expected return
+    compensator = jump_rate * (np.exp(jump_mean + jump_std**2 / 2) - 1)
+    log_returns = (drift - compensator - volatility**2 / 2) * dt + volatility * np.sqrt(dt) * shocks + jumps
+    return _log_paths(log_returns, start_price)
+
+
+def trading_dates(n_steps: int, start: date = date(2000, 1, 3)) -> np.ndarray:
+    return np.busday_offset(np.datetime64(start, "D"), np.arange(n_steps), roll="forward")
+
+
+def write_csv(path: str, prices: np.ndarray, start: date = date(2000, 1, 3)):
+    """
+    Write one path as a Date,Value csv dated over consecutive business days
+    """
+    dates = trading_dates(len(prices), start).astype(object)
+    with open(path, "w") as OUTPUT:
+        OUTPUT.write("Date,Value\n")
+        OUTPUT.writelines(f"{day.strftime(DATE_FORMAT)},{value!r}\n" for day, value in zip(dates, prices.tolist()))
+
+
+def write_batch(prices: np.ndarray, output_dir: str, prefix: str = "synthetic",
+                start: date = date(2000, 1, 3)) -> list[str]:
+    """
+    Write every path to <output_dir>/<prefix>_<i>.csv; returns the stock names written
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    names = [f"{prefix}_{i}" for i in range(len(prices))]
+    for name, path_prices in zip(names, prices):
+        write_csv(join(output_dir, name + ".csv"), path_prices, start)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic price csvs")
+    parser.add_argument("model", choices=["gbm", "regime", "jump"])
+    parser.add_argument("n_paths", type=int)
+    parser.add_argument("n_steps", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default="data_synthetic")
+    args = parser.parse_args()
+
+    if args.model == "gbm":
+        prices = gbm(args.n_paths, args.n_steps, seed=args.seed)
+    elif args.model == "regime":
+        prices, _ = regime_switching(args.n_paths, args.n_steps, seed=args.seed)
+    else:
+        prices = jump_diffusion(args.n_paths, args.n_steps, seed=args.seed)
+
+    names = write_batch(prices, args.output_dir, args.model)
+    print(f"Wrote {len(names)} series of {args.n_steps} points to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# Search a strategy's parameters by successive halving: many random candidates are back tested
+# cheaply (on the start of the data, and only some tickers), the worst are dropped, and the
+# survivors get more data, until the last few are tested on everything
+# python3 tuning.py <CONFIG> [--workers N] [--output FILE]
+# e.g. python3 tuning.py configs/tune_sma.json
+#
+# Config (JSON):
+#   tickers:        stocks to test on, as named in data/
+#   algorithm:      registered strategy to tune (e.g. an AlgorithmTypes name)
+#   space:          its parameters (as passed to algorithm_create), where any value may be
+#                   {"int": [lo, hi]}, {"float": [lo, hi]} or {"choice": [...]} to search over it.
+#                   Lists are searched element by element; anything else is fixed.
+#                   {"increasing": [...]} is a list searched the same way, but only ever
+#                   strictly increasing (e.g. moving average lengths, shortest first)
+#   metric:         sharpe, cagr, calmar, average_trade or max_drawdown (minimised), default sharpe
+#   candidates:     random candidates to start with (default 81)
+#   eta:            keep 1/eta of candidates each round, and give them eta times the data (default 3)
+#   min_fraction:   fraction of the data (and tickers) the first round uses (default 1/9). Prefixes
+#                   are never shorter than a candidate needs to be scored: its strategy's
+#                   look back plus MIN_RETURNS returns. Tickers too short for that are left out
+#                   of the candidate's score; one too short for all of them scores as badly as possible
+#   data_dir, start_balance, start_shares, seed, workers:   defaults "data", 1000, 0, 0, 1
+
+import argparse
+import json
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from price_panel import PricePanel, attach
+
+METRICS = ["sharpe", "cagr", "calmar", "average_trade", "max_drawdown"]
+# Metrics where lower is better
+MINIMISED = {"max_drawdown"}
+
+
+def load_config(path: str) -> dict:
+    with open(path) as INPUT:
+        config = json.load(INPUT)
+
+    config.setdefault("metric", "sharpe")
+    config.setdefault("candidates", 81)
+    config.setdefault("eta", 3)
+    config.setdefault("min_fraction", 1 / 9)
+    config.setdefault("data_dir", "data")
+    config.setdefault("start_balance", 1000)
+    config.setdefault("start_shares", 0)
+    config.setdefault("seed", 0)
+    config.setdefault("workers", 1)
+
+    if not config.get("tickers"):
+        raise ValueError(f"{path}: no tickers given")
+    if "algorithm" not in config or "space" not in config:
+        raise ValueError(f"{path}: needs an algorithm and its parameter space")
+    if config["metric"] not in METRICS:
+        raise ValueError(f"{path}: unknown metric {config['metric']}, expected one of {METRICS}")
+    return config
+
+
+# Draws of an "increasing" list before giving up on it
+MAX_DRAWS = 1000
+# Returns a back test needs after its strategy's look back for its metrics to mean anything
+MIN_RETURNS = 2
+
+
+def sample_params(space, rng: random.Random):
+    """
+    One random point of a parameter space (see the config description above)
+    """
+    if isinstance(space, list):
+        return [sample_params(item, rng) for item in space]
+    if isinstance(space, dict):
+        if "increasing" in space:
+            # Redrawn until increasing, so every increasing point stays equally likely
+            for _ in range(MAX_DRAWS):
+                values = sample_params(space["increasing"], rng)
+                if all(a < b for a, b in zip(values, values[1:])):
+                    return values
+            raise ValueError(f"No strictly increasing point found in {space}")
+        if "int" in space:
+            return rng.randint(*space["int"])
+        if "float" in space:
+            return rng.uniform(*space["float"])
+        if "choice" in space:
+            return rng.choice(space["choice"])
+    return space
+
+
+def evaluate(algorithm: str, params: list, data: list[float], config: dict) -> dict[str, float]:
+    """
+    Metrics of one back test of algorithm with params on data
+    """
+    from algorithms.algorithm_factory import algorithm_create_by_name
+    from backtester import algorithm_metrics, backtest
+
+    strategy = algorithm_create_by_name(algorithm, config["start_balance"], config["start_shares"], params)
+    backtest(strategy, data, False)
+    return algorithm_metrics(strategy)
+
+
+def min_days(algorithm: str, params: list, config: dict) -> int:
+    """
+    Shortest prefix of prices a back test of algorithm with params can be scored on
+    """
+    from algorithms.algorithm_factory import algorithm_create_by_name
+
+    strategy = algorithm_create_by_name(algorithm, config["start_balance"], config["start_shares"], params)
+    # The first price only starts the worth history, so n prices give n - 2 returns
+    return strategy.lookback() + MIN_RETURNS + 1
+
+
+def _evaluate_job(job) -> float:
+    # Jobs refer to their data in the shared price panel, rather than carrying a copy of it
+    algorithm, params, handle, stock, days, config = job
+    return evaluate(algorithm, params, attach(handle).series(stock)[:days], config)[config["metric"]]
+
+
+def successive_halving(config: dict, prices: dict[str, list[float]] | None = None) -> dict:
+    """
+    Run the search; returns the best parameters, its score, and every round's results
+    """
+    rng = random.Random(config["seed"])
+    # Every round's back tests (in every worker) read the prices from one shared copy
+    panel = PricePanel.load(config["tickers"], config["data_dir"]) if prices is None else PricePanel.create(prices)
+    lengths = {stock: len(panel[stock]) for stock in panel.tickers}
+    # Tickers are added in a random (but fixed) order as rounds get more budget
+    tickers = panel.tickers
+    rng.shuffle(tickers)
+
+    candidates = []
+    seen = set()
+    for _ in range(config["candidates"] * 10):
+        params = sample_params(config["space"], rng)
+        if json.dumps(params) not in seen:
+            seen.add(json.dumps(params))
+            candidates.append(params)
+        if len(candidates) == config["candidates"]:
+            break
+
+    initial_candidates = len(candidates)
+    minimums = {json.dumps(params): min_days(config["algorithm"], params, config) for params in candidates}
+    sign = -1 if config["metric"] in MINIMISED else 1
+    # Score of a candidate with no ticker long enough to back test it on
+    worst = -sign * math.inf
+    eta = config["eta"]
+    fraction = config["min_fraction"]
+    rounds = []
+    days_tested = 0
+    executor = ProcessPoolExecutor(max_workers=config["workers"]) if config["workers"] > 1 else None
+    try:
+        while True:
+            # This round's budget: a prefix of each series, on a subset of the tickers
+            round_tickers = tickers[:max(1, math.ceil(fraction * len(tickers)))]
+            days = {stock: math.ceil(fraction * lengths[stock]) for stock in round_tickers}
+            results = [None] * (len(candidates) * len(round_tickers))
+            jobs, slots = [], []
+            for i, params in enumerate(candidates):
+                minimum = minimums[json.dumps(params)]
+                for j, stock in enumerate(round_tickers):
+                    if lengths[stock] >= minimum:
+                        jobs.append((config["algorithm"], params, panel.handle, stock,
+                                     min(lengths[stock], max(minimum, days[stock])), config))
+                        slots.append(i * len(round_tickers) + j)
+            scores = executor.map(_evaluate_job, jobs, chunksize=8) if executor else map(_evaluate_job, jobs)
+            for slot, score in zip(slots, scores):
+                results[slot] = score
+            days_tested += sum(job[4] for job in jobs)
+
+            scores = []
+            for i in range(len(candidates)):
+                scored = [score for score in results[i * len(round_tickers):(i + 1) * len(round_tickers)]
+                          if score is not None]
+                scores.append(sum(scored) / len(scored) if scored else worst)
+            ranked = sorted(zip(scores, candidates), key=lambda pair: sign * pair[0], reverse=True)
+            rounds.append({
+                "fraction": fraction,
+                "tickers": round_tickers,
+                "results": [{"params": params, "score": score} for score, params in ranked],
+            })
+            print(f"Round {len(rounds)}: {len(candidates)} candidates on {len(round_tickers)} tickers, "
+                  f"{fraction:.0%} of data; best {config['metric']} {ranked[0][0]:.4f} with {ranked[0][1]}")
+
+            complete = len(round_tickers) == len(tickers) and all(days[stock] >= lengths[stock] for stock in tickers)
+            if complete or len(candidates) == 1:
+                break
+            candidates = [params for _, params in ranked[:max(1, math.ceil(len(candidates) / eta))]]
+            fraction = min(1, fraction * eta)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        panel.close()
+
+    # Back tested days a full grid over the same candidates would have cost
+    full_cost = initial_candidates * sum(lengths.values())
+    best_score, best_params = ranked[0]
+    return {
+        "algorithm": config["algorithm"],
+        "metric": config["metric"],
+        "best_params": best_params,
+        "best_score": best_score,
+        "cost_fraction": days_tested / full_cost,
+        "rounds": rounds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune a strategy's parameters by successive halving")
+    parser.add_argument("config")
+    parser.add_argument("--workers", type=int, help="Override the config's worker count")
+    parser.add_argument("--output", help="Write the full search results (JSON) here")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.workers is not None:
+        config["workers"] = args.workers
+
+    result = successive_halving(config)
+    print(f"Best {result['metric']}: {result['best_score']:.4f} with {result['best_params']} "
+          f"({result['cost_fraction']:.1%} of the back testing a full run of every candidate would take)")
+    if args.output:
+        with open(args.output, "w") as OUTPUT:
+            json.dump(result, OUTPUT, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+# Run big back test campaigns on many worker processes, possibly on many hosts, through a
+# shared directory queue (any directory every worker can see, e.g. NFS, works as the transport)
+# python3 work_queue.py run <CONFIG> <QUEUE_DIR> [--workers N]    submit, run local workers and collect
+# python3 work_queue.py submit <CONFIG> <QUEUE_DIR>                 split a campaign into chunks
+# python3 work_queue.py worker <QUEUE_DIR> [--exit-when-empty]      work through chunks (run on any host)
+# python3 work_queue.py status <QUEUE_DIR>
+# python3 work_queue.py requeue <QUEUE_DIR>                         put abandoned chunks back in pending/
+# python3 work_queue.py collect <QUEUE_DIR> [--output FILE]         merge finished results into one csv
+#                                                                   (or, if FILE isn't a .csv, a result store)
+#
+# CONFIG is a batch_runner.py config plus, optionally:
+#   origins:        walk-forward start dates; every ticker x algorithm is run from each (default: all the data)
+#   chunk_size:     back tests per chunk (default 20)
+#   max_attempts:   times a chunk is tried before it's marked failed (default 3)
+#   lease:          seconds a claimed chunk may go without a heartbeat before it's handed out again (default 60)
+# and algorithm entries may give "grid": [params, params, ...] instead of "params", for one
+# back test per params.
+#
+# Queue layout: pending/ chunks waiting, claimed/ chunks being worked on (claimed by renaming
+# them in, which only one worker can do), results/ one jsonl per finished chunk, failed/ chunks
+# out of attempts. Workers heartbeat their claims; claims that go quiet are put back in pending/
+# (by run's coordinator, and by any worker that finds nothing pending), so a dead worker's
+# chunk is picked up again even when every worker was started on its own.
+
+import argparse
+import csv
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from glob import glob
+from itertools import groupby
+from os.path import join
+
+from batch_runner import RESULT_FIELDS, load_config, result_types
+
+QUEUE_FIELDS = RESULT_FIELDS + ["start_date"]
+_DIRS = ["pending", "claimed", "results", "failed"]
+
+
+def _write_json(path: str, data):
+    # Written aside then renamed, so no one ever reads half a file
+    temp = f"{path}.tmp{os.getpid()}"
+    with open(temp, "w") as OUTPUT:
+        json.dump(data, OUTPUT)
+    os.replace(temp, path)
+
+
+def _read_json(path: str):
+    with open(path) as INPUT:
+        return json.load(INPUT)
+
+
+def expand_algorithms(algorithms: list[dict]) -> list[dict]:
+    """
+    Algorithm entries with any "grid" expanded to one entry per params
+    """
+    expanded = []
+    for spec in algorithms:
+        if "grid" not in spec:
+            expanded.append(spec)
+            continue
+        name = spec.get("name", spec["type"])
+        for params in spec["grid"]:
+            expanded.append({"name": f"{name} {json.dumps(params)}", "type": spec["type"], "params": params})
+    return expanded
+
+
+def campaign_tasks(config: dict) -> list[dict]:
+    """
+    Every back test in a campaign: ticker x algorithm x origin
+    """
+    origins = config.get("origins") or [config["start_date"]]
+    return [{"ticker": stock, "algorithm": spec, "start_date": origin}
+            for stock in config["tickers"] for origin in origins for spec in expand_algorithms(config["algorithms"])]
+
+
+def submit(config: dict, queue_dir: str) -> int:
+    """
+    Split a campaign into chunks in queue_dir; returns the number of chunks
+    """
+    for name in _DIRS:
+        os.makedirs(join(queue_dir, name), exist_ok=True)
+    if os.listdir(join(queue_dir, "pending")) or os.listdir(join(queue_dir, "results")):
+        raise ValueError(f"{queue_dir} already has a campaign in it")
+
+    config = dict(config, figures=False, profile=False)
+    config.setdefault("chunk_size", 20)
+    config.setdefault("max_attempts", 3)
+    config.setdefault("lease", 60)
+    _write_json(join(queue_dir, "campaign.json"), config)
+
+    if os.path.exists(join(queue_dir, "stop")):
+        os.remove(join(queue_dir, "stop"))
+
+    # Tasks are in ticker order, so a chunk mostly shares one ticker's data
+    tasks = campaign_tasks(config)
+    chunks = [tasks[i:i + config["chunk_size"]] for i in range(0, len(tasks), config["chunk_size"])]
+    for number, chunk in enumerate(chunks):
+        chunk_id = f"{number:06}"
+        _write_json(join(queue_dir, "pending", chunk_id + ".json"), {"id": chunk_id, "attempts": 0, "tasks": chunk})
+    return len(chunks)
+
+
+def run_chunk(chunk: dict, config: dict) -> list[dict]:
+    """
+    Back test every task of a chunk; returns one result row per task
+    """
+    from batch_runner import run_ticker
+
+    rows = []
+    # Consecutive tasks on the same data are run together, so it's only loaded once
+    for (stock, start_date), tasks in groupby(chunk["tasks"], key=lambda task: (task["ticker"], task["start_date"])):
+        task_config = dict(config, algorithms=[task["algorithm"] for task in tasks], start_date=start_date)
+        for row in run_ticker(stock, task_config):
+            row["start_date"] = start_date
+            rows.append(row)
+    return rows
+
+
+class _Heartbeat:
+    """
+    Keeps touching a claimed chunk's file while it's worked on, so the coordinator knows it's alive
+    """
+
+    def __init__(self, path: str, interval: float):
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                # requeue_expired may have it aside for a moment, to check it (and put it back
+                # if it's still live): only stop once it's really gone, i.e. handed out again
+                if not glob(self.path + ".tmp*") and not os.path.exists(self.path):
+                    return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+def _claim(queue_dir: str, worker_id: str) -> tuple[str, dict] | None:
+    for name in sorted(os.listdir(join(queue_dir, "pending"))):
+        if not name.endswith(".json"):
+            continue
+        claimed = join(queue_dir, "claimed", f"{name[:-len('.json')]}@{worker_id}.json")
+        try:
+            # Only one worker's rename of a pending chunk can succeed
+            os.rename(join(queue_dir, "pending", name), claimed)
+        except FileNotFoundError:
+            continue
+        os.utime(claimed)
+        return claimed, _read_json(claimed)
+    return None
+
+
+def _release(queue_dir: str, claimed: str, chunk: dict, config: dict, error: str):
+    """Put a chunk that didn't finish back in the queue, or in failed/ once out of attempts"""
+    chunk = dict(chunk, attempts=chunk["attempts"] + 1, error=error)
+    folder = "failed" if chunk["attempts"] >= config["max_attempts"] else "pending"
+    _write_json(join(queue_dir, folder, chunk["id"] + ".json"), chunk)
+    try:
+        os.remove(claimed)
+    except FileNotFoundError:
+        pass
+
+
+def worker(queue_dir: str, exit_when_empty: bool = False, poll: float = 1.0) -> int:
+    """
+    Claim and run chunks until told to stop (queue_dir/stop exists) or, with exit_when_empty,
+    until nothing is pending or being worked on by a live worker; returns the number of chunks finished
+    """
+    config = _read_json(join(queue_dir, "campaign.json"))
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    finished = 0
+    while not os.path.exists(join(queue_dir, "stop")):
+        claim = _claim(queue_dir, worker_id)
+        if claim is None:
+            # Chunks of workers that died are only ever picked up if someone requeues them
+            if requeue_expired(queue_dir):
+                continue
+            # Claims left are all still heartbeating (or mid-requeue by another worker)
+            if exit_when_empty and not os.listdir(join(queue_dir, "claimed")):
+                break
+            time.sleep(poll)
+            continue
+
+        claimed, chunk = claim
+        try:
+            with _Heartbeat(claimed, config["lease"] / 3):
+                rows = run_chunk(chunk, config)
+        except Exception:
+            _release(queue_dir, claimed, chunk, config, traceback.format_exc())
+            continue
+
+        results = join(queue_dir, "results", chunk["id"] + ".jsonl")
+        temp = f"{results}.tmp{os.getpid()}"
+        with open(temp, "w") as OUTPUT:
+            for row in rows:
+                OUTPUT.write(json.dumps(row) + "\n")
+        os.replace(temp, results)
+        try:
+            os.remove(claimed)
+        except FileNotFoundError:
+            # Our lease ran out and the chunk was handed out again; its result is the same
+            pass
+        finished += 1
+    return finished
+
+
+def requeue_expired(queue_dir: str) -> int:
+    """
+    Put chunks whose worker stopped heartbeating back in pending/; returns how many were
+    """
+    config = _read_json(join(queue_dir, "campaign.json"))
+    now = time.time()
+    requeued = 0
+    for name in os.listdir(join(queue_dir, "claimed")):
+        if ".tmp" in name:
+            continue
+        claimed = join(queue_dir, "claimed", name)
+        # Taken aside first, so when several workers requeue at once only one releases the chunk
+        taken = f"{claimed}.tmp{os.getpid()}"
+        try:
+            if now - os.path.getmtime(claimed) <= config["lease"]:
+                continue
+            os.rename(claimed, taken)
+        except FileNotFoundError:
+            continue
+        if time.time() - os.path.getmtime(taken) <= config["lease"]:
+            # Its worker heartbeat just before the rename: it's still alive
+            os.rename(taken, claimed)
+            continue
+        claimed = taken
+        chunk = _read_json(claimed)
+        if os.path.exists(join(queue_dir, "results", chunk["id"] + ".jsonl")):
+            os.remove(claimed)
+            continue
+        _release(queue_dir, claimed, chunk, config, f"lease expired ({name})")
+        requeued += 1
+    return requeued
+
+
+def status(queue_dir: str) -> dict[str, int]:
+    counts = {name: 0 for name in _DIRS}
+    for name in _DIRS:
+        counts[name] = len([f for f in os.listdir(join(queue_dir, name)) if ".tmp" not in f])
+    return counts
+
+
+def results(queue_dir: str):
+    """Every result row finished so far, read one chunk at a time"""
+    folder = join(queue_dir, "results")
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".jsonl"):
+            with open(join(folder, name)) as INPUT:
+                for line in INPUT:
+                    yield json.loads(line)
+
+
+def collect(queue_dir: str, output: str) -> int:
+    """
+    Merge every finished chunk's results into one csv, or a result store (see result_store.py)
+    if output isn't a .csv; returns the number of rows
+    """
+    if not output.endswith(".csv"):
+        from result_store import ResultWriter
+
+        types = dict(result_types(_read_json(join(queue_dir, "campaign.json"))), start_date="str")
+        with ResultWriter(output, QUEUE_FIELDS, types=types) as store:
+            for row in results(queue_dir):
+                store.append(row)
+        return store.written
+
+    count = 0
+    with open(output, "w", newline="") as OUTPUT:
+        writer = csv.DictWriter(OUTPUT, fieldnames=QUEUE_FIELDS)
+        writer.writeheader()
+        for row in results(queue_dir):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def run(config: dict, queue_dir: str, workers: int, poll: float = 1.0) -> dict[str, int]:
+    """
+    Submit a campaign, work through it with local worker processes (more can join from other
+    hosts), report progress and requeue abandoned chunks until every chunk is done or failed
+    """
+    total = submit(config, queue_dir)
+    print(f"Submitted {total} chunks to {queue_dir}")
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    processes = [subprocess.Popen([sys.executable, join(here, "work_queue.py"), "worker", queue_dir, "--exit-when-empty"],
+                                  cwd=os.getcwd())
+                 for _ in range(workers)]
+    start = time.time()
+    try:
+        while True:
+            requeue_expired(queue_dir)
+            counts = status(queue_dir)
+            done = counts["results"] + counts["failed"]
+            elapsed = time.time() - start
+            rate = counts["results"] / elapsed if elapsed > 0 else 0
+            print(f"\r{counts['results']}/{total} chunks done, {counts['claimed']} running, "
+                  f"{counts['failed']} failed ({rate:.1f} chunks/s)", end="", flush=True)
+            if done >= total:
+                break
+            if all(process.poll() is not None for process in processes) and counts["claimed"] == 0 and counts["pending"]:
+                # Every local worker died: start a fresh one to carry on
+                processes.append(subprocess.Popen(
+                    [sys.executable, join(here, "work_queue.py"), "worker", queue_dir, "--exit-when-empty"], cwd=os.getcwd()))
+            time.sleep(poll)
+    finally:
+        print()
+        open(join(queue_dir, "stop"), "w").close()
+        for process in processes:
+            process.wait()
+    return status(queue_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run back test campaigns through a shared directory work queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Submit a campaign and run it with local workers")
+    run_parser.add_argument("config")
+    run_parser.add_argument("queue_dir")
+    run_parser.add_argument("--workers", type=int, help="Local worker processes (default: the config's workers)")
+    run_parser.add_argument("--output", help="Results csv (default: <queue_dir>/results.csv)")
+
+    submit_parser = commands.add_parser("submit", help="Split a campaign into chunks")
+    submit_parser.add_argument("config")
+    submit_parser.add_argument("queue_dir")
+
+    worker_parser = commands.add_parser("worker", help="Work through chunks")
+    worker_parser.add_argument("queue_dir")
+    worker_parser.add_argument("--exit-when-empty", action="store_true")
+
+    status_parser = commands.add_parser("status", help="Count chunks in each state")
+    status_parser.add_argument("queue_dir")
+
+    requeue_parser = commands.add_parser("requeue", help="Put chunks whose worker stopped heartbeating back in pending/")
+    requeue_parser.add_argument("queue_dir")
+
+    collect_parser = commands.add_parser("collect", help="Merge finished results into one csv")
+    collect_parser.add_argument("queue_dir")
+    collect_parser.add_argument("--output", help="Results csv, or result store directory (default: <queue_dir>/results.csv)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        config = load_config(args.config)
+        counts = run(config, args.queue_dir, args.workers or config["workers"])
+        rows = collect(args.queue_dir, args.output or join(args.queue_dir, "results.csv"))
+        print(f"{counts['results']} chunks done ({rows} results), {counts['failed']} failed")
+    elif args.command == "submit":
+        print(f"Submitted {submit(load_config(args.config), args.queue_dir)} chunks")
+    elif args.command == "worker":
+        print(f"Finished {worker(args.queue_dir, args.exit_when_empty)} chunks")
+    elif args.command == "status":
+        print(status(args.queue_dir))
+    elif args.command == "requeue":
+        print(f"Requeued {requeue_expired(args.queue_dir)} chunks")
+    elif args.command == "collect":
+        output = args.output or join(args.queue_dir, "results.csv")
+        print(f"Wrote {collect(args.queue_dir, output)} results to {output}")
+
+
+if __name__ == "__main__":
+    main()